@@ -1,58 +1,14 @@
 import sqlite3
 import json
-from typing import List, Tuple, Optional, Dict, Any
+from typing import List, Tuple, Optional, Dict, Any, Iterable
+from database.connection_pool import acquire
 
 DATABASE_NAME = 'shop_bot.db'
 
 
-def ensure_broadcast_tables():
-    """Создает таблицы для рассылок, если они не существуют."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-
-    try:
-        # Таблица для шаблонов рассылки
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS broadcast_templates (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                content TEXT NOT NULL,
-                type TEXT NOT NULL,
-                buttons TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Таблица для истории рассылок
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS broadcast_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                message_text TEXT NOT NULL,
-                media_type TEXT,
-                media_file TEXT,
-                buttons TEXT,
-                target_type TEXT NOT NULL,
-                target_params TEXT,
-                sent_count INTEGER DEFAULT 0,
-                total_recipients INTEGER,
-                status TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                sent_at TIMESTAMP
-            )
-        """)
-
-        conn.commit()
-
-    except sqlite3.Error as e:
-        print(f"Ошибка при создании таблиц для рассылок: {e}")
-
-    finally:
-        conn.close()
-
-
 def save_broadcast_template(name: str, content: Dict[str, Any]) -> int:
     """Сохраняет шаблон рассылки в базу данных."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -82,7 +38,7 @@ def save_broadcast_template(name: str, content: Dict[str, Any]) -> int:
 
 def get_broadcast_templates() -> List[Tuple]:
     """Получает список шаблонов рассылок."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -106,7 +62,7 @@ def get_broadcast_templates() -> List[Tuple]:
 
 def get_broadcast_template(template_id: int) -> Optional[Tuple]:
     """Получает шаблон рассылки по ID."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -131,7 +87,7 @@ def get_broadcast_template(template_id: int) -> Optional[Tuple]:
 
 def start_broadcast(broadcast_data: Dict[str, Any]) -> int:
     """Создает новую запись о рассылке."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -151,7 +107,7 @@ def start_broadcast(broadcast_data: Dict[str, Any]) -> int:
                 broadcast_data.get('target_type', 'all'),
                 json.dumps(broadcast_data.get('target_params', {})),
                 broadcast_data.get('total_recipients', 0),
-                'pending'
+                'scheduled' if broadcast_data.get('scheduled_time') else 'pending'
             )
         )
         conn.commit()
@@ -167,7 +123,7 @@ def start_broadcast(broadcast_data: Dict[str, Any]) -> int:
 
 def update_broadcast_status(broadcast_id: int, status: str, sent_count: int = None) -> bool:
     """Обновляет статус рассылки."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -223,7 +179,7 @@ def update_broadcast_status(broadcast_id: int, status: str, sent_count: int = No
 
 def get_broadcast_history(limit: int = 10) -> List[Tuple]:
     """Получает историю рассылок."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -249,7 +205,7 @@ def get_broadcast_history(limit: int = 10) -> List[Tuple]:
 
 def get_broadcast_details(broadcast_id: int) -> Optional[Tuple]:
     """Получает детальную информацию о рассылке."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -258,7 +214,7 @@ def get_broadcast_details(broadcast_id: int) -> Optional[Tuple]:
             SELECT 
                 id, message_text, media_type, media_file, buttons,
                 target_type, target_params, sent_count, total_recipients,
-                status, created_at, sent_at
+                status, created_at, sent_at, pruned_count
             FROM broadcast_history
             WHERE id = ?
             """,
@@ -272,4 +228,179 @@ def get_broadcast_details(broadcast_id: int) -> Optional[Tuple]:
         return None
 
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+
+def add_broadcast_recipients(broadcast_id: int, user_ids: Iterable[int]) -> bool:
+    """Записывает получателей рассылки в таблицу доставок (повторы игнорируются)."""
+    conn = acquire(DATABASE_NAME)
+    cursor = conn.cursor()
+
+    try:
+        cursor.executemany(
+            """
+            INSERT OR IGNORE INTO broadcast_deliveries (broadcast_id, user_id)
+            VALUES (?, ?)
+            """,
+            ((broadcast_id, user_id) for user_id in user_ids)
+        )
+        conn.commit()
+        return True
+
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Ошибка при сохранении получателей рассылки: {e}")
+        return False
+
+    finally:
+        conn.close()
+
+
+def finish_recipient_selection(broadcast_id: int, pruned_count: int = 0) -> int:
+    """
+    Отмечает, что все получатели рассылки записаны, и пересчитывает total_recipients.
+    pruned_count - сколько пользователей аудитории исключено как недоступные.
+    Возвращает число получателей или -1 при ошибке.
+    """
+    conn = acquire(DATABASE_NAME)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            """
+            UPDATE broadcast_history
+            SET recipients_selected = 1, pruned_count = ?,
+                total_recipients = (SELECT COUNT(*) FROM broadcast_deliveries WHERE broadcast_id = ?)
+            WHERE id = ?
+            """,
+            (pruned_count, broadcast_id, broadcast_id)
+        )
+        cursor.execute("SELECT total_recipients FROM broadcast_history WHERE id = ?", (broadcast_id,))
+        row = cursor.fetchone()
+        conn.commit()
+        return row[0] if row else -1
+
+    except sqlite3.Error as e:
+        print(f"Ошибка при обновлении числа получателей рассылки: {e}")
+        return -1
+
+    finally:
+        conn.close()
+
+
+def get_recipient_selection_state(broadcast_id: int) -> Optional[Tuple[bool, Optional[int]]]:
+    """
+    Получает состояние выбора получателей: (выбор завершен, последний записанный ID).
+    Получатели записываются по возрастанию ID, так что выбор можно продолжить после него.
+    """
+    conn = acquire(DATABASE_NAME)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            """
+            SELECT recipients_selected,
+                   (SELECT MAX(user_id) FROM broadcast_deliveries WHERE broadcast_id = h.id)
+            FROM broadcast_history AS h
+            WHERE id = ?
+            """,
+            (broadcast_id,)
+        )
+        row = cursor.fetchone()
+        return (bool(row[0]), row[1]) if row else None
+
+    except sqlite3.Error as e:
+        print(f"Ошибка при получении состояния выбора получателей: {e}")
+        return None
+
+    finally:
+        conn.close()
+
+
+def get_pending_recipients(broadcast_id: int, after_user_id: int = None, limit: int = 500) -> List[int]:
+    """Получает следующую порцию получателей, которым рассылка еще не отправлена."""
+    conn = acquire(DATABASE_NAME)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            """
+            SELECT user_id FROM broadcast_deliveries
+            WHERE broadcast_id = ? AND status = 'pending' AND user_id > ?
+            ORDER BY user_id
+            LIMIT ?
+            """,
+            (broadcast_id, after_user_id if after_user_id is not None else -2 ** 63, limit)
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    except sqlite3.Error as e:
+        print(f"Ошибка при получении получателей рассылки: {e}")
+        return []
+
+    finally:
+        conn.close()
+
+
+def save_delivery_results(broadcast_id: int, results: List[Tuple[int, str, Optional[str]]]) -> bool:
+    """
+    Сохраняет результаты отправки пачкой: results - список (user_id, status, error).
+    Счетчик sent_count рассылки увеличивается в той же транзакции.
+    """
+    conn = acquire(DATABASE_NAME)
+    cursor = conn.cursor()
+
+    try:
+        cursor.executemany(
+            """
+            UPDATE broadcast_deliveries
+            SET status = ?, error = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE broadcast_id = ? AND user_id = ? AND status = 'pending'
+            """,
+            [(status, error, broadcast_id, user_id) for user_id, status, error in results]
+        )
+        sent = sum(1 for _, status, _ in results if status == 'sent')
+        if sent:
+            cursor.execute(
+                "UPDATE broadcast_history SET sent_count = sent_count + ? WHERE id = ?",
+                (sent, broadcast_id)
+            )
+        conn.commit()
+        return True
+
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Ошибка при сохранении результатов рассылки: {e}")
+        return False
+
+    finally:
+        conn.close()
+
+
+def get_unfinished_broadcasts() -> List[int]:
+    """
+    Получает ID начатых, но не завершенных рассылок (для продолжения после перезапуска):
+    у них либо еще не выбраны все получатели, либо остались неотправленные сообщения.
+    """
+    conn = acquire(DATABASE_NAME)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            """
+            SELECT id FROM broadcast_history AS h
+            WHERE status = 'pending'
+              AND (recipients_selected = 0
+                   OR EXISTS (SELECT 1 FROM broadcast_deliveries AS d
+                              WHERE d.broadcast_id = h.id AND d.status = 'pending'))
+            ORDER BY id
+            """
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    except sqlite3.Error as e:
+        print(f"Ошибка при получении незавершенных рассылок: {e}")
+        return []
+
+    finally:
+        conn.close()
@@ -3,36 +3,14 @@ from datetime import datetime
 from typing import Optional, List, Dict
 import logging
 
+from database.connection_pool import connection
+
 logger = logging.getLogger(__name__)
 
 
 def get_db_connection():
-    """Создает подключение к базе данных"""
-    return sqlite3.connect('shop_bot.db')
-
-
-def init_client_messages_table():
-    """Инициализирует таблицу для логирования сообщений клиентам"""
-    try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS client_messages_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    admin_id INTEGER NOT NULL,
-                    client_id INTEGER NOT NULL,
-                    message_text TEXT,
-                    message_type TEXT NOT NULL,
-                    image_file_id TEXT,
-                    sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    success BOOLEAN DEFAULT TRUE,
-                    error_message TEXT
-                )
-            ''')
-            conn.commit()
-            logger.info("Таблица client_messages_log инициализирована")
-    except Exception as e:
-        logger.error(f"Ошибка при создании таблицы client_messages_log: {e}")
+    """Выдает подключение к базе данных из пула (используется как контекстный менеджер)"""
+    return connection('shop_bot.db')
 
 
 def log_message_sent(
@@ -272,7 +250,3 @@ def get_message_statistics(admin_id: Optional[int] = None) -> Dict:
             'failed_messages': 0,
             'unique_clients': 0
         }
-
-
-# Инициализация таблицы при импорте модуля
-init_client_messages_table()
\ No newline at end of file
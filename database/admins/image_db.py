@@ -2,40 +2,14 @@
 import sqlite3
 from datetime import datetime
 import logging
+from database.connection_pool import acquire
 
 logger = logging.getLogger(__name__)
 
 
-def create_product_images_table():
-    """Создает таблицу product_images если она не существует"""
-    conn = get_db_connection()
-    try:
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS product_images (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                product_name TEXT NOT NULL,
-                image_absolute_path TEXT NOT NULL,
-                category TEXT,
-                upload_date TEXT,
-                last_modified TEXT,
-                is_active BOOLEAN DEFAULT 1,
-                file_size INTEGER,
-                content_type TEXT
-            )
-        ''')
-        conn.commit()
-        logger.info("Таблица product_images создана или уже существует")
-        return True
-    except Exception as e:
-        logger.error(f"Ошибка при создании таблицы product_images: {e}")
-        return False
-    finally:
-        conn.close()
-
-
 def get_db_connection():
     """Создает соединение с базой данных warehouse.db"""
-    conn = sqlite3.connect('warehouse.db')
+    conn = acquire('warehouse.db')
     conn.row_factory = sqlite3.Row
     return conn
 
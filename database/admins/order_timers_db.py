@@ -0,0 +1,56 @@
+import logging
+import sqlite3
+from datetime import datetime
+from typing import List, Tuple
+
+from database.connection_pool import connection
+
+logger = logging.getLogger(__name__)
+
+DATABASE_NAME = 'shop_bot.db'
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def load_order_timers() -> List[Tuple[int, datetime, int]]:
+    """Загружает таймеры заказов: (order_id, время следующего срабатывания, число уведомлений)."""
+    try:
+        with connection(DATABASE_NAME) as conn:
+            rows = conn.execute(
+                "SELECT order_id, next_fire_at, notification_count FROM order_timers ORDER BY next_fire_at"
+            ).fetchall()
+        return [(order_id, datetime.strptime(next_fire_at, TIME_FORMAT), count)
+                for order_id, next_fire_at, count in rows]
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при загрузке таймеров заказов: {e}")
+        return []
+
+
+def save_order_timers(timers: List[Tuple[int, datetime, int]]) -> bool:
+    """Сохраняет таймеры заказов пачкой: (order_id, время следующего срабатывания, число уведомлений)."""
+    try:
+        with connection(DATABASE_NAME) as conn:
+            conn.executemany(
+                """
+                INSERT INTO order_timers (order_id, next_fire_at, notification_count)
+                VALUES (?, ?, ?)
+                ON CONFLICT(order_id) DO UPDATE SET
+                    next_fire_at = excluded.next_fire_at,
+                    notification_count = excluded.notification_count
+                """,
+                [(order_id, fire_at.strftime(TIME_FORMAT), count) for order_id, fire_at, count in timers]
+            )
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при сохранении таймеров заказов: {e}")
+        return False
+
+
+def delete_order_timers(order_ids: List[int]) -> bool:
+    """Удаляет таймеры заказов."""
+    try:
+        with connection(DATABASE_NAME) as conn:
+            conn.executemany("DELETE FROM order_timers WHERE order_id = ?", [(order_id,) for order_id in order_ids])
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при удалении таймеров заказов: {e}")
+        return False
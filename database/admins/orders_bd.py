@@ -1,13 +1,18 @@
 import sqlite3
 import logging
 from typing import List, Dict, Optional, Tuple, Any
+from database.connection_pool import acquire
 
 logger = logging.getLogger(__name__)
 
+# Страница заказов по статусам; {placeholders} - по одному "?" на статус.
+# План проверяет database.migrations.check_query_plans()
+ORDERS_BY_STATUS_SQL = "SELECT id, status FROM orders WHERE status IN ({placeholders}) ORDER BY id DESC LIMIT ? OFFSET ?"
+
 
 def get_db_connection():
     """Создает и возвращает соединение с БД."""
-    conn = sqlite3.connect('shop_bot.db')
+    conn = acquire('shop_bot.db')
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -45,7 +50,7 @@ def get_orders_by_status_category(category_key: str, page: int, per_page: int =
 
         # Получаем список заказов для текущей страницы
         offset = (page - 1) * per_page
-        query = f"SELECT id, status FROM orders WHERE status IN ({placeholders}) ORDER BY id DESC LIMIT ? OFFSET ?"
+        query = ORDERS_BY_STATUS_SQL.format(placeholders=placeholders)
         params = statuses + [per_page, offset]
         cursor.execute(query, params)
         orders = [dict(row) for row in cursor.fetchall()]
@@ -118,6 +123,34 @@ def get_order_by_id(order_id: int) -> Optional[Dict[str, Any]]:
         return None
 
 
+def get_order_statuses(order_ids: List[int]) -> Dict[int, str]:
+    """
+    Получает статусы нескольких заказов одним запросом.
+
+    Args:
+        order_ids: ID заказов
+
+    Returns:
+        Словарь {ID заказа: статус}; удаленных заказов в нем нет
+    """
+    if not order_ids:
+        return {}
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        placeholders = ",".join("?" * len(order_ids))
+        cursor.execute(f"SELECT id, status FROM orders WHERE id IN ({placeholders})", list(order_ids))
+        statuses = {row["id"]: row["status"] for row in cursor.fetchall()}
+
+        conn.close()
+
+        return statuses
+    except Exception as e:
+        logger.error(f"Error getting statuses for orders {order_ids}: {e}")
+        return {}
+
+
 def update_order_status(order_id: int, status: str) -> bool:
     """
     Обновляет статус заказа.
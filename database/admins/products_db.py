@@ -1,34 +1,16 @@
 import sqlite3
 from typing import List, Tuple, Optional, Dict, Any
 from config import DATABASE_NAME
-
-
-def ensure_product_status_column():
-    """Добавляет столбец is_active в таблицу products, если его нет."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-
-    try:
-        cursor.execute("PRAGMA table_info(products)")
-        columns = [info[1] for info in cursor.fetchall()]
-
-        if 'is_active' not in columns:
-            cursor.execute("ALTER TABLE products ADD COLUMN is_active INTEGER DEFAULT 1")
-            conn.commit()
-            print("Столбец is_active успешно добавлен в таблицу products")
-
-    except sqlite3.Error as e:
-        print(f"Ошибка при проверке/добавлении столбца is_active: {e}")
-
-    finally:
-        conn.close()
+from database.connection_pool import acquire
+from database.stock_events import emit_stock_changed
+from database.users.catalog_cache import invalidate_catalog_cache
 
 
 def get_paginated_products(category: Optional[str] = None, page: int = 1, per_page: int = 5) -> Tuple[List[Tuple], int]:
     """
     Получает список товаров с пагинацией, опционально фильтруя по категории.
     """
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     offset = (page - 1) * per_page
@@ -76,7 +58,7 @@ def get_paginated_products(category: Optional[str] = None, page: int = 1, per_pa
 
 def add_product(product_data: Dict[str, Any]) -> int:
     """Добавляет новый товар в базу данных."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -100,6 +82,7 @@ def add_product(product_data: Dict[str, Any]) -> int:
             )
         )
         conn.commit()
+        invalidate_catalog_cache()
         product_id = cursor.lastrowid
 
         # Проверяем предзаказы при добавлении товара
@@ -128,7 +111,7 @@ def add_product(product_data: Dict[str, Any]) -> int:
 
 def update_product(product_id: int, update_data: Dict[str, Any]) -> bool:
     """Обновляет информацию о товаре."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -157,6 +140,9 @@ def update_product(product_id: int, update_data: Dict[str, Any]) -> bool:
 
         cursor.execute(query, params)
         conn.commit()
+        invalidate_catalog_cache()
+        if 'quantity' in update_data:
+            emit_stock_changed([product_id])
 
         if current_product and old_quantity == 0 and update_data.get('quantity', 0) > 0:
             from utils.preorder_processor import preorder_processor
@@ -183,7 +169,7 @@ def update_product(product_id: int, update_data: Dict[str, Any]) -> bool:
 
 def toggle_product_status(product_id: int, is_active: bool) -> bool:
     """Активирует или деактивирует товар."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -192,6 +178,7 @@ def toggle_product_status(product_id: int, is_active: bool) -> bool:
             (1 if is_active else 0, product_id)
         )
         conn.commit()
+        invalidate_catalog_cache()
 
         return cursor.rowcount > 0
 
@@ -205,7 +192,7 @@ def toggle_product_status(product_id: int, is_active: bool) -> bool:
 
 def get_product_details(product_id: int) -> Optional[Tuple]:
     """Получает полную информацию о товаре по его ID."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -231,7 +218,7 @@ def get_product_details(product_id: int) -> Optional[Tuple]:
 
 def get_categories() -> List[str]:
     """Получает список всех категорий товаров."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -249,7 +236,7 @@ def get_categories() -> List[str]:
 
 def add_category(category_name: str) -> bool:
     """Добавляет новую категорию (создает фиктивный товар)."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -269,6 +256,7 @@ def add_category(category_name: str) -> bool:
             (category_name,)
         )
         conn.commit()
+        invalidate_catalog_cache()
         return True
 
     except sqlite3.Error as e:
@@ -281,7 +269,7 @@ def add_category(category_name: str) -> bool:
 
 def update_category(old_name: str, new_name: str) -> bool:
     """Обновляет название категории для всех товаров."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -290,6 +278,7 @@ def update_category(old_name: str, new_name: str) -> bool:
             (new_name, old_name)
         )
         conn.commit()
+        invalidate_catalog_cache()
         return cursor.rowcount > 0
 
     except sqlite3.Error as e:
@@ -302,7 +291,7 @@ def update_category(old_name: str, new_name: str) -> bool:
 
 def delete_category(category_name: str) -> bool:
     """Удаляет категорию (деактивирует все товары в этой категории)."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -311,6 +300,7 @@ def delete_category(category_name: str) -> bool:
             (category_name,)
         )
         conn.commit()
+        invalidate_catalog_cache()
         return cursor.rowcount > 0
 
     except sqlite3.Error as e:
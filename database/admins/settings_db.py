@@ -1,4 +1,6 @@
 import logging
+import threading
+from typing import Callable, Dict, List, Optional
 from database.users.database_connection import create_connection as get_db_connection
 
 
@@ -13,89 +15,97 @@ DEFAULT_NOTIFICATION_TEXT = (
     "Пожалуйста, обработайте заказ как можно скорее!"
 )
 
+# Снимок таблицы settings в памяти: читается без обращения к базе,
+# при изменении настройки заменяется целиком на новый словарь
+_snapshot: Optional[Dict[str, str]] = None
+_snapshot_lock = threading.RLock()
+_subscribers: List[Callable[[str, Optional[str], str], None]] = []
 
-def init_settings_table():
-    """Инициализирует таблицу настроек, если она не существует"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
 
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+def _get_snapshot() -> Dict[str, str]:
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is not None:
+        return snapshot
 
-        default_settings = [
-            ('order_processing_timeout', str(DEFAULT_ORDER_PROCESSING_TIMEOUT)),
-            ('notification_interval', str(DEFAULT_NOTIFICATION_INTERVAL)),
-            ('notification_text', DEFAULT_NOTIFICATION_TEXT)
-        ]
+    with _snapshot_lock:
+        if _snapshot is None:
+            try:
+                conn = get_db_connection()
+                cursor = conn.cursor()
 
-        for key, value in default_settings:
-            cursor.execute(
-                "INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)",
-                (key, value)
-            )
+                cursor.execute("SELECT key, value FROM settings")
+                _snapshot = dict(cursor.fetchall())
 
-        conn.commit()
-        conn.close()
-        logger.info("Settings table initialized successfully")
-    except Exception as e:
-        logger.error(f"Error initializing settings table: {e}")
+                conn.close()
 
+            except Exception as e:
+                logger.error(f"Error loading settings: {e}")
+                return {}
+        return _snapshot
 
-def get_setting(key: str, default: str = "") -> str:
-    """Получает значение настройки по ключу"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
 
-        cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
-        result = cursor.fetchone()
+def subscribe(callback: Callable[[str, Optional[str], str], None]) -> None:
+    """
+    Подписывает callback(key, old_value, new_value) на изменения настроек.
+    Вызывается в потоке, изменившем настройку, после фиксации в базе.
+    """
+    _subscribers.append(callback)
 
-        conn.close()
 
-        if result:
-            return result[0]
-        else:
-            init_settings_table()
-            return default
-
-    except Exception as e:
-        logger.error(f"Error getting setting {key}: {e}")
-        return default
+def get_setting(key: str, default: str = "") -> str:
+    """Получает значение настройки по ключу"""
+    return _get_snapshot().get(key, default)
 
 
 def update_setting(key: str, value: str) -> bool:
     """Обновляет значение настройки"""
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
+        try:
+            cursor = conn.cursor()
 
-        cursor.execute(
-            "UPDATE settings SET value = ?, updated_at = CURRENT_TIMESTAMP WHERE key = ?",
-            (value, key)
-        )
+            # Старое значение читается в той же транзакции до UPDATE: снимок мог быть
+            # еще не загружен, а после записи в таблице уже новое значение
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
+            row = cursor.fetchone()
+            old_value = row[0] if row else None
 
-        if cursor.rowcount == 0:
             cursor.execute(
-                "INSERT INTO settings (key, value) VALUES (?, ?)",
-                (key, value)
+                "UPDATE settings SET value = ?, updated_at = CURRENT_TIMESTAMP WHERE key = ?",
+                (value, key)
             )
 
-        conn.commit()
-        conn.close()
+            if cursor.rowcount == 0:
+                cursor.execute(
+                    "INSERT INTO settings (key, value) VALUES (?, ?)",
+                    (key, value)
+                )
+
+            conn.commit()
+        finally:
+            # Незафиксированная транзакция откатывается при возврате соединения в пул
+            conn.close()
+
+        global _snapshot
+        with _snapshot_lock:
+            if _snapshot is not None:
+                _snapshot = {**_snapshot, key: value}
 
         logger.info(f"Setting {key} updated successfully")
-        return True
 
     except Exception as e:
         logger.error(f"Error updating setting {key}: {e}")
         return False
 
+    for callback in list(_subscribers):
+        try:
+            callback(key, old_value, value)
+        except Exception as e:
+            logger.error(f"Error notifying subscriber about setting {key}: {e}")
+    return True
+
 
 def get_order_processing_timeout() -> int:
     """Получает время ожидания обработки заказа в минутах"""
@@ -125,6 +135,3 @@ def get_notification_text() -> str:
 def update_notification_text(text: str) -> bool:
     """Обновляет текст уведомления"""
     return update_setting('notification_text', text)
-
-
-init_settings_table()
\ No newline at end of file
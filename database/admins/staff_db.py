@@ -1,5 +1,8 @@
 import logging
 import sqlite3
+import threading
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from database.connection_pool import acquire
 
 DATABASE = 'shop_bot.db'
 
@@ -8,71 +11,73 @@ logger = logging.getLogger(__name__)
 
 def get_db_connection():
     """Создает соединение с базой данных shop_bot.db"""
-    conn = sqlite3.connect(DATABASE)
+    conn = acquire(DATABASE)
     conn.row_factory = sqlite3.Row
     return conn
 
 
-def create_staff_table():
-    """Создает таблицу staff если она не существует"""
+# Кэш активного персонала: список сотрудников, роль -> сотрудники и роль -> telegram_id.
+# Сбрасывается функциями, изменяющими таблицу staff
+_roster: Optional[Tuple[List[dict], Dict[str, List[dict]], Dict[str, FrozenSet[int]]]] = None
+_roster_lock = threading.Lock()
+_roster_generation = 0
+
+
+def _get_roster() -> Tuple[List[dict], Dict[str, List[dict]], Dict[str, FrozenSet[int]]]:
+    global _roster
+    roster = _roster
+    if roster is not None:
+        return roster
+
+    generation = _roster_generation
     conn = get_db_connection()
     try:
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS staff (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                telegram_id INTEGER UNIQUE NOT NULL,
-                username TEXT,
-                first_name TEXT NOT NULL,
-                last_name TEXT,
-                phone TEXT,
-                role TEXT NOT NULL,  -- 'admin', 'courier'
-                access_level INTEGER NOT NULL DEFAULT 1,
-                is_active BOOLEAN NOT NULL DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_login TIMESTAMP
-            )
-        ''')
-        conn.commit()
-        logger.info("Таблица staff создана или уже существует")
-        return True
+        query = "SELECT * FROM staff WHERE is_active = 1 ORDER BY role, first_name"
+        members = [dict(row) for row in conn.execute(query).fetchall()]
     except Exception as e:
-        logger.error(f"FAIL: Ошибка при создании таблицы staff: {e}")
-        return False
+        logger.error(f"FAIL: Ошибка при загрузке списка сотрудников: {e}")
+        return [], {}, {}
     finally:
         conn.close()
 
+    by_role: Dict[str, List[dict]] = {}
+    for member in members:
+        by_role.setdefault(member['role'], []).append(member)
+    ids_by_role = {role: frozenset(member['telegram_id'] for member in role_members)
+                   for role, role_members in by_role.items()}
+    roster = (members, by_role, ids_by_role)
+
+    with _roster_lock:
+        # Если состав изменился во время загрузки, результат не кэшируем
+        if generation == _roster_generation:
+            _roster = roster
+    return roster
+
+
+def invalidate_staff_cache():
+    """Сбрасывает кэш персонала (после изменения таблицы staff)"""
+    global _roster, _roster_generation
+    with _roster_lock:
+        _roster_generation += 1
+        _roster = None
+
+
+def get_staff_ids_by_role(role) -> FrozenSet[int]:
+    """Telegram ID активных сотрудников с ролью role (без обращения к БД, если кэш загружен)"""
+    return _get_roster()[2].get(role, frozenset())
+
 
 def get_staff_by_role(role=None):
     """Получение списка сотрудников по роли"""
-    conn = get_db_connection()
-    try:
-        if role:
-            query = "SELECT * FROM staff WHERE role = ? AND is_active = 1 ORDER BY first_name"
-            rows = conn.execute(query, (role,)).fetchall()
-        else:
-            query = "SELECT * FROM staff WHERE is_active = 1 ORDER BY role, first_name"
-            rows = conn.execute(query).fetchall()
-
-        return [dict(row) for row in rows]
-    except Exception as e:
-        logger.error(f"FAIL: Ошибка при получении сотрудников по роли: {e}")
-        return []
-    finally:
-        conn.close()
+    members, by_role, _ = _get_roster()
+    if role:
+        members = by_role.get(role, [])
+    return [dict(member) for member in members]
 
 
 def get_all_active_staff():
     """Получение всех активных сотрудников"""
-    conn = get_db_connection()
-    try:
-        query = "SELECT * FROM staff WHERE is_active = 1 ORDER BY role, first_name"
-        rows = conn.execute(query).fetchall()
-        return [dict(row) for row in rows]
-    except Exception as e:
-        logger.error(f"FAIL: Ошибка при получении всех активных сотрудников: {e}")
-        return []
-    finally:
-        conn.close()
+    return get_staff_by_role()
 
 
 def get_staff_by_id(staff_id):
@@ -113,6 +118,7 @@ def add_staff_member(telegram_id, username, first_name, last_name=None, phone=No
         """
         conn.execute(query, (telegram_id, username, first_name, last_name, phone, role, access_level))
         conn.commit()
+        invalidate_staff_cache()
         logger.info(f"Добавлен новый сотрудник: {first_name} {last_name or ''} с ролью {role}")
         return True
     except sqlite3.IntegrityError as e:
@@ -132,6 +138,7 @@ def update_staff_role(staff_id, new_role):
         query = "UPDATE staff SET role = ? WHERE id = ?"
         conn.execute(query, (new_role, staff_id))
         conn.commit()
+        invalidate_staff_cache()
         logger.info(f"Обновлена роль сотрудника ID {staff_id} на {new_role}")
         return True
     except Exception as e:
@@ -148,6 +155,7 @@ def update_staff_access_level(staff_id, new_level):
         query = "UPDATE staff SET access_level = ? WHERE id = ?"
         conn.execute(query, (new_level, staff_id))
         conn.commit()
+        invalidate_staff_cache()
         logger.info(f"Обновлен уровень доступа сотрудника ID {staff_id} на {new_level}")
         return True
     except Exception as e:
@@ -177,6 +185,7 @@ def toggle_staff_status(staff_id):
         query_update = "UPDATE staff SET is_active = ? WHERE id = ?"
         conn.execute(query_update, (new_status, staff_id))
         conn.commit()
+        invalidate_staff_cache()
 
         logger.info(f"Статус сотрудника ID {staff_id} {status_text}")
         return True
@@ -194,6 +203,7 @@ def delete_staff_member(staff_id):
         query = "DELETE FROM staff WHERE id = ?"
         conn.execute(query, (staff_id,))
         conn.commit()
+        invalidate_staff_cache()
         logger.info(f"Удален сотрудник ID {staff_id}")
         return True
     except Exception as e:
@@ -210,6 +220,7 @@ def update_staff_last_login(telegram_id):
         query = "UPDATE staff SET last_login = CURRENT_TIMESTAMP WHERE telegram_id = ?"
         conn.execute(query, (telegram_id,))
         conn.commit()
+        invalidate_staff_cache()
         logger.info(f"Обновлено время последнего входа для сотрудника с Telegram ID {telegram_id}")
         return True
     except Exception as e:
@@ -247,16 +258,6 @@ def add_new_staff_status(status_name, status_description=None):
     """
     conn = get_db_connection()
     try:
-        # Проверяем, существует ли таблица с ролями
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS staff_roles (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                role_name TEXT UNIQUE NOT NULL,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
         # Проверяем, нет ли уже такой роли
         existing = conn.execute("SELECT * FROM staff_roles WHERE role_name = ?",
                                 (status_name,)).fetchone()
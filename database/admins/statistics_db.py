@@ -1,5 +1,19 @@
 import sqlite3
 from typing import List, Dict, Tuple, Any
+from database.connection_pool import acquire
+
+# Запросы статистики; их планы проверяет database.migrations.check_query_plans()
+DELIVERED_ORDERS_COUNT_SQL = "SELECT COUNT(*) FROM orders WHERE status = 'delivered'"
+DELIVERED_ORDERS_SQL = (
+    "SELECT id as order_id, user_id, name, phone, delivery_date, delivery_time, "
+    "delivery_address, payment_method, comment, created_at, id, discount "
+    "FROM orders WHERE status = 'delivered' ORDER BY created_at DESC LIMIT ? OFFSET ?"
+)
+DELIVERED_ORDERS_PROFIT_SQL = (
+    "SELECT id, user_order_id, name, user_id, created_at, discount "
+    "FROM orders WHERE status = 'delivered' ORDER BY created_at DESC LIMIT ? OFFSET ?"
+)
+ORDER_ITEMS_SQL = "SELECT product_id, quantity, price FROM order_items WHERE order_id = ?"
 
 
 def get_total_sales_statistics() -> Tuple[int, float, float, int]:
@@ -10,7 +24,7 @@ def get_total_sales_statistics() -> Tuple[int, float, float, int]:
         Tuple[int, float, float, int]: (общее_количество_заказов, общая_сумма_продаж,
                                        средний_чек, количество_доставленных_заказов)
     """
-    conn = sqlite3.connect('shop_bot.db')
+    conn = acquire('shop_bot.db')
     cursor = conn.cursor()
 
     # Общее количество заказов
@@ -50,17 +64,17 @@ def get_delivered_orders(page: int, page_size: int = 5) -> Tuple[List[Dict[str,
     Returns:
         Tuple[List[Dict[str, Any]], int]: (список_заказов, общее_количество_страниц)
     """
-    shop_conn = sqlite3.connect('shop_bot.db')
+    shop_conn = acquire('shop_bot.db')
     shop_conn.row_factory = sqlite3.Row
     shop_cursor = shop_conn.cursor()
 
     # Подключение к базе данных склада для получения информации о товарах
-    warehouse_conn = sqlite3.connect('warehouse.db')
+    warehouse_conn = acquire('warehouse.db')
     warehouse_conn.row_factory = sqlite3.Row
     warehouse_cursor = warehouse_conn.cursor()
 
     # Получаем общее количество доставленных заказов
-    shop_cursor.execute("SELECT COUNT(*) FROM orders WHERE status = 'delivered'")
+    shop_cursor.execute(DELIVERED_ORDERS_COUNT_SQL)
     total_orders = shop_cursor.fetchone()[0]
 
     # Рассчитываем общее количество страниц
@@ -68,14 +82,7 @@ def get_delivered_orders(page: int, page_size: int = 5) -> Tuple[List[Dict[str,
 
     # Получаем информацию о заказах с пагинацией (добавлен discount)
     offset = (page - 1) * page_size
-    shop_cursor.execute("""
-        SELECT id as order_id, user_id, name, phone, delivery_date, delivery_time, 
-               delivery_address, payment_method, comment, created_at, id, discount
-        FROM orders 
-        WHERE status = 'delivered'
-        ORDER BY created_at DESC
-        LIMIT ? OFFSET ?
-    """, (page_size, offset))
+    shop_cursor.execute(DELIVERED_ORDERS_SQL, (page_size, offset))
 
     orders = []
     for order in shop_cursor.fetchall():
@@ -84,11 +91,7 @@ def get_delivered_orders(page: int, page_size: int = 5) -> Tuple[List[Dict[str,
         discount = order_dict.get('discount', 0) or 0  # Абсолютное значение в рублях
 
         # Получаем товары для этого заказа
-        shop_cursor.execute("""
-            SELECT product_id, quantity, price
-            FROM order_items
-            WHERE order_id = ?
-        """, (order_id,))
+        shop_cursor.execute(ORDER_ITEMS_SQL, (order_id,))
 
         items = []
         total_amount = 0
@@ -151,12 +154,12 @@ def get_profit_statistics(page: int, page_size: int = 5) -> Tuple[List[Dict[str,
     Returns:
         Tuple[List[Dict[str, Any]], int]: (список_с_прибылью, общее_количество_страниц)
     """
-    shop_conn = sqlite3.connect('shop_bot.db')
+    shop_conn = acquire('shop_bot.db')
     shop_conn.row_factory = sqlite3.Row
     shop_cursor = shop_conn.cursor()
 
     # Получаем общее количество доставленных заказов
-    shop_cursor.execute("SELECT COUNT(*) FROM orders WHERE status = 'delivered'")
+    shop_cursor.execute(DELIVERED_ORDERS_COUNT_SQL)
     total_orders = shop_cursor.fetchone()[0]
 
     # Рассчитываем общее количество страниц
@@ -164,13 +167,7 @@ def get_profit_statistics(page: int, page_size: int = 5) -> Tuple[List[Dict[str,
 
     # Получаем заказы с пагинацией (добавлен discount)
     offset = (page - 1) * page_size
-    shop_cursor.execute("""
-        SELECT id, user_order_id, name, user_id, created_at, discount
-        FROM orders 
-        WHERE status = 'delivered'
-        ORDER BY created_at DESC
-        LIMIT ? OFFSET ?
-    """, (page_size, offset))
+    shop_cursor.execute(DELIVERED_ORDERS_PROFIT_SQL, (page_size, offset))
 
     orders_data = []
     for order in shop_cursor.fetchall():
@@ -179,11 +176,7 @@ def get_profit_statistics(page: int, page_size: int = 5) -> Tuple[List[Dict[str,
         discount = order_dict.get('discount', 0) or 0  # Абсолютное значение в рублях
 
         # Получаем детали заказа для расчета выручки
-        shop_cursor.execute("""
-            SELECT product_id, quantity, price
-            FROM order_items
-            WHERE order_id = ?
-        """, (order_id,))
+        shop_cursor.execute(ORDER_ITEMS_SQL, (order_id,))
 
         total_revenue_before_discount = 0
         items = []
@@ -3,35 +3,6 @@ import datetime
 from typing import List, Dict, Optional, Tuple
 
 
-def create_stock_thresholds_table(conn: sqlite3.Connection) -> None:
-    """
-    Создает таблицы для системы уведомлений о низком остатке товаров
-    """
-    cursor = conn.cursor()
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS stock_thresholds (
-        product_id INTEGER PRIMARY KEY,
-        threshold INTEGER NOT NULL,
-        last_notification_date TEXT
-    )
-    ''')
-
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS stock_notification_log (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        product_id INTEGER NOT NULL,
-        product_name TEXT NOT NULL,
-        current_stock INTEGER NOT NULL,
-        threshold INTEGER NOT NULL,
-        notification_time TEXT NOT NULL,
-        delivered INTEGER NOT NULL DEFAULT 0,
-        FOREIGN KEY (product_id) REFERENCES products(id)
-    )
-    ''')
-
-    conn.commit()
-
-
 def set_product_threshold(conn: sqlite3.Connection, product_id: int, threshold: int) -> None:
     """
     Устанавливает порог уведомления для товара
@@ -79,6 +50,57 @@ def update_last_notification_date(conn: sqlite3.Connection, product_id: int) ->
     conn.commit()
 
 
+def update_last_notification_dates(conn: sqlite3.Connection, product_ids: List[int]) -> None:
+    """
+    Обновляет дату последнего уведомления для нескольких товаров
+    """
+    now = datetime.datetime.now().isoformat()
+    cursor = conn.cursor()
+    cursor.executemany(
+        "UPDATE stock_thresholds SET last_notification_date = ? WHERE product_id = ?",
+        [(now, product_id) for product_id in product_ids]
+    )
+    conn.commit()
+
+
+def get_low_stock_products(
+        conn: sqlite3.Connection,
+        notified_before: Optional[str] = None,
+        product_ids: Optional[List[int]] = None
+) -> List[Dict]:
+    """
+    Получает товары с остатком на уровне порога или ниже одним запросом.
+    Требует подключенной базы склада (conn.attach(..., 'warehouse')).
+    notified_before - товары, уведомление о которых отправлялось позже этой даты, пропускаются
+    product_ids - проверять только эти товары (по умолчанию - все товары с порогами)
+    """
+    params = [notified_before, notified_before]
+    product_filter = ""
+    if product_ids is not None:
+        if not product_ids:
+            return []
+        product_filter = f"AND t.product_id IN ({','.join('?' * len(product_ids))})"
+        params.extend(product_ids)
+
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""
+        SELECT p.id, p.product_full_name, p.quantity, t.threshold
+        FROM stock_thresholds t
+        JOIN warehouse.products p ON p.id = t.product_id
+        WHERE p.quantity <= t.threshold
+          AND (? IS NULL OR t.last_notification_date IS NULL OR t.last_notification_date < ?)
+          {product_filter}
+        ORDER BY p.category, p.product_full_name
+        """,
+        params
+    )
+    return [
+        {"product_id": product_id, "product_name": product_name, "quantity": quantity, "threshold": threshold}
+        for product_id, product_name, quantity, threshold in cursor.fetchall()
+    ]
+
+
 def get_last_notification_date(conn: sqlite3.Connection, product_id: int) -> Optional[str]:
     """
     Получает дату последнего уведомления для товара
@@ -117,6 +139,40 @@ def log_stock_notification(
     return cursor.lastrowid
 
 
+def log_stock_notifications(conn: sqlite3.Connection, products: List[Dict], delivered: bool = False) -> List[int]:
+    """
+    Добавляет в журнал записи по нескольким товарам одной транзакцией
+    """
+    now = datetime.datetime.now().isoformat()
+    cursor = conn.cursor()
+    notification_ids = []
+    for product in products:
+        cursor.execute(
+            """
+            INSERT INTO stock_notification_log 
+            (product_id, product_name, current_stock, threshold, notification_time, delivered)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (product["product_id"], product["product_name"], product["quantity"], product["threshold"],
+             now, 1 if delivered else 0)
+        )
+        notification_ids.append(cursor.lastrowid)
+    conn.commit()
+    return notification_ids
+
+
+def update_notifications_delivered(conn: sqlite3.Connection, notification_ids: List[int], delivered: bool = True) -> None:
+    """
+    Обновляет статус доставки нескольких уведомлений
+    """
+    cursor = conn.cursor()
+    cursor.executemany(
+        "UPDATE stock_notification_log SET delivered = ? WHERE id = ?",
+        [(1 if delivered else 0, notification_id) for notification_id in notification_ids]
+    )
+    conn.commit()
+
+
 def update_notification_delivered(conn: sqlite3.Connection, notification_id: int, delivered: bool = True) -> None:
     """
     Обновляет статус доставки уведомления
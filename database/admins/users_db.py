@@ -1,21 +1,28 @@
 import logging
 import sqlite3
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Any
 from datetime import datetime, timedelta
+from database.connection_pool import acquire
 
 DATABASE_NAME = 'shop_bot.db'
 
 logger = logging.getLogger(__name__)
 
+# Пользователи, которым бот не может писать (заблокировали бота, удалили аккаунт)
+UNREACHABLE_USER = "SELECT 1 FROM user_reachability AS r WHERE r.user_id = {column} AND r.is_reachable = 0"
+
 
 def get_all_users() -> List[Tuple]:
-    """Получает список всех пользователей из базы данных."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    """Получает список всех пользователей, доступных для сообщений бота."""
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
         cursor.execute(
-            "SELECT telegram_id, username, first_name, last_name, first_login_date FROM users"
+            f"""
+            SELECT telegram_id, username, first_name, last_name, first_login_date FROM users
+            WHERE NOT EXISTS ({UNREACHABLE_USER.format(column="telegram_id")})
+            """
         )
         users = cursor.fetchall()
         return users
@@ -30,16 +37,17 @@ def get_all_users() -> List[Tuple]:
 
 def get_active_users(days: int = 30) -> List[int]:
     """Получает ID пользователей, делавших заказы за последние N дней."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
         cutoff_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
 
         cursor.execute(
-            """
+            f"""
             SELECT DISTINCT user_id FROM orders 
-            WHERE order_date >= ?
+            WHERE created_at >= ?
+              AND NOT EXISTS ({UNREACHABLE_USER.format(column="user_id")})
             """,
             (cutoff_date,)
         )
@@ -55,28 +63,28 @@ def get_active_users(days: int = 30) -> List[int]:
         conn.close()
 
 
-def get_user_regions() -> Dict[str, List[int]]:
-    """Получает список пользователей по регионам."""
-    conn = sqlite3.connect(DATABASE_NAME)
+# Регион адреса - первая часть адреса до запятой ("г. Москва, ул. Пушкина, д. 5" -> "г. Москва")
+ADDRESS_REGION = (
+    "TRIM(CASE WHEN instr(address, ',') > 0 THEN substr(address, 1, instr(address, ',') - 1) ELSE address END)"
+)
+
+
+def get_user_regions() -> Dict[str, int]:
+    """Получает количество пользователей по регионам их адресов."""
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
         cursor.execute(
-            """
-            SELECT address_region, user_id FROM user_addresses
-            GROUP BY user_id
+            f"""
+            SELECT {ADDRESS_REGION} AS region, COUNT(DISTINCT telegram_id) FROM user_addresses
+            WHERE NOT EXISTS ({UNREACHABLE_USER.format(column="telegram_id")})
+            GROUP BY region
+            ORDER BY region
             """
         )
 
-        regions = {}
-        for row in cursor.fetchall():
-            region, user_id = row
-            if region:
-                if region not in regions:
-                    regions[region] = []
-                regions[region].append(user_id)
-
-        return regions
+        return {region: count for region, count in cursor.fetchall() if region}
 
     except sqlite3.Error as e:
         print(f"Ошибка при получении пользователей по регионам: {e}")
@@ -86,13 +94,144 @@ def get_user_regions() -> Dict[str, List[int]]:
         conn.close()
 
 
+# Аудитории рассылок: (столбец с ID пользователя, таблица, условие отбора)
+RECIPIENT_SOURCES = {
+    "all": ("telegram_id", "users", "1"),
+    "active": ("user_id", "orders", "created_at >= :cutoff"),
+    "region": ("telegram_id", "user_addresses", f"{ADDRESS_REGION} = :region"),
+}
+
+
+def _recipient_params(target_params: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "cutoff": (datetime.now() - timedelta(days=target_params.get("active_days", 30))).strftime("%Y-%m-%d %H:%M:%S"),
+        "region": target_params.get("region", ""),
+    }
+
+
+def get_recipient_ids(target_type: str, target_params: Dict[str, Any],
+                      after_id: int = None, limit: int = 1000) -> List[int]:
+    """
+    Получает следующую порцию ID получателей рассылки (после after_id): по возрастанию,
+    без повторов и без недоступных пользователей.
+    Аудитория фильтруется в SQL, поэтому выбор не держит в памяти весь список пользователей.
+    """
+    source = RECIPIENT_SOURCES.get(target_type)
+    if source is None:
+        return []
+    column, table, condition = source
+
+    params = _recipient_params(target_params)
+    params["after_id"] = after_id if after_id is not None else -2 ** 63
+    params["limit"] = limit
+
+    conn = acquire(DATABASE_NAME)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            f"""
+            SELECT DISTINCT {column} FROM {table}
+            WHERE {condition} AND {column} > :after_id
+              AND NOT EXISTS ({UNREACHABLE_USER.format(column=column)})
+            ORDER BY {column}
+            LIMIT :limit
+            """,
+            params
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    except sqlite3.Error as e:
+        print(f"Ошибка при выборе получателей рассылки: {e}")
+        return []
+
+    finally:
+        conn.close()
+
+
+def count_recipients(target_type: str, target_params: Dict[str, Any]) -> int:
+    """Считает получателей рассылки тем же отбором, что и get_recipient_ids, не выбирая их список."""
+    source = RECIPIENT_SOURCES.get(target_type)
+    if source is None:
+        return 0
+
+    conn = acquire(DATABASE_NAME)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(_recipient_count_query(*source), _recipient_params(target_params))
+        return cursor.fetchone()[0]
+
+    except sqlite3.Error as e:
+        print(f"Ошибка при подсчете получателей рассылки: {e}")
+        return 0
+
+    finally:
+        conn.close()
+
+
+def _recipient_count_query(column: str, table: str, condition: str) -> str:
+    return f"""
+        SELECT COUNT(DISTINCT {column}) FROM {table}
+        WHERE {condition}
+          AND NOT EXISTS ({UNREACHABLE_USER.format(column=column)})
+    """
+
+
+def check_recipient_sources() -> None:
+    """
+    Проверяет, что запросы всех аудиторий рассылок выполняются на текущей схеме
+    (при запуске бота, после миграций). Ошибки в запросах иначе проглатываются,
+    и рассылка "успешно" завершается без получателей.
+    """
+    conn = acquire(DATABASE_NAME)
+    try:
+        for target_type, source in RECIPIENT_SOURCES.items():
+            try:
+                conn.execute("EXPLAIN " + _recipient_count_query(*source), _recipient_params({}))
+            except sqlite3.Error as e:
+                raise RuntimeError(f"Запрос аудитории рассылки '{target_type}' не выполняется: {e}") from e
+    finally:
+        conn.close()
+
+
+def count_pruned_recipients(target_type: str, target_params: Dict[str, Any]) -> int:
+    """Считает пользователей аудитории рассылки, исключенных как недоступные."""
+    source = RECIPIENT_SOURCES.get(target_type)
+    if source is None:
+        return 0
+    column, table, condition = source
+
+    conn = acquire(DATABASE_NAME)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            f"""
+            SELECT COUNT(DISTINCT {column}) FROM {table}
+            WHERE {condition} AND EXISTS ({UNREACHABLE_USER.format(column=column)})
+            """,
+            _recipient_params(target_params)
+        )
+        return cursor.fetchone()[0]
+
+    except sqlite3.Error as e:
+        print(f"Ошибка при подсчете недоступных получателей рассылки: {e}")
+        return 0
+
+    finally:
+        conn.close()
+
+
 def count_users() -> int:
-    """Получает общее количество пользователей."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    """Получает количество пользователей, доступных для сообщений бота."""
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
-        cursor.execute("SELECT COUNT(*) FROM users")
+        cursor.execute(
+            f"SELECT COUNT(*) FROM users WHERE NOT EXISTS ({UNREACHABLE_USER.format(column='telegram_id')})"
+        )
         count = cursor.fetchone()[0]
         return count
 
@@ -106,7 +245,7 @@ def count_users() -> int:
 
 def get_username_by_telegram_id(telegram_id: int) -> str | None:
     """Получает username пользователя по telegram_id из базы данных."""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
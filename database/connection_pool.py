@@ -0,0 +1,309 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 5
+
+# Профиль PRAGMA, применяемый к каждому новому соединению.
+# WAL позволяет читателям работать параллельно с писателем, busy_timeout
+# заставляет ждать освобождения блокировки вместо ошибки "database is locked".
+DEFAULT_PRAGMAS: Dict[str, object] = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # мс
+    'cache_size': -16000,  # отрицательное значение - размер в КиБ (~16 МБ)
+    'mmap_size': 134217728,  # 128 МБ
+    'temp_store': 'MEMORY',
+}
+
+# Индивидуальные PRAGMA для отдельных файлов, дополняют DEFAULT_PRAGMAS.
+# Небольшим базам скидок и предзаказов не нужен большой кэш и отображение в память.
+DATABASE_PRAGMAS: Dict[str, Dict[str, object]] = {
+    'discounts.db': {'cache_size': -2000, 'mmap_size': 0},
+    'preorders.db': {'cache_size': -2000, 'mmap_size': 0},
+}
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Соединение SQLite, которое при close() возвращается в пул, а не закрывается.
+    Остальное поведение полностью совпадает с sqlite3.Connection, поэтому
+    существующий код (conn.cursor(), conn.commit(), with conn: ...) работает без изменений.
+    """
+
+    _pool: Optional["ConnectionPool"] = None
+    _checked_out: bool = False
+    _attached: Optional[Dict[str, str]] = None
+
+    def attach(self, db_path: str, alias: str) -> None:
+        """
+        Подключает другой файл базы данных под именем alias (ATTACH DATABASE).
+        Подключение сохраняется вместе с соединением в пуле, поэтому выполняется один раз.
+        """
+        path = _key(db_path)
+        if self._attached is None:
+            self._attached = {}
+        if self._attached.get(alias) == path:
+            return
+        self.execute("ATTACH DATABASE ? AS " + alias, (path,))
+        self._attached[alias] = path
+
+    def close(self):
+        """Возвращает соединение в пул. Повторный вызов ничего не делает."""
+        pool = self._pool
+        if pool is None:
+            super().close()
+            return
+        if not self._checked_out:
+            return
+        self._checked_out = False
+        pool.release(self)
+
+    def discard(self):
+        """Закрывает соединение по-настоящему, минуя пул."""
+        self._pool = None
+        self._checked_out = False
+        super().close()
+
+
+class ConnectionPool:
+    """
+    Ограниченный пул соединений к одному файлу базы данных.
+
+    В пуле хранится не более pool_size свободных соединений. Если все они заняты,
+    открывается дополнительное соединение, которое при возврате закрывается,
+    поэтому забытый close() не может заблокировать цикл событий.
+    """
+
+    def __init__(self, db_path: str, pool_size: int = DEFAULT_POOL_SIZE, pragmas: Optional[Dict[str, object]] = None):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self._idle: "queue.LifoQueue[PooledConnection]" = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+
+    def _open(self) -> PooledConnection:
+        conn = sqlite3.connect(self.db_path, factory=PooledConnection, check_same_thread=False)
+        try:
+            for name, value in self.pragmas.items():
+                if value is not None:
+                    conn.execute(f"PRAGMA {name} = {value}")
+        except sqlite3.Error:
+            conn.discard()
+            raise
+        conn._pool = self
+        with self._lock:
+            self.connects += 1
+        logger.debug(f"Открыто новое соединение с базой данных {self.db_path}")
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        """Выдает свободное соединение из пула или открывает новое."""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._open()
+        conn._checked_out = True
+        with self._lock:
+            self.checkouts += 1
+        return conn
+
+    def release(self, conn: PooledConnection) -> None:
+        """Возвращает соединение в пул, откатывая незавершенную транзакцию."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+            self._idle.put_nowait(conn)
+        except (sqlite3.Error, queue.Full):
+            conn.discard()
+
+    def close_all(self) -> None:
+        """Закрывает все свободные соединения пула."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.discard()
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+_settings: Dict[str, dict] = {}
+
+
+def _key(db_path: str) -> str:
+    return os.path.abspath(db_path)
+
+
+def _profile_pragmas(db_path: str) -> Dict[str, object]:
+    """Собирает PRAGMA для файла: профиль по умолчанию плюс DATABASE_PRAGMAS."""
+    key = _key(db_path)
+    for path, overrides in DATABASE_PRAGMAS.items():
+        if _key(path) == key:
+            return {**DEFAULT_PRAGMAS, **overrides}
+    return dict(DEFAULT_PRAGMAS)
+
+
+def configure(db_path: str, pool_size: Optional[int] = None, pragmas: Optional[Dict[str, object]] = None) -> None:
+    """
+    Задает размер пула и PRAGMA для файла базы данных.
+    Переданные PRAGMA дополняют профиль файла; значение None отключает PRAGMA профиля.
+    Настройки применяются к соединениям, открытым после вызова.
+    """
+    key = _key(db_path)
+    with _pools_lock:
+        settings = _settings.setdefault(key, {})
+        if pool_size is not None:
+            settings['pool_size'] = pool_size
+        if pragmas is not None:
+            settings['pragmas'] = {**_profile_pragmas(db_path), **pragmas}
+        pool = _pools.pop(key, None)
+    if pool:
+        pool.close_all()
+
+
+def get_pool(db_path: str) -> ConnectionPool:
+    """Возвращает пул для файла базы данных, создавая его при первом обращении."""
+    key = _key(db_path)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                settings = _settings.get(key, {})
+                pool = ConnectionPool(
+                    db_path,
+                    pool_size=settings.get('pool_size', DEFAULT_POOL_SIZE),
+                    pragmas=settings.get('pragmas') or _profile_pragmas(db_path),
+                )
+                _pools[key] = pool
+    return pool
+
+
+def acquire(db_path: str) -> PooledConnection:
+    """Берет соединение из пула. Вызов close() вернет его обратно."""
+    return get_pool(db_path).acquire()
+
+
+@contextmanager
+def connection(db_path: str) -> Iterator[PooledConnection]:
+    """
+    Контекстный менеджер выдачи соединения из пула.
+    При успешном выходе транзакция фиксируется, при исключении откатывается,
+    после чего соединение возвращается в пул.
+    """
+    conn = acquire(db_path)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def close_all_pools() -> None:
+    """Закрывает свободные соединения всех пулов (при остановке бота)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
+
+
+def check_pragmas(db_path: str) -> Dict[str, object]:
+    """
+    Читает фактические значения PRAGMA профиля для файла базы данных и пишет их в лог.
+    Предупреждает, если режим журнала не удалось установить (например, WAL на сетевом диске).
+    """
+    pool = get_pool(db_path)
+    conn = pool.acquire()
+    try:
+        effective = {
+            name: conn.execute(f"PRAGMA {name}").fetchone()[0]
+            for name, value in pool.pragmas.items()
+            if value is not None
+        }
+    finally:
+        conn.close()
+
+    logger.info(f"Настройки SQLite для {db_path}: " + ", ".join(f"{k}={v}" for k, v in effective.items()))
+
+    expected_mode = pool.pragmas.get('journal_mode')
+    actual_mode = effective.get('journal_mode')
+    if expected_mode and str(actual_mode).lower() != str(expected_mode).lower():
+        logger.warning(f"Для {db_path} не удалось включить journal_mode={expected_mode}, используется {actual_mode}")
+
+    return effective
+
+
+def pool_stats() -> Dict[str, Dict[str, int]]:
+    """Возвращает количество открытых соединений и выдач по каждому пулу."""
+    return {
+        pool.db_path: {'connects': pool.connects, 'checkouts': pool.checkouts}
+        for pool in list(_pools.values())
+    }
+
+
+if __name__ == "__main__":
+    # Сравнение количества подключений на один апдейт каталога: до и после пула
+    import tempfile
+    import time
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    updates = 1000
+    tmp_dir = tempfile.mkdtemp()
+    db_file = os.path.join(tmp_dir, "bench_warehouse.db")
+
+    setup = sqlite3.connect(db_file)
+    setup.execute(
+        "CREATE TABLE products (id INTEGER PRIMARY KEY, category TEXT, product_name TEXT, "
+        "flavor TEXT, price REAL, quantity INTEGER)"
+    )
+    setup.executemany(
+        "INSERT INTO products (category, product_name, flavor, price, quantity) VALUES (?, ?, ?, ?, ?)",
+        [(f"cat{i % 5}", f"line{i % 20}", f"flavor{i}", 100.0, i % 7) for i in range(500)]
+    )
+    setup.commit()
+    setup.close()
+
+    queries = [
+        ("SELECT DISTINCT category FROM products", ()),
+        ("SELECT DISTINCT product_name FROM products WHERE category = ? AND quantity > 0", ("cat1",)),
+        ("SELECT id, flavor, price FROM products WHERE category = ? AND product_name = ? AND quantity > 0",
+         ("cat1", "line1")),
+    ]
+
+    raw_connects = 0
+    started = time.perf_counter()
+    for _ in range(updates):
+        for sql, params in queries:
+            raw = sqlite3.connect(db_file)
+            raw_connects += 1
+            raw.execute(sql, params).fetchall()
+            raw.close()
+    raw_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(updates):
+        for sql, params in queries:
+            pooled = acquire(db_file)
+            pooled.execute(sql, params).fetchall()
+            pooled.close()
+    pooled_elapsed = time.perf_counter() - started
+    pooled_connects = get_pool(db_file).connects
+
+    print(f"Апдейтов каталога: {updates}, запросов на апдейт: {len(queries)}")
+    print(f"Без пула: {raw_connects / updates:.3f} подключений на апдейт, {raw_elapsed * 1000 / updates:.3f} мс на апдейт")
+    print(f"С пулом:  {pooled_connects / updates:.3f} подключений на апдейт, {pooled_elapsed * 1000 / updates:.3f} мс на апдейт")
+
+    close_all_pools()
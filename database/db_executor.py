@@ -0,0 +1,39 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+DB_READER_THREADS = 4
+
+# Все записи выполняются в одном потоке: SQLite допускает только одного писателя,
+# поэтому очередь на уровне потока дешевле, чем ожидание блокировки файла.
+_writer_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+_reader_executor = ThreadPoolExecutor(max_workers=DB_READER_THREADS, thread_name_prefix="db-reader")
+
+
+async def db_read(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Выполняет синхронную функцию чтения из database/* в пуле потоков-читателей,
+    не блокируя цикл событий.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_reader_executor, functools.partial(func, *args, **kwargs))
+
+
+async def db_write(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Выполняет синхронную функцию записи из database/* в единственном потоке-писателе,
+    не блокируя цикл событий.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_writer_executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown_db_executors(wait: bool = True) -> None:
+    """Останавливает потоки доступа к базе данных (при остановке бота)."""
+    _reader_executor.shutdown(wait=wait)
+    _writer_executor.shutdown(wait=wait)
+    logger.info("Потоки доступа к базе данных остановлены")
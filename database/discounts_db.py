@@ -1,114 +1,41 @@
 import sqlite3
 import datetime
+import threading
+from database.connection_pool import acquire
+
+# Индекс акций, активных сегодня: (дата, {product_id: [акции]}, [акции на все товары]).
+# Общий для всех экземпляров DiscountsDatabase; сбрасывается при изменении акций.
+_action_index = None
+_action_index_generation = 0
+_action_index_lock = threading.Lock()
+
+
+def invalidate_action_index():
+    """Сбрасывает индекс активных акций (после изменения акций)"""
+    global _action_index, _action_index_generation
+    with _action_index_lock:
+        _action_index = None
+        _action_index_generation += 1
+
+
+def validate_promo_code(code_text: str, user_id: int):
+    """
+    Проверяет промокод для пользователя на отдельном соединении из пула.
+    Общий экземпляр DiscountsDatabase держит один курсор, поэтому из потоков-читателей
+    (db_read) используется эта функция.
+    """
+    db = DiscountsDatabase()
+    try:
+        return db.validate_promo_code_for_user(code_text, user_id)
+    finally:
+        db.close()
 
 
 class DiscountsDatabase:
     def __init__(self, db_file="discounts.db"):
         """Инициализация соединения с базой данных."""
-        self.connection = sqlite3.connect(db_file)
+        self.connection = acquire(db_file)
         self.cursor = self.connection.cursor()
-        self._create_tables()
-
-    def _create_tables(self):
-        """Создание таблиц, если они не существуют."""
-        with self.connection:
-            # Таблица промокодов
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS promo_codes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    code TEXT NOT NULL UNIQUE,
-                    description TEXT,
-                    discount_type TEXT NOT NULL CHECK(discount_type IN ('percentage', 'fixed_amount')),
-                    discount_value REAL NOT NULL,
-                    min_order_amount REAL DEFAULT 0,
-                    start_date TEXT NOT NULL,
-                    end_date TEXT NOT NULL,
-                    is_active BOOLEAN NOT NULL DEFAULT 1,
-                    max_uses INTEGER DEFAULT 999999,
-                    current_uses INTEGER DEFAULT 0,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    created_by_id INTEGER,
-                    created_by_username TEXT
-                )
-            """)
-            # Таблица использования промокодов
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS promo_code_usage (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    promo_code_id INTEGER,
-                    user_id INTEGER NOT NULL,
-                    order_id INTEGER,
-                    used_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    discount_amount REAL NOT NULL,
-                    order_total REAL NOT NULL,
-                    FOREIGN KEY (promo_code_id) REFERENCES promo_codes(id)
-                )
-            """)
-            # Таблица "Товар дня"
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS daily_deals (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    product_id INTEGER NOT NULL,
-                    description TEXT,
-                    discount_type TEXT NOT NULL CHECK(discount_type IN ('percentage', 'fixed_amount')),
-                    discount_value REAL NOT NULL,
-                    deal_date TEXT NOT NULL UNIQUE,
-                    is_active BOOLEAN NOT NULL DEFAULT 1,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            # Таблица использования "Товара дня" (может быть полезна для аналитики)
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS daily_deal_usage (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    daily_deal_id INTEGER,
-                    user_id INTEGER NOT NULL,
-                    order_id INTEGER NOT NULL,
-                    used_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    discount_amount REAL NOT NULL,
-                    order_total REAL NOT NULL,
-                    FOREIGN KEY (daily_deal_id) REFERENCES daily_deals(id)
-                )
-            """)
-            # Таблица просмотров промокодов
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS promo_code_views (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    promo_code_id INTEGER,
-                    user_id INTEGER NOT NULL,
-                    viewed_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (promo_code_id) REFERENCES promo_codes(id)
-                )
-            """)
-            # Таблица категорий для промокодов
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS promo_product_categories (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    promo_code_id INTEGER,
-                    category TEXT NOT NULL,
-                    FOREIGN KEY (promo_code_id) REFERENCES promo_codes(id)
-                )
-            """)
-
-            self.cursor.execute("DROP TABLE IF EXISTS daily_deals")
-            self.cursor.execute("DROP TABLE IF EXISTS daily_deal_usage")
-
-            self.cursor.execute("""
-                            CREATE TABLE IF NOT EXISTS actions (
-                                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                                title TEXT NOT NULL,
-                                description TEXT NOT NULL,
-                                product_id INTEGER, -- Необязательное поле
-                                discount_type TEXT NOT NULL CHECK(discount_type IN ('percentage', 'fixed_amount')),
-                                discount_value REAL NOT NULL,
-                                start_date TEXT NOT NULL,
-                                end_date TEXT NOT NULL,
-                                is_active BOOLEAN NOT NULL DEFAULT 1,
-                                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                                created_by_id INTEGER,
-                                created_by_username TEXT
-                            )
-                        """)
 
     def add_dummy_data(self):
         """Добавление тестовых данных для демонстрации."""
@@ -285,6 +212,7 @@ class DiscountsDatabase:
                    INSERT INTO actions (title, description, product_id, discount_type, discount_value, start_date, end_date, is_active, created_by_id, created_by_username)
                    VALUES (:title, :description, :product_id, :discount_type, :discount_value, :start_date, :end_date, 1, :created_by_id, :created_by_username)
                """, data)
+        invalidate_action_index()
 
     def get_all_actions(self):
         """Получает все акции, сортируя их по дате окончания."""
@@ -300,11 +228,13 @@ class DiscountsDatabase:
         """Изменяет статус активности акции."""
         with self.connection:
             self.cursor.execute("UPDATE actions SET is_active = ? WHERE id = ?", (is_active, action_id))
+        invalidate_action_index()
 
     def delete_action(self, action_id: int):
         """Удаляет акцию."""
         with self.connection:
             self.cursor.execute("DELETE FROM actions WHERE id = ?", (action_id,))
+        invalidate_action_index()
 
         # --- МЕТОДЫ ДЛЯ АКЦИЙ (КЛИЕНТ) ---
 
@@ -369,54 +299,68 @@ class DiscountsDatabase:
 
         return promo_dict, "Промокод успешно применен!"
 
-    def get_active_actions_for_products(self, cart_items):
-        """Получает активные акции, применимые к товарам в корзине."""
+    def _get_action_index(self):
+        """
+        Возвращает индекс акций, активных сегодня: (дата, {product_id: [акции]}, [акции на все товары]).
+        Индекс общий для всех экземпляров и перестраивается при смене даты или после изменения акций.
+        """
+        global _action_index
         today = datetime.date.today().isoformat()
+        index = _action_index
+        if index is not None and index[0] == today:
+            return index
 
-        applicable_actions = []
+        with _action_index_lock:
+            generation = _action_index_generation
 
-        # Получаем все активные акции
         self.cursor.execute("""
             SELECT id, title, description, product_id, discount_type, discount_value
             FROM actions
             WHERE is_active = 1
               AND date(start_date) <= ?
               AND date(end_date) >= ?
+            ORDER BY id
         """, (today, today))
 
-        active_actions = self.cursor.fetchall()
-
-        for action in active_actions:
-            action_id, title, description, product_id, discount_type, discount_value = action
-
-            # Если акция на конкретный товар
+        by_product = {}
+        for_all_products = []
+        for action_id, title, description, product_id, discount_type, discount_value in self.cursor.fetchall():
+            action = {
+                'action_id': action_id,
+                'title': title,
+                'description': description,
+                'product_id': product_id or None,
+                'discount_type': discount_type,
+                'discount_value': discount_value
+            }
             if product_id:
-                for item in cart_items:
-                    if item['product_id'] == product_id:
-                        applicable_actions.append({
-                            'action_id': action_id,
-                            'title': title,
-                            'description': description,
-                            'product_id': product_id,
-                            'discount_type': discount_type,
-                            'discount_value': discount_value,
-                            'applicable_items': [item],
-                            'scope': 'product'
-                        })
+                by_product.setdefault(product_id, []).append(action)
             else:
                 # Акция на категорию или линейку (определяем по описанию)
                 # Для простоты будем считать, что если product_id = NULL, то акция на все товары
-                applicable_actions.append({
-                    'action_id': action_id,
-                    'title': title,
-                    'description': description,
-                    'product_id': None,
-                    'discount_type': discount_type,
-                    'discount_value': discount_value,
-                    'applicable_items': cart_items,
-                    'scope': 'all'
-                })
+                for_all_products.append(action)
+
+        index = (today, by_product, for_all_products)
+        with _action_index_lock:
+            # Если акции изменились во время построения, индекс не сохраняем
+            if generation == _action_index_generation:
+                _action_index = index
+        return index
+
+    def get_active_actions_for_products(self, cart_items):
+        """Получает активные акции, применимые к товарам в корзине (по индексу в памяти, без запросов к БД)."""
+        _, by_product, for_all_products = self._get_action_index()
+
+        applicable_actions = []
+        for item in cart_items:
+            for action in by_product.get(item['product_id'], ()):
+                applicable_actions.append({**action, 'applicable_items': [item], 'scope': 'product'})
+
+        for action in for_all_products:
+            applicable_actions.append({**action, 'applicable_items': cart_items, 'scope': 'all'})
 
+        # Порядок акций важен: товар получает скидку первой из применимых акций
+        applicable_actions.sort(key=lambda action: action['action_id'])
         return applicable_actions
 
     def get_action_by_category_or_product_line(self, category=None, product_line=None):
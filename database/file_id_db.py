@@ -0,0 +1,51 @@
+import logging
+import sqlite3
+from typing import Dict, Tuple
+
+from database.connection_pool import connection
+
+logger = logging.getLogger(__name__)
+
+DATABASE_NAME = 'shop_bot.db'
+
+
+def load_file_ids() -> Dict[str, Tuple[float, int, str]]:
+    """Загружает кэш file_id: путь -> (mtime, размер файла, file_id)."""
+    try:
+        with connection(DATABASE_NAME) as conn:
+            rows = conn.execute("SELECT path, mtime, size, file_id FROM telegram_file_ids").fetchall()
+        return {path: (mtime, size, file_id) for path, mtime, size, file_id in rows}
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при загрузке кэша file_id: {e}")
+        return {}
+
+
+def save_file_id(path: str, mtime: float, size: int, file_id: str) -> bool:
+    """Сохраняет file_id, полученный при загрузке файла в Telegram."""
+    try:
+        with connection(DATABASE_NAME) as conn:
+            conn.execute(
+                """
+                INSERT INTO telegram_file_ids (path, mtime, size, file_id, updated_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(path) DO UPDATE SET
+                    mtime = excluded.mtime, size = excluded.size,
+                    file_id = excluded.file_id, updated_at = excluded.updated_at
+                """,
+                (path, mtime, size, file_id)
+            )
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при сохранении file_id для {path}: {e}")
+        return False
+
+
+def delete_file_id(path: str) -> bool:
+    """Удаляет file_id, который Telegram больше не принимает."""
+    try:
+        with connection(DATABASE_NAME) as conn:
+            conn.execute("DELETE FROM telegram_file_ids WHERE path = ?", (path,))
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при удалении file_id для {path}: {e}")
+        return False
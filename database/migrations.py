@@ -0,0 +1,732 @@
+import logging
+import os
+import sqlite3
+from typing import Callable, Dict, List, NamedTuple, Sequence, Union
+
+from config import DATABASE_NAME, DB_REVIEWS_PATH
+from database.connection_pool import acquire
+
+logger = logging.getLogger(__name__)
+
+SHOP_DATABASE = "shop_bot.db"
+DISCOUNTS_DATABASE = "discounts.db"
+PREORDERS_DATABASE = "preorders.db"
+
+Step = Union[str, Callable[[sqlite3.Connection], None]]
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    steps: Sequence[Step]
+
+
+def add_column(table: str, column: str, definition: str) -> Callable[[sqlite3.Connection], None]:
+    """Шаг миграции: добавляет столбец, если его еще нет (для баз, созданных до миграций)."""
+
+    def step(conn: sqlite3.Connection) -> None:
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    return step
+
+
+def insert_default_settings(conn: sqlite3.Connection) -> None:
+    """Шаг миграции: заполняет таблицу settings значениями по умолчанию."""
+    from database.admins.settings_db import (
+        DEFAULT_ORDER_PROCESSING_TIMEOUT, DEFAULT_NOTIFICATION_INTERVAL, DEFAULT_NOTIFICATION_TEXT
+    )
+
+    conn.executemany(
+        "INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)",
+        [
+            ('order_processing_timeout', str(DEFAULT_ORDER_PROCESSING_TIMEOUT)),
+            ('notification_interval', str(DEFAULT_NOTIFICATION_INTERVAL)),
+            ('notification_text', DEFAULT_NOTIFICATION_TEXT),
+        ]
+    )
+
+
+# Версия 1 каждой схемы повторяет DDL, который раньше выполнялся при импорте модулей
+# и в обработчиках. Все операторы идемпотентны, поэтому версия 1 безопасно применяется
+# к уже существующим базам.
+SHOP_MIGRATIONS: List[Migration] = [
+    Migration(1, "Базовая схема", [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            telegram_id INTEGER PRIMARY KEY,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            first_login_date TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS favorites (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            telegram_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            added_date DATETIME NOT NULL,
+            FOREIGN KEY (telegram_id) REFERENCES users(telegram_id),
+            UNIQUE(telegram_id, product_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS staff (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            telegram_id INTEGER UNIQUE NOT NULL,
+            username TEXT,
+            first_name TEXT NOT NULL,
+            last_name TEXT,
+            phone TEXT,
+            role TEXT NOT NULL,  -- 'admin', 'courier'
+            access_level INTEGER NOT NULL DEFAULT 1,
+            is_active BOOLEAN NOT NULL DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_login TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS staff_roles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            role_name TEXT UNIQUE NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS notification_settings (
+            user_id INTEGER PRIMARY KEY,
+            order_status_notifications BOOLEAN DEFAULT TRUE,
+            notification_start_time TEXT DEFAULT '10:00',
+            notification_end_time TEXT DEFAULT '22:00',
+            notification_frequency TEXT DEFAULT 'daily'
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            phone TEXT NOT NULL,
+            delivery_date TEXT NOT NULL,
+            delivery_time TEXT NOT NULL,
+            delivery_type TEXT NOT NULL,
+            delivery_address TEXT,
+            payment_method TEXT NOT NULL,
+            comment TEXT,
+            status TEXT NOT NULL DEFAULT 'processing',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            user_order_id INTEGER,
+            discount REAL DEFAULT 0.0,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+        """,
+        add_column("orders", "status", "TEXT DEFAULT 'Принят на обработку'"),
+        add_column("orders", "created_at", "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"),
+        """
+        CREATE TABLE IF NOT EXISTS order_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            price REAL NOT NULL,
+            FOREIGN KEY (order_id) REFERENCES orders(id),
+            FOREIGN KEY (product_id) REFERENCES products(id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS incomplete_orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL UNIQUE,
+            state TEXT NOT NULL,
+            data TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS cart (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL DEFAULT 1,
+            added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user_id, product_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS stock_thresholds (
+            product_id INTEGER PRIMARY KEY,
+            threshold INTEGER NOT NULL,
+            last_notification_date TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS stock_notification_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            product_name TEXT NOT NULL,
+            current_stock INTEGER NOT NULL,
+            threshold INTEGER NOT NULL,
+            notification_time TEXT NOT NULL,
+            delivered INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (product_id) REFERENCES products(id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        insert_default_settings,
+        """
+        CREATE TABLE IF NOT EXISTS broadcast_templates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            content TEXT NOT NULL,
+            type TEXT NOT NULL,
+            buttons TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS broadcast_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_text TEXT NOT NULL,
+            media_type TEXT,
+            media_file TEXT,
+            buttons TEXT,
+            target_type TEXT NOT NULL,
+            target_params TEXT,
+            sent_count INTEGER DEFAULT 0,
+            total_recipients INTEGER,
+            status TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_at TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS client_messages_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            admin_id INTEGER NOT NULL,
+            client_id INTEGER NOT NULL,
+            message_text TEXT,
+            message_type TEXT NOT NULL,
+            image_file_id TEXT,
+            sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            success BOOLEAN DEFAULT TRUE,
+            error_message TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS user_personal_info (
+            telegram_id INTEGER PRIMARY KEY,
+            first_name TEXT,
+            last_name TEXT,
+            birth_date TEXT,
+            gender TEXT,
+            email TEXT,
+            phone TEXT,
+            updated_at TEXT,
+            FOREIGN KEY (telegram_id) REFERENCES users (telegram_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS user_addresses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            telegram_id INTEGER,
+            address TEXT,
+            courier_instructions TEXT,
+            is_default BOOLEAN DEFAULT 0,
+            created_at TEXT,
+            FOREIGN KEY (telegram_id) REFERENCES users (telegram_id)
+        )
+        """,
+        add_column("user_addresses", "courier_instructions", "TEXT"),
+        """
+        CREATE TABLE IF NOT EXISTS user_delivery_preferences (
+            telegram_id INTEGER PRIMARY KEY,
+            preferred_time_start TEXT,
+            preferred_time_end TEXT,
+            updated_at TEXT,
+            FOREIGN KEY (telegram_id) REFERENCES users (telegram_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS about_me_statistics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            telegram_id INTEGER,
+            action_type TEXT,
+            action_details TEXT,
+            timestamp TEXT,
+            FOREIGN KEY (telegram_id) REFERENCES users (telegram_id)
+        )
+        """,
+    ]),
+    Migration(2, "Индексы заказов", [
+        "CREATE INDEX IF NOT EXISTS idx_orders_user_id ON orders (user_id)",
+        # get_delivered_orders, get_orders_by_status_category
+        "CREATE INDEX IF NOT EXISTS idx_orders_status_created_at ON orders (status, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items (order_id)",
+        # get_recent_sales_for_products
+        "CREATE INDEX IF NOT EXISTS idx_order_items_product_id ON order_items (product_id)",
+    ]),
+    Migration(3, "Кэш file_id изображений Telegram", [
+        """
+        CREATE TABLE IF NOT EXISTS telegram_file_ids (
+            path TEXT PRIMARY KEY,
+            mtime REAL NOT NULL,
+            size INTEGER NOT NULL,
+            file_id TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    Migration(4, "Доставка рассылок по получателям", [
+        """
+        CREATE TABLE IF NOT EXISTS broadcast_deliveries (
+            broadcast_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',  -- 'pending', 'sent', 'failed'
+            error TEXT,
+            updated_at TIMESTAMP,
+            PRIMARY KEY (broadcast_id, user_id),
+            FOREIGN KEY (broadcast_id) REFERENCES broadcast_history(id)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_broadcast_deliveries_status "
+        "ON broadcast_deliveries (broadcast_id, status, user_id)",
+    ]),
+    Migration(5, "Потоковый выбор получателей рассылки", [
+        add_column("broadcast_history", "recipients_selected", "INTEGER NOT NULL DEFAULT 0"),
+        # рассылки, созданные до этой миграции, получили список получателей целиком
+        # (или не получали его вовсе) - продолжать выбор получателей для них не нужно
+        "UPDATE broadcast_history SET recipients_selected = 1",
+    ]),
+    Migration(6, "Недоступные пользователи", [
+        """
+        CREATE TABLE IF NOT EXISTS user_reachability (
+            user_id INTEGER PRIMARY KEY,
+            is_reachable INTEGER NOT NULL DEFAULT 1,
+            reason TEXT,  -- 'blocked', 'chat not found'
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        add_column("broadcast_history", "pruned_count", "INTEGER NOT NULL DEFAULT 0"),
+    ]),
+    Migration(7, "Отложенные задачи", [
+        """
+        CREATE TABLE IF NOT EXISTS scheduled_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_type TEXT NOT NULL,  -- 'broadcast'
+            ref_id INTEGER NOT NULL,
+            run_at TIMESTAMP NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',  -- 'pending', 'done', 'failed'
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_scheduled_jobs_status_run_at ON scheduled_jobs (status, run_at)",
+    ]),
+    Migration(8, "Таймеры обработки заказов", [
+        """
+        CREATE TABLE IF NOT EXISTS order_timers (
+            order_id INTEGER PRIMARY KEY,
+            next_fire_at TIMESTAMP NOT NULL,
+            notification_count INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (order_id) REFERENCES orders(id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_order_timers_next_fire_at ON order_timers (next_fire_at)",
+    ]),
+    Migration(9, "Счетчики номеров заказов пользователей", [
+        """
+        CREATE TABLE IF NOT EXISTS user_order_counters (
+            user_id INTEGER PRIMARY KEY,
+            last_order_number INTEGER NOT NULL
+        )
+        """,
+        """
+        INSERT OR IGNORE INTO user_order_counters (user_id, last_order_number)
+        SELECT user_id, MAX(IFNULL(MAX(user_order_id), 0), COUNT(*))
+        FROM orders
+        GROUP BY user_id
+        """,
+    ]),
+    Migration(10, "Повторы отложенных задач", [
+        # Неудачная задача повторяется с растущей паузой, после MAX_JOB_ATTEMPTS - status = 'failed'
+        add_column("scheduled_jobs", "attempts", "INTEGER NOT NULL DEFAULT 0"),
+        add_column("scheduled_jobs", "last_error", "TEXT"),
+    ]),
+]
+
+WAREHOUSE_MIGRATIONS: List[Migration] = [
+    Migration(1, "Базовая схема", [
+        """
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT NOT NULL,
+            product_name TEXT NOT NULL,
+            product_full_name TEXT NOT NULL,
+            flavor TEXT,
+            price REAL NOT NULL,
+            description TEXT,
+            quantity INTEGER DEFAULT 0,
+            image_path TEXT,
+            is_active INTEGER DEFAULT 1
+        )
+        """,
+        add_column("products", "is_active", "INTEGER DEFAULT 1"),
+        """
+        CREATE TABLE IF NOT EXISTS product_images (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_name TEXT NOT NULL,
+            image_absolute_path TEXT NOT NULL,
+            category TEXT,
+            upload_date TEXT,
+            last_modified TEXT,
+            is_active BOOLEAN DEFAULT 1,
+            file_size INTEGER,
+            content_type TEXT
+        )
+        """,
+    ]),
+    Migration(2, "Индексы каталога", [
+        # get_available_product_names, get_products_by_category_and_name
+        "CREATE INDEX IF NOT EXISTS idx_products_category_name_quantity ON products (category, product_name, quantity)",
+        # get_product_id_by_full_name, get_product_category
+        "CREATE INDEX IF NOT EXISTS idx_products_full_name ON products (product_full_name)",
+    ]),
+]
+
+REVIEWS_MIGRATIONS: List[Migration] = [
+    Migration(1, "Базовая схема", [
+        """
+        CREATE TABLE IF NOT EXISTS product_reviews (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            rating INTEGER NOT NULL,
+            comment TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(telegram_id),
+            FOREIGN KEY (product_id) REFERENCES products(id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS delivery_comments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            order_id INTEGER NOT NULL,
+            comment TEXT,
+            rating INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(telegram_id)
+        )
+        """,
+    ]),
+]
+
+DISCOUNTS_MIGRATIONS: List[Migration] = [
+    Migration(1, "Базовая схема", [
+        """
+        CREATE TABLE IF NOT EXISTS promo_codes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            code TEXT NOT NULL UNIQUE,
+            description TEXT,
+            discount_type TEXT NOT NULL CHECK(discount_type IN ('percentage', 'fixed_amount')),
+            discount_value REAL NOT NULL,
+            min_order_amount REAL DEFAULT 0,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            is_active BOOLEAN NOT NULL DEFAULT 1,
+            max_uses INTEGER DEFAULT 999999,
+            current_uses INTEGER DEFAULT 0,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            created_by_id INTEGER,
+            created_by_username TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS promo_code_usage (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            promo_code_id INTEGER,
+            user_id INTEGER NOT NULL,
+            order_id INTEGER,
+            used_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            discount_amount REAL NOT NULL,
+            order_total REAL NOT NULL,
+            FOREIGN KEY (promo_code_id) REFERENCES promo_codes(id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS promo_code_views (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            promo_code_id INTEGER,
+            user_id INTEGER NOT NULL,
+            viewed_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (promo_code_id) REFERENCES promo_codes(id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS promo_product_categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            promo_code_id INTEGER,
+            category TEXT NOT NULL,
+            FOREIGN KEY (promo_code_id) REFERENCES promo_codes(id)
+        )
+        """,
+        # Таблицы "Товар дня" заменены акциями
+        "DROP TABLE IF EXISTS daily_deals",
+        "DROP TABLE IF EXISTS daily_deal_usage",
+        """
+        CREATE TABLE IF NOT EXISTS actions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            product_id INTEGER, -- Необязательное поле
+            discount_type TEXT NOT NULL CHECK(discount_type IN ('percentage', 'fixed_amount')),
+            discount_value REAL NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            is_active BOOLEAN NOT NULL DEFAULT 1,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            created_by_id INTEGER,
+            created_by_username TEXT
+        )
+        """,
+    ]),
+]
+
+PREORDERS_MIGRATIONS: List[Migration] = [
+    Migration(1, "Базовая схема", [
+        """
+        CREATE TABLE IF NOT EXISTS preorder_products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT NOT NULL,
+            product_name TEXT NOT NULL,
+            flavor TEXT NOT NULL,
+            description TEXT,
+            price REAL,
+            expected_date DATE,
+            image_path TEXT,
+            views INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            is_active BOOLEAN DEFAULT 1,
+            UNIQUE(category, product_name, flavor)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS user_preorders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status TEXT DEFAULT 'active',
+            FOREIGN KEY (product_id) REFERENCES preorder_products(id),
+            UNIQUE(user_id, product_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS product_views (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            viewed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user_id, product_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS preorder_categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL
+        )
+        """,
+        """
+        INSERT OR IGNORE INTO preorder_categories (name)
+        SELECT DISTINCT category FROM preorder_products WHERE is_active = 1
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS preorder_cancellations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            reason TEXT NOT NULL,
+            custom_reason TEXT,
+            cancelled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    Migration(2, "Индексы для предзаказов", [
+        "CREATE INDEX IF NOT EXISTS idx_user_preorders_product_status ON user_preorders (product_id, status)",
+    ]),
+]
+
+# Схема -> (файл базы данных, список миграций).
+# Несколько схем могут жить в одном файле: версии хранятся отдельно для каждой схемы.
+SCHEMAS: Dict[str, tuple] = {
+    'shop': (SHOP_DATABASE, SHOP_MIGRATIONS),
+    'warehouse': (DATABASE_NAME, WAREHOUSE_MIGRATIONS),
+    'reviews': (DB_REVIEWS_PATH, REVIEWS_MIGRATIONS),
+    'discounts': (DISCOUNTS_DATABASE, DISCOUNTS_MIGRATIONS),
+    'preorders': (PREORDERS_DATABASE, PREORDERS_MIGRATIONS),
+}
+
+
+def hot_queries() -> List[tuple]:
+    """
+    Горячие запросы по схемам: (схема, запрос, параметры). SQL берется из тех же констант,
+    которые выполняют функции работы с БД, поэтому проверка не расходится с кодом.
+    Модули импортируются здесь, а не при загрузке migrations, чтобы не было циклов импорта.
+    """
+    from database.users.warehouse_connection import (
+        AVAILABLE_PRODUCT_NAMES_SQL, AVAILABLE_PRODUCTS_SQL, PRODUCT_ID_BY_FULL_NAME_SQL
+    )
+    from database.users.database import PRODUCT_CATEGORY_SQL, USER_ORDER_NUMBER_SQL
+    from database.admins.orders_bd import ORDERS_BY_STATUS_SQL
+    from database.admins.statistics_db import (
+        DELIVERED_ORDERS_COUNT_SQL, DELIVERED_ORDERS_SQL, DELIVERED_ORDERS_PROFIT_SQL, ORDER_ITEMS_SQL
+    )
+    from database.preorder_db import PREORDER_USERS_SQL, PREORDER_USERS_COUNT_SQL
+
+    return [
+        ('warehouse', AVAILABLE_PRODUCT_NAMES_SQL, ('c',)),
+        ('warehouse', AVAILABLE_PRODUCTS_SQL, ('c', 'p')),
+        ('warehouse', PRODUCT_ID_BY_FULL_NAME_SQL, ('p',)),
+        ('warehouse', PRODUCT_CATEGORY_SQL, ('p',)),
+        ('shop', USER_ORDER_NUMBER_SQL, (1,)),
+        ('shop', ORDERS_BY_STATUS_SQL.format(placeholders='?, ?'), ('processing', 'delivered', 7, 0)),
+        ('shop', DELIVERED_ORDERS_COUNT_SQL, ()),
+        ('shop', DELIVERED_ORDERS_SQL, (5, 0)),
+        ('shop', DELIVERED_ORDERS_PROFIT_SQL, (5, 0)),
+        ('shop', ORDER_ITEMS_SQL, (1,)),
+        ('preorders', PREORDER_USERS_SQL, (1,)),
+        ('preorders', PREORDER_USERS_COUNT_SQL, (1,)),
+    ]
+
+
+def _ensure_version_table(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            schema TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (schema, version)
+        )
+    """)
+    conn.commit()
+
+
+def _current_version(conn: sqlite3.Connection, schema: str) -> int:
+    row = conn.execute("SELECT MAX(version) FROM schema_version WHERE schema = ?", (schema,)).fetchone()
+    return row[0] or 0
+
+
+def migrate_database(db_path: str, schemas: Dict[str, List[Migration]]) -> int:
+    """
+    Применяет недостающие миграции всех схем одного файла базы данных
+    в одной транзакции. Возвращает количество примененных миграций.
+    """
+    conn = acquire(db_path)
+    try:
+        _ensure_version_table(conn)
+
+        pending = []
+        for schema, migrations in schemas.items():
+            current = _current_version(conn, schema)
+            pending.extend(
+                (schema, migration)
+                for migration in sorted(migrations, key=lambda m: m.version)
+                if migration.version > current
+            )
+
+        if not pending:
+            return 0
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for schema, migration in pending:
+                for step in migration.steps:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(step)
+                conn.execute(
+                    "INSERT INTO schema_version (schema, version, description) VALUES (?, ?, ?)",
+                    (schema, migration.version, migration.description)
+                )
+                logger.info(f"{db_path}: применена миграция {schema} v{migration.version} ({migration.description})")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+        return len(pending)
+    finally:
+        conn.close()
+
+
+def run_migrations() -> None:
+    """
+    Создает и обновляет схемы всех баз данных. Вызывается один раз при запуске бота.
+    Ошибка миграции прерывает запуск, чтобы бот не работал с неполной схемой.
+    """
+    by_file: Dict[str, Dict[str, List[Migration]]] = {}
+    paths: Dict[str, str] = {}
+    for schema, (db_path, migrations) in SCHEMAS.items():
+        key = os.path.abspath(db_path)
+        paths.setdefault(key, db_path)
+        by_file.setdefault(key, {})[schema] = migrations
+
+    for key, schemas in by_file.items():
+        db_path = paths[key]
+        try:
+            applied = migrate_database(db_path, schemas)
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка миграции базы данных {db_path}: {e}")
+            raise
+        if applied:
+            logger.info(f"{db_path}: применено миграций: {applied}")
+        else:
+            logger.info(f"{db_path}: схема актуальна")
+
+
+def check_query_plans() -> List[str]:
+    """
+    Выполняет EXPLAIN QUERY PLAN для каждого горячего запроса и возвращает шаги SCAN
+    (полный просмотр таблицы или индекса). При запуске бота они только логируются
+    как предупреждения; завершить проверку ошибкой - дело python -m database.migrations.
+    """
+    full_scans = []
+    for schema, sql, params in hot_queries():
+        db_path = SCHEMAS[schema][0]
+        conn = acquire(db_path)
+        try:
+            plan = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+        finally:
+            conn.close()
+        full_scans.extend(f"{schema}: {row[-1]} -- {sql}" for row in plan if row[-1].startswith("SCAN"))
+
+    for full_scan in full_scans:
+        logger.warning(f"Полный просмотр в плане горячего запроса: {full_scan}")
+    return full_scans
+
+
+if __name__ == "__main__":
+    # Проверка планов горячих запросов на свежей базе (для CI): python -m database.migrations
+    import sys
+    import tempfile
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    os.chdir(tempfile.mkdtemp())
+    run_migrations()
+    problems = check_query_plans()
+    print(f"Проверено запросов: {len(hot_queries())}, с полным просмотром: {len(problems)}")
+    sys.exit(1 if problems else 0)
@@ -1,90 +1,18 @@
 import sqlite3
 from typing import List, Optional, Dict, Any
 import logging
+from database.connection_pool import connection
 
 logger = logging.getLogger(__name__)
 
+# Запросы рассылки о поступлении; их планы проверяет database.migrations.check_query_plans()
+PREORDER_USERS_SQL = "SELECT DISTINCT user_id FROM user_preorders WHERE product_id = ? AND status = 'active'"
+PREORDER_USERS_COUNT_SQL = "SELECT COUNT(DISTINCT user_id) FROM user_preorders WHERE product_id = ? AND status = 'active'"
+
 
 class PreorderDatabase:
     def __init__(self, db_path: str = "preorders.db"):
         self.db_path = db_path
-        self.init_db()
-
-    def init_db(self):
-        """Инициализация таблиц базы данных"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-
-            # Таблица товаров для предзаказа
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS preorder_products (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    category TEXT NOT NULL,
-                    product_name TEXT NOT NULL,
-                    flavor TEXT NOT NULL,
-                    description TEXT,
-                    price REAL,
-                    expected_date DATE,
-                    image_path TEXT,
-                    views INTEGER DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    is_active BOOLEAN DEFAULT 1,
-                    UNIQUE(category, product_name, flavor)
-                )
-            ''')
-
-            # Таблица предзаказов пользователей
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS user_preorders (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    product_id INTEGER NOT NULL,
-                    quantity INTEGER DEFAULT 1,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    status TEXT DEFAULT 'active',
-                    FOREIGN KEY (product_id) REFERENCES preorder_products(id),
-                    UNIQUE(user_id, product_id)
-                )
-            ''')
-
-            # Таблица для отслеживания уникальных просмотров
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS product_views (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    product_id INTEGER NOT NULL,
-                    viewed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(user_id, product_id)
-                )
-            ''')
-
-            # Таблица категорий для работы с ID
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS preorder_categories (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT UNIQUE NOT NULL
-                )
-            ''')
-
-            # Заполняем таблицу категорий существующими категориями
-            cursor.execute('''
-                INSERT OR IGNORE INTO preorder_categories (name)
-                SELECT DISTINCT category FROM preorder_products WHERE is_active = 1
-            ''')
-
-            # Таблица для хранения причин отказов от предзаказов
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS preorder_cancellations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    product_id INTEGER NOT NULL,
-                    reason TEXT NOT NULL,
-                    custom_reason TEXT,
-                    cancelled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-            conn.commit()
 
     def add_preorder_product(self, category: str, product_name: str, flavor: str,
                              description: Optional[str] = None, price: Optional[float] = None,
@@ -92,7 +20,7 @@ class PreorderDatabase:
                              image_path: Optional[str] = None) -> Optional[int]:
         """Добавить товар для предзаказа"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connection(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT OR REPLACE INTO preorder_products 
@@ -107,7 +35,7 @@ class PreorderDatabase:
 
     def get_categories(self) -> List[str]:
         """Получить список категорий товаров для предзаказа"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connection(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT DISTINCT category FROM preorder_products 
@@ -118,7 +46,7 @@ class PreorderDatabase:
 
     def get_all_categories(self) -> List[str]:
         """Получить все категории (для админа)"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connection(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT DISTINCT category FROM preorder_products 
@@ -128,7 +56,7 @@ class PreorderDatabase:
 
     def get_all_product_names(self) -> List[str]:
         """Получить все названия товаров (для админа)"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connection(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT DISTINCT product_name FROM preorder_products 
@@ -138,7 +66,7 @@ class PreorderDatabase:
 
     def get_products_by_category(self, category: str) -> List[str]:
         """Получить список товаров в категории"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connection(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT DISTINCT product_name FROM preorder_products 
@@ -149,7 +77,7 @@ class PreorderDatabase:
 
     def get_flavors_by_product(self, category: str, product_name: str) -> List[str]:
         """Получить список вкусов товара"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connection(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT DISTINCT flavor FROM preorder_products 
@@ -160,7 +88,7 @@ class PreorderDatabase:
 
     def get_product_details(self, category: str, product_name: str, flavor: str) -> Optional[Dict[str, Any]]:
         """Получить детали товара"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connection(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute('''
@@ -175,7 +103,7 @@ class PreorderDatabase:
     def increment_views(self, product_id: int, user_id: int) -> bool:
         """Увеличить счетчик просмотров товара (только уникальные)"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connection(self.db_path) as conn:
                 cursor = conn.cursor()
                 # Пытаемся вставить запись о просмотре
                 cursor.execute('''
@@ -200,7 +128,7 @@ class PreorderDatabase:
     def add_preorder(self, user_id: int, product_id: int, quantity: int = 1) -> bool:
         """Добавить предзаказ пользователя"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connection(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO user_preorders (user_id, product_id, quantity)
@@ -218,7 +146,7 @@ class PreorderDatabase:
     def cancel_preorder(self, user_id: int, product_id: int) -> bool:
         """Отменить предзаказ пользователя"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connection(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     DELETE FROM user_preorders 
@@ -232,7 +160,7 @@ class PreorderDatabase:
 
     def has_preorder(self, user_id: int, product_id: int) -> bool:
         """Проверить, есть ли у пользователя предзаказ на товар"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connection(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT COUNT(*) FROM user_preorders 
@@ -242,7 +170,7 @@ class PreorderDatabase:
 
     def get_user_preorders(self, user_id: int, page: int = 1, per_page: int = 6) -> Dict[str, Any]:
         """Получить предзаказы пользователя с пагинацией"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connection(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
 
@@ -277,7 +205,7 @@ class PreorderDatabase:
 
     def get_all_preorder_products(self, page: int = 1, per_page: int = 10) -> Dict[str, Any]:
         """Получить все товары для предзаказа с пагинацией (для админа)"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connection(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
 
@@ -313,7 +241,7 @@ class PreorderDatabase:
     def delete_preorder_product(self, product_id: int) -> bool:
         """Удалить товар из предзаказов (деактивировать)"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connection(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE preorder_products 
@@ -328,7 +256,7 @@ class PreorderDatabase:
 
     def get_product_by_id(self, product_id: int) -> Optional[Dict[str, Any]]:
         """Получить товар по ID"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connection(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute('''
@@ -342,16 +270,8 @@ class PreorderDatabase:
 
     def get_category_id(self, category: str) -> Optional[int]:
         """Получить или создать ID категории"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connection(self.db_path) as conn:
             cursor = conn.cursor()
-            # Создаем таблицу категорий если её нет
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS preorder_categories (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT UNIQUE NOT NULL
-                )
-            ''')
-
             # Пытаемся получить существующую категорию
             cursor.execute('SELECT id FROM preorder_categories WHERE name = ?', (category,))
             result = cursor.fetchone()
@@ -366,7 +286,7 @@ class PreorderDatabase:
 
     def get_category_by_id(self, category_id: int) -> Optional[str]:
         """Получить название категории по ID"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connection(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT name FROM preorder_categories WHERE id = ?', (category_id,))
             result = cursor.fetchone()
@@ -374,7 +294,7 @@ class PreorderDatabase:
 
     def get_categories_with_ids(self) -> List[Dict[str, Any]]:
         """Получить список категорий с их ID"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connection(self.db_path) as conn:
             cursor = conn.cursor()
             # Сначала убеждаемся, что все категории есть в таблице категорий
             cursor.execute('''
@@ -395,7 +315,7 @@ class PreorderDatabase:
 
     def get_products_ids_by_category(self, category_id: int) -> List[Dict[str, Any]]:
         """Получить товары с ID по категории"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connection(self.db_path) as conn:
             cursor = conn.cursor()
             # Получаем название категории
             cursor.execute('SELECT name FROM preorder_categories WHERE id = ?', (category_id,))
@@ -417,7 +337,7 @@ class PreorderDatabase:
 
     def get_flavors_ids_by_product(self, category_id: int, product_id: int) -> List[Dict[str, Any]]:
         """Получить вкусы с ID для товара"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connection(self.db_path) as conn:
             cursor = conn.cursor()
 
             # Получаем информацию о товаре
@@ -439,19 +359,15 @@ class PreorderDatabase:
 
     def get_users_with_preorder(self, product_id: int) -> List[int]:
         """Получить список пользователей с предзаказом на товар"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connection(self.db_path) as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT DISTINCT user_id 
-                FROM user_preorders 
-                WHERE product_id = ? AND status = 'active'
-            ''', (product_id,))
+            cursor.execute(PREORDER_USERS_SQL, (product_id,))
             return [row[0] for row in cursor.fetchall()]
 
     def save_cancellation_reason(self, user_id: int, product_id: int, reason: str, custom_reason: str = None) -> bool:
         """Сохранить причину отказа от предзаказа"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with connection(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO preorder_cancellations (user_id, product_id, reason, custom_reason)
@@ -465,18 +381,14 @@ class PreorderDatabase:
 
     def get_product_preorders_count(self, product_id: int) -> int:
         """Получить количество активных предзаказов на товар"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connection(self.db_path) as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT COUNT(DISTINCT user_id) 
-                FROM user_preorders 
-                WHERE product_id = ? AND status = 'active'
-            ''', (product_id,))
+            cursor.execute(PREORDER_USERS_COUNT_SQL, (product_id,))
             return cursor.fetchone()[0]
 
     def get_cancellation_stats(self) -> Dict[str, Any]:
         """Получить статистику отказов от предзаказов"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connection(self.db_path) as conn:
             cursor = conn.cursor()
 
             # Общее количество отказов
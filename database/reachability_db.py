@@ -0,0 +1,40 @@
+import logging
+import sqlite3
+from typing import Optional, Set
+
+from database.connection_pool import connection
+
+logger = logging.getLogger(__name__)
+
+DATABASE_NAME = 'shop_bot.db'
+
+
+def load_unreachable_users() -> Set[int]:
+    """Загружает ID пользователей, которым бот не может писать (заблокировали бота, удалили аккаунт)."""
+    try:
+        with connection(DATABASE_NAME) as conn:
+            rows = conn.execute("SELECT user_id FROM user_reachability WHERE is_reachable = 0").fetchall()
+        return {row[0] for row in rows}
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при загрузке недоступных пользователей: {e}")
+        return set()
+
+
+def set_user_reachability(user_id: int, is_reachable: bool, reason: Optional[str] = None) -> bool:
+    """Отмечает, доступен ли пользователь для сообщений бота."""
+    try:
+        with connection(DATABASE_NAME) as conn:
+            conn.execute(
+                """
+                INSERT INTO user_reachability (user_id, is_reachable, reason, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    is_reachable = excluded.is_reachable, reason = excluded.reason,
+                    updated_at = excluded.updated_at
+                """,
+                (user_id, int(is_reachable), reason)
+            )
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при обновлении доступности пользователя {user_id}: {e}")
+        return False
@@ -0,0 +1,79 @@
+import logging
+import sqlite3
+from datetime import datetime
+from typing import List, Tuple
+
+from database.connection_pool import connection
+
+logger = logging.getLogger(__name__)
+
+DATABASE_NAME = 'shop_bot.db'
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def add_scheduled_job(job_type: str, ref_id: int, run_at: datetime) -> int:
+    """Сохраняет отложенную задачу. Возвращает ID задачи или -1 при ошибке."""
+    try:
+        with connection(DATABASE_NAME) as conn:
+            cursor = conn.execute(
+                "INSERT INTO scheduled_jobs (job_type, ref_id, run_at) VALUES (?, ?, ?)",
+                (job_type, ref_id, run_at.strftime(TIME_FORMAT))
+            )
+        return cursor.lastrowid
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при сохранении отложенной задачи {job_type}:{ref_id}: {e}")
+        return -1
+
+
+def get_pending_jobs() -> List[Tuple[int, str, int, datetime, int]]:
+    """Получает невыполненные задачи: (id, job_type, ref_id, run_at, attempts)."""
+    try:
+        with connection(DATABASE_NAME) as conn:
+            rows = conn.execute(
+                "SELECT id, job_type, ref_id, run_at, attempts FROM scheduled_jobs "
+                "WHERE status = 'pending' ORDER BY run_at"
+            ).fetchall()
+        return [(job_id, job_type, ref_id, datetime.strptime(run_at, TIME_FORMAT), attempts)
+                for job_id, job_type, ref_id, run_at, attempts in rows]
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при загрузке отложенных задач: {e}")
+        return []
+
+
+def complete_job(job_id: int) -> bool:
+    """Отмечает задачу выполненной."""
+    try:
+        with connection(DATABASE_NAME) as conn:
+            conn.execute("UPDATE scheduled_jobs SET status = 'done' WHERE id = ?", (job_id,))
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при завершении отложенной задачи #{job_id}: {e}")
+        return False
+
+
+def retry_job(job_id: int, run_at: datetime, error: str) -> bool:
+    """Переносит неудавшуюся задачу на run_at, увеличивая счетчик попыток."""
+    try:
+        with connection(DATABASE_NAME) as conn:
+            conn.execute(
+                "UPDATE scheduled_jobs SET run_at = ?, attempts = attempts + 1, last_error = ? WHERE id = ?",
+                (run_at.strftime(TIME_FORMAT), error, job_id)
+            )
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при переносе отложенной задачи #{job_id}: {e}")
+        return False
+
+
+def fail_job(job_id: int, error: str) -> bool:
+    """Отмечает задачу неудавшейся: попытки исчерпаны, повторов больше не будет."""
+    try:
+        with connection(DATABASE_NAME) as conn:
+            conn.execute(
+                "UPDATE scheduled_jobs SET status = 'failed', attempts = attempts + 1, last_error = ? WHERE id = ?",
+                (error, job_id)
+            )
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при отметке отложенной задачи #{job_id} неудавшейся: {e}")
+        return False
@@ -0,0 +1,26 @@
+import logging
+from typing import Callable, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+_subscribers: List[Callable[[List[int]], None]] = []
+
+
+def subscribe_stock_changes(callback: Callable[[List[int]], None]) -> None:
+    """
+    Подписывает callback(product_ids) на изменения остатков товаров.
+    Вызывается в потоке, изменившем остаток, после фиксации в базе.
+    """
+    _subscribers.append(callback)
+
+
+def emit_stock_changed(product_ids: Iterable[int]) -> None:
+    """Сообщает подписчикам об изменении остатков товаров"""
+    product_ids = list(product_ids)
+    if not product_ids:
+        return
+    for callback in list(_subscribers):
+        try:
+            callback(product_ids)
+        except Exception as e:
+            logger.error(f"Ошибка при уведомлении подписчика об изменении остатков {product_ids}: {e}")
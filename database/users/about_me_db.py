@@ -2,88 +2,16 @@ import logging
 import sqlite3
 from typing import Dict, List, Optional
 from datetime import datetime
+from database.connection_pool import acquire
 
 DATABASE_NAME = 'shop_bot.db'
 
 logger = logging.getLogger(__name__)
 
 
-def create_tables():
-    """Создает таблицы для хранения информации о пользователе"""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-
-    try:
-        # Таблица личных данных
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_personal_info (
-                telegram_id INTEGER PRIMARY KEY,
-                first_name TEXT,
-                last_name TEXT,
-                birth_date TEXT,
-                gender TEXT,
-                email TEXT,
-                phone TEXT,
-                updated_at TEXT,
-                FOREIGN KEY (telegram_id) REFERENCES users (telegram_id)
-            )
-        ''')
-
-        # Упрощенная таблица адресов доставки (без типов)
-        cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS user_addresses (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        telegram_id INTEGER,
-                        address TEXT,
-                        courier_instructions TEXT,
-                        is_default BOOLEAN DEFAULT 0,
-                        created_at TEXT,
-                        FOREIGN KEY (telegram_id) REFERENCES users (telegram_id)
-                    )
-                ''')
-
-        # Если таблица уже существует, добавляем колонку
-        cursor.execute("PRAGMA table_info(user_addresses)")
-        columns = [column[1] for column in cursor.fetchall()]
-        if 'courier_instructions' not in columns:
-            cursor.execute('ALTER TABLE user_addresses ADD COLUMN courier_instructions TEXT')
-
-        # Таблица предпочтений доставки
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_delivery_preferences (
-                telegram_id INTEGER PRIMARY KEY,
-                preferred_time_start TEXT,
-                preferred_time_end TEXT,
-                updated_at TEXT,
-                FOREIGN KEY (telegram_id) REFERENCES users (telegram_id)
-            )
-        ''')
-
-        # Таблица для сбора статистики использования раздела "О себе"
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS about_me_statistics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                telegram_id INTEGER,
-                action_type TEXT,
-                action_details TEXT,
-                timestamp TEXT,
-                FOREIGN KEY (telegram_id) REFERENCES users (telegram_id)
-            )
-        ''')
-
-        conn.commit()
-        logger.info("Таблицы для раздела 'О себе' успешно созданы")
-
-    except sqlite3.Error as e:
-        logger.error(f"Ошибка при создании таблиц: {e}")
-
-    finally:
-        conn.close()
-
-
 def log_user_action(telegram_id: int, action_type: str, action_details: str = None):
     """Логирует действия пользователя в разделе 'О себе'"""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -103,7 +31,7 @@ def log_user_action(telegram_id: int, action_type: str, action_details: str = No
 
 def get_user_personal_info(telegram_id: int) -> Optional[Dict]:
     """Получает личные данные пользователя"""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -135,7 +63,7 @@ def get_user_personal_info(telegram_id: int) -> Optional[Dict]:
 
 def update_user_personal_info(telegram_id: int, field: str, value: str) -> bool:
     """Обновляет конкретное поле личных данных пользователя"""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -175,7 +103,7 @@ def update_user_personal_info(telegram_id: int, field: str, value: str) -> bool:
 
 def get_user_addresses(telegram_id: int) -> List[Dict]:
     """Получает все адреса пользователя"""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -207,7 +135,7 @@ def get_user_addresses(telegram_id: int) -> List[Dict]:
 
 def add_user_address(telegram_id: int, address: str, is_default: bool = False) -> bool:
     """Добавляет новый адрес пользователя"""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -241,7 +169,7 @@ def add_user_address(telegram_id: int, address: str, is_default: bool = False) -
 
 def update_user_address(address_id: int, telegram_id: int, address: str) -> bool:
     """Обновляет адрес пользователя"""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -268,7 +196,7 @@ def update_user_address(address_id: int, telegram_id: int, address: str) -> bool
 
 def delete_user_address(address_id: int, telegram_id: int) -> bool:
     """Удаляет адрес пользователя"""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -294,7 +222,7 @@ def delete_user_address(address_id: int, telegram_id: int) -> bool:
 
 def set_default_address(address_id: int, telegram_id: int) -> bool:
     """Устанавливает адрес по умолчанию"""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -329,7 +257,7 @@ def set_default_address(address_id: int, telegram_id: int) -> bool:
 
 def get_delivery_preferences(telegram_id: int) -> Optional[Dict]:
     """Получает предпочтения по времени доставки"""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -357,7 +285,7 @@ def get_delivery_preferences(telegram_id: int) -> Optional[Dict]:
 
 def update_delivery_preferences(telegram_id: int, start_time: str, end_time: str) -> bool:
     """Обновляет предпочтения по времени доставки"""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -384,7 +312,7 @@ def update_delivery_preferences(telegram_id: int, start_time: str, end_time: str
 
 def update_courier_instructions(address_id: int, telegram_id: int, instructions: str) -> bool:
     """Обновляет инструкции для курьера"""
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
 
     try:
@@ -407,8 +335,3 @@ def update_courier_instructions(address_id: int, telegram_id: int, instructions:
 
     finally:
         conn.close()
-
-
-
-# Вызываем создание таблиц при импорте модуля
-create_tables()
@@ -0,0 +1,113 @@
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from config import DATABASE_NAME
+from database.connection_pool import acquire
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogCache:
+    """
+    Дерево каталога в памяти: категория -> линейка товаров -> вкусы.
+
+    Загружается одним запросом при первом обращении и сбрасывается функциями,
+    изменяющими таблицу products (products_db, update_product_quantity).
+    Строки товаров хранятся в том же формате, что возвращают запросы warehouse_connection.
+    """
+
+    def __init__(self, db_path: str = DATABASE_NAME):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._data: Optional[Tuple[Dict[str, Dict[str, List[Tuple]]], Dict[int, Tuple]]] = None
+        self.loads = 0
+
+    def _load(self) -> Tuple[Dict[str, Dict[str, List[Tuple]]], Dict[int, Tuple]]:
+        """Возвращает (дерево каталога, товары по id), загружая их при необходимости."""
+        with self._lock:
+            if self._data is not None:
+                return self._data
+            generation = self._generation
+
+        conn = acquire(self.db_path)
+        try:
+            rows = conn.execute(
+                "SELECT id, category, product_name, product_full_name, flavor, price, description, quantity, image_path "
+                "FROM products ORDER BY id"
+            ).fetchall()
+        finally:
+            conn.close()
+
+        tree: Dict[str, Dict[str, List[Tuple]]] = {}
+        by_id: Dict[int, Tuple] = {}
+        for row in rows:
+            product_id, category, product_name, product_full_name, flavor, price, description, quantity, image_path = row
+            tree.setdefault(category, {}).setdefault(product_name, []).append(
+                (product_full_name, flavor, price, product_id, description, quantity, image_path)
+            )
+            by_id[product_id] = row
+
+        with self._lock:
+            # Если каталог изменился во время загрузки, результат не сохраняем
+            if generation == self._generation:
+                self._data = (tree, by_id)
+                self.loads += 1
+                logger.debug(f"Каталог загружен в память: {len(by_id)} товаров")
+        return tree, by_id
+
+    def invalidate(self) -> None:
+        """Сбрасывает кэш. Следующее обращение перечитает каталог из базы данных."""
+        with self._lock:
+            self._generation += 1
+            self._data = None
+
+    @property
+    def generation(self) -> int:
+        """Номер версии каталога: увеличивается при каждом сбросе кэша."""
+        return self._generation
+
+    def categories(self) -> List[str]:
+        tree, _ = self._load()
+        return list(tree)
+
+    def product_names(self, category_name: str) -> List[str]:
+        tree, _ = self._load()
+        return list(tree.get(category_name, {}))
+
+    def available_product_names(self, category_name: str) -> List[str]:
+        """Линейки категории, у которых хотя бы один вкус есть в наличии."""
+        tree, _ = self._load()
+        return [
+            name for name, products in tree.get(category_name, {}).items()
+            if any(_in_stock(product) for product in products)
+        ]
+
+    def products(self, category_name: str, product_name: str) -> List[Tuple]:
+        tree, _ = self._load()
+        return list(tree.get(category_name, {}).get(product_name, []))
+
+    def available_products(self, category_name: str, product_name: str) -> List[Tuple]:
+        """Вкусы линейки, которые есть в наличии."""
+        tree, _ = self._load()
+        return [product for product in tree.get(category_name, {}).get(product_name, []) if _in_stock(product)]
+
+    def product_by_id(self, product_id) -> Optional[Tuple]:
+        _, by_id = self._load()
+        try:
+            return by_id.get(int(product_id))
+        except (TypeError, ValueError):
+            return None
+
+
+def _in_stock(product: Tuple) -> bool:
+    return (product[5] or 0) > 0
+
+
+catalog_cache = CatalogCache()
+
+
+def invalidate_catalog_cache() -> None:
+    """Сбрасывает кэш каталога после изменения таблицы products."""
+    catalog_cache.invalidate()
@@ -2,9 +2,19 @@ import logging
 import sqlite3
 from database.users.database_connection import create_connection, close_connection
 from config import DATABASE_NAME
+from database.connection_pool import acquire
 
 logger = logging.getLogger(__name__)
 
+DISCOUNTS_DATABASE = "discounts.db"
+
+# Запросы оформления заказа; их планы проверяет database.migrations.check_query_plans()
+USER_ORDER_NUMBER_SQL = "SELECT last_order_number FROM user_order_counters WHERE user_id = ?"
+PRODUCT_CATEGORY_SQL = "SELECT category FROM products WHERE product_full_name = ?"
+
+# Результат place_order, когда в корзине нечего оформлять
+CART_EMPTY = 'cart_empty'
+
 
 def get_db_connection():
     """
@@ -30,18 +40,6 @@ def add_to_cart(user_id, product_id, quantity=1):
     try:
         cursor = conn.cursor()
 
-        # Проверяем, создана ли таблица корзины
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS cart (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            product_id INTEGER NOT NULL,
-            quantity INTEGER NOT NULL DEFAULT 1,
-            added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(user_id, product_id)
-        )
-        ''')
-
         # Проверяем, есть ли уже этот товар в корзине пользователя
         cursor.execute(
             "SELECT id FROM cart WHERE user_id = ? AND product_id = ?",
@@ -72,51 +70,48 @@ def add_to_cart(user_id, product_id, quantity=1):
         close_connection(conn)
 
 
+def _select_cart_items(cursor, user_id):
+    """Читает позиции корзины вместе с данными товаров (warehouse.db должна быть подключена как warehouse)"""
+    cursor.execute(
+        """
+        SELECT p.category, c.product_id, p.product_full_name, p.product_name,
+               p.flavor, p.price, c.quantity
+        FROM cart c
+        JOIN warehouse.products p ON p.id = c.product_id
+        WHERE c.user_id = ?
+        ORDER BY c.id
+        """,
+        (user_id,)
+    )
+
+    return [
+        {
+            'category': category,
+            'product_id': product_id,
+            'product_full_name': product_full_name,
+            'product_name': product_name,
+            'flavor': flavor,
+            'price': price,
+            'quantity': quantity,
+            'total_price': price * quantity
+        }
+        for category, product_id, product_full_name, product_name, flavor, price, quantity in cursor.fetchall()
+    ]
+
+
 def get_cart_items(user_id):
     """
     Получает список товаров в корзине пользователя,
-    соединяя данные из таблицы корзины и таблицы товаров.
+    соединяя данные из таблицы корзины и таблицы товаров одним запросом
+    (база warehouse.db подключается через ATTACH).
     """
     conn = create_connection()
     cart_items = []
 
     if conn:
         try:
-            cursor = conn.cursor()
-
-            # Подключаемся к базе данных с товарами
-            warehouse_conn = sqlite3.connect(DATABASE_NAME)
-            warehouse_cursor = warehouse_conn.cursor()
-
-            # Получаем информацию о товарах в корзине
-            cursor.execute(
-                "SELECT product_id, quantity FROM cart WHERE user_id = ?",
-                (user_id,)
-            )
-            user_cart = cursor.fetchall()
-
-            for product_id, quantity in user_cart:
-                # Получаем информацию о товаре из базы данных товаров
-                warehouse_cursor.execute(
-                    "SELECT category, product_name, product_full_name, flavor, price FROM products WHERE id = ?",
-                    (product_id,)
-                )
-                product_info = warehouse_cursor.fetchone()
-
-                if product_info:
-                    category, product_name, product_full_name, flavor, price = product_info
-                    cart_items.append({
-                        'category': category,
-                        'product_id': product_id,
-                        'product_full_name': product_full_name,
-                        'product_name': product_name,
-                        'flavor': flavor,
-                        'price': price,
-                        'quantity': quantity,
-                        'total_price': price * quantity
-                    })
-
-            warehouse_conn.close()
+            conn.attach(DATABASE_NAME, 'warehouse')
+            cart_items = _select_cart_items(conn.cursor(), user_id)
 
         except sqlite3.Error as e:
             print(f"Ошибка при получении товаров из корзины: {e}")
@@ -183,53 +178,18 @@ def clear_cart(user_id):
         close_connection(conn)
 
 
-def create_orders_table(conn):
-    """Создает таблицы для хранения заказов"""
-    cursor = conn.cursor()
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS orders (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        name TEXT NOT NULL,
-        phone TEXT NOT NULL,
-        delivery_date TEXT NOT NULL,
-        delivery_time TEXT NOT NULL,
-        delivery_type TEXT NOT NULL,
-        delivery_address TEXT,
-        payment_method TEXT NOT NULL,
-        comment TEXT,
-        status TEXT NOT NULL DEFAULT 'processing',
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        user_order_id INTEGER,
-        discount REAL DEFAULT 0.0,
-        FOREIGN KEY (user_id) REFERENCES users(id)
-    )
-    ''')
-
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS order_items (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        order_id INTEGER NOT NULL,
-        product_id INTEGER NOT NULL,
-        quantity INTEGER NOT NULL,
-        price REAL NOT NULL,
-        FOREIGN KEY (order_id) REFERENCES orders(id),
-        FOREIGN KEY (product_id) REFERENCES products(id)
-    )
-    ''')
-
+def _next_user_order_number(cursor, user_id):
+    """
+    Увеличивает счетчик заказов пользователя и возвращает номер нового заказа.
+    Вызывается внутри транзакции сохранения заказа: блокировка записи, взятая счетчиком,
+    не дает двум одновременным оформлениям получить один номер.
+    """
     cursor.execute('''
-    CREATE TABLE IF NOT EXISTS incomplete_orders (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL UNIQUE,
-        state TEXT NOT NULL,
-        data TEXT NOT NULL,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES users(id)
-    )
-    ''')
-    conn.commit()
+    INSERT INTO user_order_counters (user_id, last_order_number) VALUES (?, 1)
+    ON CONFLICT(user_id) DO UPDATE SET last_order_number = last_order_number + 1
+    ''', (user_id,))
+    cursor.execute(USER_ORDER_NUMBER_SQL, (user_id,))
+    return cursor.fetchone()[0]
 
 
 def save_order(conn, user_id, name, phone, delivery_date, delivery_time,
@@ -237,13 +197,8 @@ def save_order(conn, user_id, name, phone, delivery_date, delivery_time,
     """Сохраняет заказ в БД и возвращает ID заказа и номер заказа пользователя"""
     cursor = conn.cursor()
 
-    # Получаем текущее количество заказов у данного пользователя
-    cursor.execute('''
-    SELECT COUNT(*) FROM orders WHERE user_id = ?
-    ''', (user_id,))
-
-    # Увеличиваем на 1 для нового заказа
-    user_order_count = cursor.fetchone()[0] + 1
+    # Номер заказа пользователя - из счетчика его заказов
+    user_order_count = _next_user_order_number(cursor, user_id)
 
     # Вставляем заказ с номером пользователя
     cursor.execute('''
@@ -341,6 +296,33 @@ def delete_incomplete_order(conn, user_id):
     conn.commit()
 
 
+def store_incomplete_order(user_id, state, data):
+    """Сохраняет незавершенный заказ на соединении из пула (для вызова через db_write)"""
+    conn = create_connection()
+    try:
+        save_incomplete_order(conn, user_id, state, data)
+    finally:
+        close_connection(conn)
+
+
+def fetch_incomplete_order(user_id):
+    """Получает незавершенный заказ на соединении из пула (для вызова через db_read)"""
+    conn = create_connection()
+    try:
+        return get_incomplete_order(conn, user_id)
+    finally:
+        close_connection(conn)
+
+
+def remove_incomplete_order(user_id):
+    """Удаляет незавершенный заказ на соединении из пула (для вызова через db_write)"""
+    conn = create_connection()
+    try:
+        delete_incomplete_order(conn, user_id)
+    finally:
+        close_connection(conn)
+
+
 def get_order_history(conn, user_id):
     """Получает историю заказов пользователя"""
     cursor = conn.cursor()
@@ -383,6 +365,52 @@ def set_order_discount(order_id, discount):
     return []
 
 
+def get_products_info(product_ids):
+    """
+    Получает категорию, линейку, вкус и цену сразу для нескольких товаров одним запросом
+    к базе warehouse.db.
+
+    Args:
+        product_ids: ID товаров (повторы допускаются)
+
+    Returns:
+        dict: {product_id: {'category', 'product_name', 'product_full_name', 'flavor', 'price'}};
+        товаров, которых нет на складе, в словаре нет
+    """
+    product_ids = list(set(product_ids))
+    if not product_ids:
+        return {}
+
+    conn = acquire(DATABASE_NAME)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            SELECT id, category, product_name, product_full_name, flavor, price
+            FROM products
+            WHERE id IN ({','.join('?' * len(product_ids))})
+            """,
+            product_ids
+        )
+        return {
+            product_id: {
+                'category': category,
+                'product_name': product_name,
+                'product_full_name': product_full_name,
+                'flavor': flavor,
+                'price': price
+            }
+            for product_id, category, product_name, product_full_name, flavor, price in cursor.fetchall()
+        }
+
+    except sqlite3.Error as e:
+        print(f"Ошибка SQLite: {e}")
+        return {}
+
+    finally:
+        conn.close()
+
+
 def get_product_category(product_full_name):
     """
     Функция для получения категории товара по его полному имени из базы данных warehouse.db
@@ -394,10 +422,10 @@ def get_product_category(product_full_name):
         str: Категория товара или None, если товар не найден
     """
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
+        conn = acquire(DATABASE_NAME)
         cursor = conn.cursor()
 
-        cursor.execute("SELECT category FROM products WHERE product_full_name = ?", (product_full_name,))
+        cursor.execute(PRODUCT_CATEGORY_SQL, (product_full_name,))
         result = cursor.fetchone()
 
         conn.close()
@@ -453,23 +481,10 @@ def save_order_with_promo(conn, user_id, name, phone, delivery_date, delivery_ti
     """Сохраняет заказ в БД с учетом промокода/акций и скидки"""
     cursor = conn.cursor()
 
-    # Получаем текущее количество заказов у данного пользователя
-    cursor.execute('''
-    SELECT COUNT(*) FROM orders WHERE user_id = ?
-    ''', (user_id,))
+    # Номер заказа пользователя - из счетчика его заказов
+    user_order_count = _next_user_order_number(cursor, user_id)
 
-    # Увеличиваем на 1 для нового заказа
-    user_order_count = cursor.fetchone()[0] + 1
-
-    # Формируем комментарий с информацией о скидке
-    discount_info = ""
-    if discount_amount > 0:
-        if discount_type == 'promo' and promo_code:
-            discount_info = f" [Промокод: {promo_code}, скидка: {discount_amount:.2f} ₽]"
-        elif discount_type == 'action':
-            discount_info = f" [Акции, скидка: {discount_amount:.2f} ₽]"
-
-    full_comment = comment + discount_info if comment else discount_info.strip()
+    full_comment = _order_comment(comment, promo_code, discount_amount, discount_type)
 
     # Вставляем заказ с номером пользователя и скидкой
     cursor.execute('''
@@ -485,6 +500,100 @@ def save_order_with_promo(conn, user_id, name, phone, delivery_date, delivery_ti
     return [global_order_id, user_order_count]
 
 
+def _order_comment(comment, promo_code, discount_amount, discount_type):
+    """Формирует комментарий к заказу с информацией о скидке"""
+    discount_info = ""
+    if discount_amount > 0:
+        if discount_type == 'promo' and promo_code:
+            discount_info = f" [Промокод: {promo_code}, скидка: {discount_amount:.2f} ₽]"
+        elif discount_type == 'action':
+            discount_info = f" [Акции, скидка: {discount_amount:.2f} ₽]"
+
+    return comment + discount_info if comment else discount_info.strip()
+
+
+def place_order(user_id, order, discount_amount=0.0, discount_type='none',
+                promo_code=None, promo_code_id=None):
+    """
+    Оформляет заказ одной транзакцией: заказ, все его товары, использование промокода,
+    очистка корзины и удаление незавершенного заказа. При ошибке все изменения откатываются.
+    Корзина читается внутри той же транзакции, поэтому в заказ попадает ровно то, что удаляется
+    из корзины, а повторное подтверждение не создает второй заказ из той же корзины.
+
+    Ограничение: использование промокода пишется в подключенную discounts.db. Обе базы
+    работают в режиме WAL, а в нем SQLite не гарантирует атомарность транзакции между
+    файлами при сбое процесса или питания: после восстановления current_uses и
+    promo_code_usage могут оказаться записанными без самого заказа (и наоборот).
+    Откат при ошибке внутри работающего процесса при этом затрагивает обе базы.
+
+    order - данные заказа: name, phone, delivery_date, delivery_time, delivery_type,
+    delivery_address, payment_method, comment.
+    Возвращает [ID заказа, номер заказа пользователя, позиции корзины],
+    CART_EMPTY, если корзина уже пуста (заказ уже оформлен), или None при ошибке.
+    """
+    conn = create_connection()
+    if not conn:
+        return None
+
+    apply_promo = discount_type == 'promo' and promo_code_id is not None and discount_amount > 0
+    try:
+        # Склад и промокоды хранятся в отдельных базах; ATTACH нельзя выполнить внутри транзакции
+        conn.attach(DATABASE_NAME, 'warehouse')
+        if apply_promo:
+            conn.attach(DISCOUNTS_DATABASE, 'discounts')
+
+        conn.execute("BEGIN IMMEDIATE")
+        cursor = conn.cursor()
+
+        cart_items = _select_cart_items(cursor, user_id)
+        if not cart_items:
+            conn.rollback()
+            return CART_EMPTY
+
+        # Номер заказа пользователя - из счетчика его заказов
+        user_order_count = _next_user_order_number(cursor, user_id)
+
+        cursor.execute('''
+        INSERT INTO orders (user_id, user_order_id, name, phone, delivery_date, delivery_time,
+                           delivery_type, delivery_address, payment_method, comment, discount, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'processing')
+        ''', (user_id, user_order_count, order['name'], order['phone'], order['delivery_date'],
+              order['delivery_time'], order['delivery_type'], order['delivery_address'], order['payment_method'],
+              _order_comment(order.get('comment', ''), promo_code, discount_amount, discount_type),
+              discount_amount))
+        order_id = cursor.lastrowid
+
+        cursor.executemany('''
+        INSERT INTO order_items (order_id, product_id, quantity, price)
+        VALUES (?, ?, ?, ?)
+        ''', [(order_id, item['product_id'], item['quantity'], item['price']) for item in cart_items])
+
+        if apply_promo:
+            cursor.execute(
+                "UPDATE discounts.promo_codes SET current_uses = current_uses + 1 WHERE id = ?",
+                (promo_code_id,)
+            )
+            cursor.execute('''
+            INSERT INTO discounts.promo_code_usage (promo_code_id, user_id, order_id, discount_amount, order_total)
+            VALUES (?, ?, ?, ?, ?)
+            ''', (promo_code_id, user_id, order_id, discount_amount,
+                  sum(item['total_price'] for item in cart_items)))
+
+        cursor.execute("DELETE FROM cart WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM incomplete_orders WHERE user_id = ?", (user_id,))
+
+        conn.commit()
+        return [order_id, user_order_count, cart_items]
+
+    except sqlite3.Error as e:
+        conn.rollback()
+        logger.error(f"Ошибка при оформлении заказа пользователя {user_id}: {e}")
+        return None
+
+    finally:
+        close_connection(conn)
+
+
 def calculate_cart_total(user_id):
     """Вычисляет общую стоимость корзины"""
     cart_items = get_cart_items(user_id)
@@ -496,15 +605,15 @@ if __name__ == "__main__":
     # Настройка логирования, если нужно
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-    # 1. Получаем соединение с базой данных
+    # 1. Убедимся, что схема базы данных актуальна (при запуске бота это делает main.py)
+    from database.migrations import run_migrations
+    run_migrations()
+
+    # 2. Получаем соединение с базой данных
     conn = get_db_connection()
 
     if conn:
         try:
-            # 2. Убедимся, что таблицы созданы (вызывается один раз при инициализации приложения)
-            # Обычно это делается при первом запуске или миграциях,
-            # но для демонстрации можно вызвать здесь.
-            create_orders_table(conn)
 
             # 3. Подготавливаем данные для нового заказа
             # !!! ВАЖНО: user_id должен существовать в вашей таблице users (например, в поле telegram_id)
@@ -1,6 +1,8 @@
 import logging
 import sqlite3
 
+from database.connection_pool import acquire
+
 logger = logging.getLogger(__name__)
 
 DATABASE_FILE = "shop_bot.db"  # Имя файла вашей основной базы данных бота
@@ -8,15 +10,14 @@ DATABASE_FILE = "shop_bot.db"  # Имя файла вашей основной 
 
 def create_connection():
     """
-    Создает соединение с базой данных SQLite.
+    Выдает соединение с базой данных SQLite из пула.
     Возвращает объект соединения или None в случае ошибки.
     """
     conn = None
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
+        conn = acquire(DATABASE_FILE)
         # Включаем поддержку внешних ключей (важно для FOREIGN KEY)
         conn.execute("PRAGMA foreign_keys = ON")
-        logging.info(f"Успешное подключение к базе данных SQLite: {DATABASE_FILE}")
     except sqlite3.Error as e:
         logging.error(f"Ошибка подключения к базе данных SQLite '{DATABASE_FILE}': {e}", exc_info=True)
     return conn
@@ -24,11 +25,10 @@ def create_connection():
 
 def close_connection(conn):
     """
-    Закрывает соединение с базой данных.
+    Возвращает соединение с базой данных в пул.
     """
     if conn:
         conn.close()
-        logging.info(f"Соединение с SQLite '{DATABASE_FILE}' закрыто.")
 
 
 def create_users_table():
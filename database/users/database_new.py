@@ -2,6 +2,7 @@ import logging
 import sqlite3
 from database.users.database_connection import create_connection, close_connection
 from config import DATABASE_NAME
+from database.connection_pool import acquire
 
 logger = logging.getLogger(__name__)
 
@@ -84,7 +85,7 @@ def get_cart_items(user_id):
             cursor = conn.cursor()
 
             # Подключаемся к базе данных с товарами
-            warehouse_conn = sqlite3.connect(DATABASE_NAME)
+            warehouse_conn = acquire(DATABASE_NAME)
             warehouse_cursor = warehouse_conn.cursor()
 
             # Получаем информацию о товарах в корзине
@@ -393,7 +394,7 @@ def get_product_category(product_full_name):
         str: Категория товара или None, если товар не найден
     """
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
+        conn = acquire(DATABASE_NAME)
         cursor = conn.cursor()
 
         cursor.execute("SELECT category FROM products WHERE product_full_name = ?", (product_full_name,))
@@ -4,30 +4,8 @@ from database.users.database_connection import create_connection, close_connecti
 from database.users.warehouse_connection import create_connection_warehouse, close_connection_warehouse
 
 
-def create_favorites_table():
-    """Создание таблицы избранного если она не существует"""
-    conn = create_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS favorites (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            telegram_id INTEGER NOT NULL,
-            product_id INTEGER NOT NULL,
-            added_date DATETIME NOT NULL,
-            FOREIGN KEY (telegram_id) REFERENCES users(telegram_id),
-            UNIQUE(telegram_id, product_id)
-        )
-        ''')
-        conn.commit()
-    finally:
-        close_connection(conn)
-
-
 def get_user_favorites(telegram_id: int):
     """Получение списка избранных товаров пользователя"""
-    create_favorites_table()
-
     conn = create_connection()
     warehouse_conn = create_connection_warehouse()
 
@@ -66,8 +44,6 @@ def get_user_favorites(telegram_id: int):
 
 def is_product_in_favorites(telegram_id: int, product_id: int) -> bool:
     """Проверка наличия товара в избранном пользователя"""
-    create_favorites_table()
-
     conn = create_connection()
     try:
         cursor = conn.cursor()
@@ -84,8 +60,6 @@ def is_product_in_favorites(telegram_id: int, product_id: int) -> bool:
 
 def add_product_to_favorites(telegram_id: int, product_id: int) -> bool:
     """Добавление товара в избранное пользователя"""
-    create_favorites_table()
-
     # Проверяем существование товара на складе
     warehouse_conn = create_connection_warehouse()
     try:
@@ -122,8 +96,6 @@ def add_product_to_favorites(telegram_id: int, product_id: int) -> bool:
 
 def remove_product_from_favorites(telegram_id: int, product_id: int) -> bool:
     """Удаление товара из избранного пользователя"""
-    create_favorites_table()
-
     conn = create_connection()
     try:
         cursor = conn.cursor()
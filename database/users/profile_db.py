@@ -4,58 +4,7 @@ import logging
 
 from database.users.database_connection import create_connection, close_connection
 from database.users.warehouse_connection import create_connection_warehouse, close_connection_warehouse
-
-
-def create_profile_tables():
-    """Создание таблиц для личного кабинета"""
-    conn = create_connection()
-    if conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS notification_settings (
-                user_id INTEGER PRIMARY KEY,
-                order_status_notifications BOOLEAN DEFAULT TRUE,
-                notification_start_time TEXT DEFAULT '10:00',
-                notification_end_time TEXT DEFAULT '22:00',
-                notification_frequency TEXT DEFAULT 'daily'
-            )
-            ''')
-
-            # Проверяем существование таблицы orders
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='orders'")
-            table_exists = cursor.fetchone()
-
-            if not table_exists:
-                cursor.execute('''
-                CREATE TABLE IF NOT EXISTS orders (
-                    order_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    status TEXT DEFAULT 'Принят на обработку',
-                    creation_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    payment_method TEXT,
-                    delivery_address TEXT,
-                    total_amount REAL,
-                    FOREIGN KEY (user_id) REFERENCES users(telegram_id)
-                )
-                ''')
-            else:
-                # Проверяем существование полей в таблице orders
-                cursor.execute("PRAGMA table_info(orders)")
-                columns = cursor.fetchall()
-                column_names = [column[1] for column in columns]
-
-                if 'status' not in column_names:
-                    cursor.execute("ALTER TABLE orders ADD COLUMN status TEXT DEFAULT 'Принят на обработку'")
-                if 'created_at' not in column_names:
-                    cursor.execute("ALTER TABLE orders ADD COLUMN created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
-
-            conn.commit()
-            logging.info("Таблицы для личного кабинета успешно созданы.")
-        except sqlite3.Error as e:
-            logging.error(f"Ошибка при создании таблиц для личного кабинета: {e}")
-        finally:
-            close_connection(conn)
+from database.users.database import get_products_info
 
 
 def init_notification_settings(user_id):
@@ -309,10 +258,6 @@ def get_product_info_from_order(order_id):
     Получает информацию о товарах в заказе (flavor, product_name, product_full_name)
     из warehouse.db, основываясь на order_id в shop_bot.db.
     """
-    conn_warehouse = create_connection_warehouse()
-    if not conn_warehouse:
-        return None
-
     conn_shop = create_connection()
     if not conn_shop:
         return None
@@ -328,35 +273,25 @@ def get_product_info_from_order(order_id):
             """,
             (order_id,)
         )
-        product_ids = cursor_shop.fetchall()
+        product_ids = [row[0] for row in cursor_shop.fetchall()]
 
         if not product_ids:
             return None  # В заказе нет товаров
 
-        product_info_list = []
+        # Данные всех товаров заказа - одним запросом к складу
+        products_info = get_products_info(product_ids)
 
-        cursor_warehouse = conn_warehouse.cursor()
-
-        for product_id_tuple in product_ids:
-            product_id = product_id_tuple[0]  # Извлекаем product_id из кортежа
+        product_info_list = []
 
-            cursor_warehouse.execute(
-                """
-                SELECT flavor, product_name, product_full_name
-                FROM products
-                WHERE id = ?
-                """,
-                (product_id,)
-            )
-            product_info = cursor_warehouse.fetchone()
+        for product_id in product_ids:
+            product_info = products_info.get(product_id)
 
             if product_info:
-                flavor, product_name, product_full_name = product_info
                 product_info_list.append({
                     'product_id': product_id,
-                    'flavor': flavor,
-                    'product_name': product_name,
-                    'product_full_name': product_full_name
+                    'flavor': product_info['flavor'],
+                    'product_name': product_info['product_name'],
+                    'product_full_name': product_info['product_full_name']
                 })
             else:
                 product_info_list.append({
@@ -373,10 +308,7 @@ def get_product_info_from_order(order_id):
         return None
 
     finally:
-        if conn_warehouse:
-            close_connection_warehouse(conn_warehouse)
-        if conn_shop:
-            close_connection(conn_shop)
+        close_connection(conn_shop)
 
 
 def add_items_to_cart_from_order(user_id, order_id):
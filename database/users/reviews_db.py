@@ -2,6 +2,7 @@ import logging
 import sqlite3
 
 from config import DB_REVIEWS_PATH
+from database.connection_pool import acquire
 
 logger = logging.getLogger(__name__)
 
@@ -9,7 +10,7 @@ logger = logging.getLogger(__name__)
 def connect_db():
     """Устанавливает соединение с базой данных."""
     try:
-        conn = sqlite3.connect(DB_REVIEWS_PATH)
+        conn = acquire(DB_REVIEWS_PATH)
         cursor = conn.cursor()
         logger.info(f"Успешно подключено к базе данных: {DB_REVIEWS_PATH}")
         return conn, cursor
@@ -25,61 +26,6 @@ def close_db(conn):
         logger.info("Соединение с базой данных закрыто.")
 
 
-def create_product_reviews_table():
-    """Создает таблицу product_reviews, если она не существует."""
-    conn, cursor = connect_db()
-    if not conn:
-        return False
-    try:
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS product_reviews (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                product_id INTEGER NOT NULL,
-                rating INTEGER NOT NULL,
-                comment TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(telegram_id),
-                FOREIGN KEY (product_id) REFERENCES products(id)
-            )
-        """)
-        conn.commit()
-        logger.info("Таблица product_reviews успешно создана (или уже существовала).")
-        return True
-    except sqlite3.Error as e:
-        logger.error(f"Ошибка при создании таблицы product_reviews: {e}")
-        return False
-    finally:
-        close_db(conn)
-
-
-def create_delivery_comments_table():
-    """Создает таблицу delivery_comments, если она не существует."""
-    conn, cursor = connect_db()
-    if not conn:
-        return False
-    try:
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS delivery_comments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                order_id INTEGER NOT NULL,
-                comment TEXT,
-                rating INTEGER NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(telegram_id)
-            )
-        """)
-        conn.commit()
-        logger.info("Таблица delivery_comments успешно создана (или уже существовала).")
-        return True
-    except sqlite3.Error as e:
-        logger.error(f"Ошибка при создании таблицы delivery_comments: {e}")
-        return False
-    finally:
-        close_db(conn)
-
-
 def add_product_review(user_id, product_id, rating, comment):
     """Добавляет отзыв о товаре в базу данных."""
     conn, cursor = connect_db()
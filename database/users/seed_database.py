@@ -2,13 +2,14 @@ import sqlite3
 import os
 import random
 from config import  DATABASE_NAME
+from database.connection_pool import acquire
 
 
 def create_connection():
     """Создает соединение с базой данных."""
     conn = None
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
+        conn = acquire(DATABASE_NAME)
     except sqlite3.Error as e:
         print(f"Ошибка подключения к базе данных {DATABASE_NAME}: {e}")
     return conn
@@ -1,133 +1,76 @@
 import logging
 import sqlite3
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from config import DATABASE_NAME
+from database.connection_pool import acquire
+from database.stock_events import emit_stock_changed
+from database.users.catalog_cache import catalog_cache, invalidate_catalog_cache
 
 logger = logging.getLogger(__name__)
 
+# Запросы каталога; их планы проверяет database.migrations.check_query_plans()
+PRODUCT_ID_BY_FULL_NAME_SQL = "SELECT id FROM products WHERE product_full_name = ?"
+AVAILABLE_PRODUCT_NAMES_SQL = "SELECT DISTINCT product_name FROM products WHERE category = ? AND quantity > 0"
+AVAILABLE_PRODUCTS_SQL = (
+    "SELECT product_full_name, flavor, price, id, description, quantity, image_path "
+    "FROM products WHERE category = ? AND product_name = ? AND quantity > 0"
+)
+
 
 def create_connection_warehouse():
     """Создает соединение с базой данных warehouse.db."""
     conn = None
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
-        logger.info(f"Подключение к базе данных {DATABASE_NAME} установлено.")
+        conn = acquire(DATABASE_NAME)
     except sqlite3.Error as e:
         print(f"Ошибка подключения к базе данных {DATABASE_NAME}: {e}")
     return conn
 
 
 def close_connection_warehouse(conn):
-    """Закрывает соединение с базой данных warehouse.db."""
+    """Возвращает соединение с базой данных warehouse.db в пул."""
     if conn:
         try:
             conn.close()
-            logger.info(f"Соединение с базой данных {DATABASE_NAME} закрыто.")
         except sqlite3.Error as e:
             print(f"Ошибка при закрытии соединения с базой данных {DATABASE_NAME}: {e}")
 
 
-def create_product_images_table(conn):
-    """Функция для создания таблицы product_images"""
-    cursor = conn.cursor()
-
-    # Создаем таблицу product_images
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS product_images (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        product_name TEXT UNIQUE,
-        image_absolute_path TEXT,
-        category TEXT,
-        upload_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-        last_modified DATETIME DEFAULT CURRENT_TIMESTAMP,
-        is_active BOOLEAN DEFAULT 1,
-        file_size INTEGER,
-        content_type TEXT
-    )
-    ''')
-
-    conn.commit()
-    conn.close()
-
-    print("Таблица product_images успешно создана!")
-
-
 def fetch_categories():
-    """Получает список уникальных категорий товаров из базы данных."""
-    conn = create_connection_warehouse()
-    categories = []
-    if conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute("SELECT DISTINCT category FROM products")
-            rows = cursor.fetchall()
-            categories = [row[0] for row in rows]
-        except sqlite3.Error as e:
-            print(f"Ошибка при запросе категорий: {e}")
-        finally:
-            close_connection_warehouse(conn)
-    return categories
+    """Получает список уникальных категорий товаров (из кэша каталога)."""
+    try:
+        return catalog_cache.categories()
+    except sqlite3.Error as e:
+        print(f"Ошибка при запросе категорий: {e}")
+        return []
 
 
 def fetch_product_names_by_category(category_name):
-    """Получает список уникальных product_name для заданной категории."""
-    conn = create_connection_warehouse()
-    product_names = []
-    if conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
-                "SELECT DISTINCT product_name FROM products WHERE category = ?",
-                (category_name,)
-            )
-            rows = cursor.fetchall()
-            product_names = [row[0] for row in rows]
-        except sqlite3.Error as e:
-            print(f"Ошибка при запросе названий товаров: {e}")
-        finally:
-            close_connection_warehouse(conn)
-    return product_names
+    """Получает список уникальных product_name для заданной категории (из кэша каталога)."""
+    try:
+        return catalog_cache.product_names(category_name)
+    except sqlite3.Error as e:
+        print(f"Ошибка при запросе названий товаров: {e}")
+        return []
 
 
 def fetch_products_by_category_and_product_name(category_name, product_name):
-    """Получает список товаров для заданной категории и product_name."""
-    conn = create_connection_warehouse()
-    products = []
-    if conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
-                "SELECT product_full_name, flavor, price, id, description, quantity, image_path FROM products "
-                "WHERE category = ? AND product_name = ?",
-                (category_name, product_name)
-            )
-            products = cursor.fetchall()
-        except sqlite3.Error as e:
-            print(f"Ошибка при запросе товаров: {e}")
-        finally:
-            close_connection_warehouse(conn)
-    return products
+    """Получает список товаров для заданной категории и product_name (из кэша каталога)."""
+    try:
+        return catalog_cache.products(category_name, product_name)
+    except sqlite3.Error as e:
+        print(f"Ошибка при запросе товаров: {e}")
+        return []
 
 
 def get_product_by_id(product_id):
-    """Получает информацию о товаре по его ID."""
-    conn = create_connection_warehouse()
-    product = None
-    if conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
-                "SELECT id, category, product_name, product_full_name, flavor, price, description, quantity, image_path "
-                "FROM products WHERE id = ?",
-                (product_id,)
-            )
-            product = cursor.fetchone()
-        except sqlite3.Error as e:
-            print(f"Ошибка при запросе товара по ID: {e}")
-        finally:
-            close_connection_warehouse(conn)
-    return product
+    """Получает информацию о товаре по его ID (из кэша каталога)."""
+    try:
+        return catalog_cache.product_by_id(product_id)
+    except sqlite3.Error as e:
+        print(f"Ошибка при запросе товара по ID: {e}")
+        return None
 
 
 def get_product_count(category, product_name):
@@ -158,10 +101,7 @@ def get_product_id_by_full_name(product_full_name):
     if conn:
         cursor = conn.cursor()
         try:
-            cursor.execute(
-                "SELECT id FROM products WHERE product_full_name = ?",
-                (product_full_name,)
-            )
+            cursor.execute(PRODUCT_ID_BY_FULL_NAME_SQL, (product_full_name,))
             result = cursor.fetchone()
             if result:
                 product_id = result[0]
@@ -183,6 +123,8 @@ def update_product_quantity(product_id, new_quantity):
                 (new_quantity, product_id)
             )
             conn.commit()
+            invalidate_catalog_cache()
+            emit_stock_changed([product_id])
             return True
         except sqlite3.Error as e:
             print(f"Ошибка при обновлении количества товара: {e}")
@@ -192,10 +134,72 @@ def update_product_quantity(product_id, new_quantity):
     return False
 
 
+def decrement_product_quantities(items: Dict[str, int]) -> Tuple[bool, List[Dict]]:
+    """
+    Списывает со склада товары заказа одной транзакцией: либо все позиции, либо ни одной.
+
+    items - {product_full_name: количество}. Возвращает (успех, результаты по позициям);
+    результат позиции - словарь product_name, product_id, requested, quantity и status:
+    'ok', 'not_found' или 'insufficient'. quantity - остаток после списания
+    (для 'insufficient' - доступное количество).
+    """
+    conn = create_connection_warehouse()
+    if not conn:
+        return False, []
+
+    try:
+        # Блокировка записи берется сразу: остатки не изменятся между проверкой и списанием
+        conn.execute("BEGIN IMMEDIATE")
+        names = list(items)
+        cursor = conn.execute(
+            f"SELECT product_full_name, id, quantity FROM products "
+            f"WHERE product_full_name IN ({','.join('?' * len(names))})",
+            names
+        )
+        stock = {name: (product_id, quantity) for name, product_id, quantity in cursor.fetchall()}
+
+        results = []
+        success = True
+        for name, requested in items.items():
+            product_id, quantity = stock.get(name, (None, None))
+            result = {"product_name": name, "product_id": product_id, "requested": requested, "quantity": quantity}
+            if product_id is None:
+                result["status"] = "not_found"
+            else:
+                cursor = conn.execute(
+                    "UPDATE products SET quantity = quantity - ? WHERE id = ? AND quantity >= ?",
+                    (requested, product_id, requested)
+                )
+                if cursor.rowcount:
+                    result["status"] = "ok"
+                    result["quantity"] = quantity - requested
+                else:
+                    result["status"] = "insufficient"
+            success = success and result["status"] == "ok"
+            results.append(result)
+
+        if not success:
+            conn.rollback()
+            return False, results
+
+        conn.commit()
+        invalidate_catalog_cache()
+        emit_stock_changed(result["product_id"] for result in results)
+        return True, results
+
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Ошибка при списании товаров со склада: {e}")
+        return False, []
+
+    finally:
+        close_connection_warehouse(conn)
+
+
 def get_product_stock_quantity(product_id):
     """Получает доступное количество товара на складе"""
     import sqlite3
-    conn = sqlite3.connect('warehouse.db')
+    conn = acquire('warehouse.db')
     cursor = conn.cursor()
 
     try:
@@ -239,7 +243,7 @@ def get_product_quantity(product_id):
 
 
 def get_total_value_db():
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = acquire(DATABASE_NAME)
     cursor = conn.cursor()
     cursor.execute("SELECT SUM(quantity * price) FROM products")
     total_value = cursor.fetchone()[0]
@@ -249,31 +253,35 @@ def get_total_value_db():
 
 def get_available_product_names(conn, category_name):
     cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT DISTINCT product_name 
-        FROM products 
-        WHERE category = ? AND quantity > 0
-        """,
-        (category_name,)
-    )
+    cursor.execute(AVAILABLE_PRODUCT_NAMES_SQL, (category_name,))
     rows = cursor.fetchall()
     return [row[0] for row in rows]
 
 
 def get_products_by_category_and_name(conn, category_name, product_name):
     cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT product_full_name, flavor, price, id, description, quantity, image_path 
-        FROM products 
-        WHERE category = ? AND product_name = ? AND quantity > 0
-        """,
-        (category_name, product_name)
-    )
+    cursor.execute(AVAILABLE_PRODUCTS_SQL, (category_name, product_name))
     return cursor.fetchall()
 
 
+def fetch_available_product_names(category_name):
+    """Получает список product_name категории, у которых есть товар в наличии (из кэша каталога)."""
+    try:
+        return catalog_cache.available_product_names(category_name)
+    except sqlite3.Error as e:
+        print(f"Ошибка при запросе названий товаров в наличии: {e}")
+        return []
+
+
+def fetch_available_products(category_name, product_name):
+    """Получает список товаров в наличии для заданной категории и product_name (из кэша каталога)."""
+    try:
+        return catalog_cache.available_products(category_name, product_name)
+    except sqlite3.Error as e:
+        print(f"Ошибка при запросе товаров в наличии: {e}")
+        return []
+
+
 def get_product_by_details(category: str, product_name: str, flavor: str) -> Optional[Tuple]:
     """Получает товар по категории, названию и вкусу"""
     conn = create_connection_warehouse()
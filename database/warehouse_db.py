@@ -1,9 +1,9 @@
-import sqlite3
+from database.connection_pool import acquire
 
 
 class WarehouseDatabase:
     def __init__(self, db_file="warehouse.db"):
-        self.connection = sqlite3.connect(db_file)
+        self.connection = acquire(db_file)
         self.cursor = self.connection.cursor()
 
     def get_all_categories(self) -> list[str]:
@@ -1,18 +1,16 @@
-import asyncio
 import json
-from typing import Dict
 from datetime import datetime
 
 from aiogram import Router, F, Bot
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.exceptions import TelegramRetryAfter
 
-from database.admins.users_db import get_all_users, get_active_users, get_user_regions, count_users
+from database.db_executor import db_read, db_write
+from database.admins.users_db import get_user_regions, count_users, count_recipients
 from database.admins.broadcast_db import (
-    ensure_broadcast_tables, get_broadcast_templates,
-    get_broadcast_template, start_broadcast, update_broadcast_status,
+    get_broadcast_templates,
+    get_broadcast_template, start_broadcast,
     get_broadcast_history, get_broadcast_details
 )
 from filters.admin_filter import AdminFilter
@@ -29,14 +27,13 @@ from utils.broadcast_utils import (
     format_broadcast_preview,
     format_broadcast_details, parse_scheduled_time
 )
+from utils.broadcast_engine import broadcast_engine
+from utils.job_scheduler import job_scheduler
 
 router = Router()
 router.message.filter(AdminFilter())
 router.callback_query.filter(AdminFilter())
 
-# Убедимся, что таблицы для рассылок существуют
-ensure_broadcast_tables()
-
 
 # Состояния для FSM
 class BroadcastStates(StatesGroup):
@@ -157,7 +154,7 @@ async def process_use_template(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
 
     # Получаем шаблоны из базы данных
-    templates = get_broadcast_templates()
+    templates = await db_read(get_broadcast_templates)
     TEMPLATES_CACHE[user_id] = templates
 
     if not templates:
@@ -185,7 +182,7 @@ async def process_template_selection(callback: CallbackQuery, state: FSMContext)
     user_id = callback.from_user.id
     _, template_id = callback.data.split(":", 1)
 
-    template = get_broadcast_template(int(template_id))
+    template = await db_read(get_broadcast_template, int(template_id))
 
     if not template:
         await callback.message.edit_text(
@@ -315,7 +312,7 @@ async def process_target_selection(callback: CallbackQuery, state: FSMContext):
 
     if target_type == "all":
         # Получаем общее количество пользователей
-        total_users = count_users()
+        total_users = await db_read(count_users)
         BROADCAST_DATA[user_id]["total_recipients"] = total_users
 
         await callback.message.edit_text(
@@ -338,7 +335,7 @@ async def process_target_selection(callback: CallbackQuery, state: FSMContext):
 
     elif target_type == "region":
         # Получаем список регионов из базы данных
-        regions_dict = get_user_regions()
+        regions_dict = await db_read(get_user_regions)
         regions = list(regions_dict.keys())
         REGIONS_CACHE[user_id] = regions_dict
 
@@ -384,15 +381,15 @@ async def process_active_period(callback: CallbackQuery, state: FSMContext):
     _, days = callback.data.split(":", 1)
     days = int(days)
 
-    # Получаем активных пользователей за выбранный период
-    active_users = get_active_users(days)
+    # Считаем активных пользователей за выбранный период
+    recipients_count = await db_read(count_recipients, "active", {"active_days": days})
 
     BROADCAST_DATA[user_id]["active_days"] = days
-    BROADCAST_DATA[user_id]["total_recipients"] = len(active_users)
+    BROADCAST_DATA[user_id]["total_recipients"] = recipients_count
 
     await callback.message.edit_text(
         f"⏰ <b>Выберите время отправки:</b>\n\n"
-        f"Выбрано получателей: {len(active_users)}",
+        f"Выбрано получателей: {recipients_count}",
         reply_markup=get_time_selection_keyboard(),
         parse_mode="HTML"
     )
@@ -427,16 +424,16 @@ async def process_region_selection(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
     _, region = callback.data.split(":", 1)
 
-    # Получаем пользователей выбранного региона
-    users_in_region = REGIONS_CACHE[user_id].get(region, [])
+    # Считаем пользователей выбранного региона
+    recipients_count = await db_read(count_recipients, "region", {"region": region})
 
     BROADCAST_DATA[user_id]["region"] = region
-    BROADCAST_DATA[user_id]["total_recipients"] = len(users_in_region)
+    BROADCAST_DATA[user_id]["total_recipients"] = recipients_count
 
     await callback.message.edit_text(
         f"⏰ <b>Выберите время отправки:</b>\n\n"
         f"Выбран регион: {region}\n"
-        f"Количество получателей: {len(users_in_region)}",
+        f"Количество получателей: {recipients_count}",
         reply_markup=get_time_selection_keyboard(),
         parse_mode="HTML"
     )
@@ -693,8 +690,13 @@ async def cmd_start_sending(callback: CallbackQuery, state: FSMContext, bot: Bot
         await callback.answer()
         return
 
+    # Параметры аудитории сохраняются вместе с рассылкой
+    broadcast_data["target_params"] = {
+        key: broadcast_data[key] for key in ("active_days", "region") if key in broadcast_data
+    }
+
     # Сохраняем рассылку в базу данных
-    broadcast_id = start_broadcast(broadcast_data)
+    broadcast_id = await db_write(start_broadcast, broadcast_data)
 
     if broadcast_id == -1:
         await callback.message.edit_text(
@@ -707,9 +709,23 @@ async def cmd_start_sending(callback: CallbackQuery, state: FSMContext, bot: Bot
         await callback.answer()
         return
 
-    # Если указано запланированное время, сообщаем об этом
+    # Если указано запланированное время, ставим рассылку в планировщик
     if "scheduled_time" in broadcast_data:
         scheduled_time = broadcast_data["scheduled_time"]
+        job_id = await job_scheduler.schedule(
+            "broadcast", broadcast_id, datetime.strptime(scheduled_time, "%Y-%m-%d %H:%M:%S")
+        )
+        if job_id == -1:
+            await callback.message.edit_text(
+                "❌ <b>Ошибка</b>\n\n"
+                "Не удалось запланировать рассылку. Пожалуйста, попробуйте еще раз.",
+                reply_markup=get_broadcast_menu_keyboard(),
+                parse_mode="HTML"
+            )
+            await state.clear()
+            await callback.answer()
+            return
+
         await callback.message.edit_text(
             f"✅ <b>Рассылка #{broadcast_id} запланирована</b>\n\n"
             f"Рассылка будет отправлена {scheduled_time}.",
@@ -717,10 +733,9 @@ async def cmd_start_sending(callback: CallbackQuery, state: FSMContext, bot: Bot
             parse_mode="HTML"
         )
         await state.clear()
+        if user_id in BROADCAST_DATA:
+            del BROADCAST_DATA[user_id]
         await callback.answer()
-
-        # TODO: Здесь должна быть логика для планирования отправки
-        # Например, через задачи Celery или другой планировщик
         return
 
     # Начинаем отправку рассылки
@@ -739,106 +754,7 @@ async def cmd_start_sending(callback: CallbackQuery, state: FSMContext, bot: Bot
     await callback.answer()
 
     # Запускаем отправку в фоновом режиме
-    asyncio.create_task(send_broadcast(bot, broadcast_id, broadcast_data))
-
-
-async def send_broadcast(bot: Bot, broadcast_id: int, broadcast_data: Dict):
-    """Отправляет рассылку пользователям"""
-    target_type = broadcast_data.get("target_type", "all")
-
-    # Получаем список получателей
-    if target_type == "all":
-        users = get_all_users()
-        recipients = [user[0] for user in users]  # user_id - первый элемент кортежа
-    elif target_type == "active":
-        days = broadcast_data.get("active_days", 30)
-        recipients = get_active_users(days)
-    elif target_type == "region":
-        region = broadcast_data.get("region", "")
-        regions_dict = get_user_regions()
-        recipients = regions_dict.get(region, [])
-    else:
-        recipients = []
-
-    # Обновляем статус рассылки
-    update_broadcast_status(broadcast_id, "pending", 0)
-
-    # Подготавливаем данные для отправки
-    text = broadcast_data.get("text", "")
-    media_type = broadcast_data.get("media_type")
-    media_file = broadcast_data.get("media_file")
-    buttons = broadcast_data.get("buttons", [])
-
-    # Создаем клавиатуру, если есть кнопки
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-
-    markup = None
-    if buttons:
-        markup = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text=button["text"], url=button["url"])]
-            for button in buttons
-        ])
-
-    # Счетчик успешно отправленных сообщений
-    sent_count = 0
-
-    # Отправляем сообщения
-    for user_id in recipients:
-        try:
-            if media_type == "photo" and media_file:
-                await bot.send_photo(
-                    chat_id=user_id,
-                    photo=media_file,
-                    caption=text,
-                    reply_markup=markup
-                )
-            else:
-                await bot.send_message(
-                    chat_id=user_id,
-                    text=text,
-                    reply_markup=markup
-                )
-
-            sent_count += 1
-
-            # Обновляем прогресс каждые 10 сообщений
-            if sent_count % 10 == 0:
-                update_broadcast_status(broadcast_id, "pending", sent_count)
-
-            # Задержка для избежания ограничений Telegram
-            await asyncio.sleep(0.05)
-
-        except TelegramRetryAfter as e:
-            # При превышении лимита ждем указанное время
-            await asyncio.sleep(e.retry_after)
-
-            # Повторная попытка отправки
-            try:
-                if media_type == "photo" and media_file:
-                    await bot.send_photo(
-                        chat_id=user_id,
-                        photo=media_file,
-                        caption=text,
-                        reply_markup=markup
-                    )
-                else:
-                    await bot.send_message(
-                        chat_id=user_id,
-                        text=text,
-                        reply_markup=markup
-                    )
-
-                sent_count += 1
-            except Exception:
-                continue
-
-        except Exception as e:
-            # Игнорируем другие ошибки и продолжаем
-            print(f"Ошибка при отправке рассылки пользователю {user_id}: {e}")
-            continue
-
-    # Обновляем статус рассылки как завершенную
-    update_broadcast_status(broadcast_id, "completed", sent_count)
+    broadcast_engine.start(bot, broadcast_id)
 
 
 @router.callback_query(F.data == "cancel_sending")
@@ -884,7 +800,7 @@ async def cmd_broadcast_templates(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
 
     # Получаем шаблоны из базы данных
-    templates = get_broadcast_templates()
+    templates = await db_read(get_broadcast_templates)
     TEMPLATES_CACHE[user_id] = templates
 
     if not templates:
@@ -938,7 +854,7 @@ async def cmd_broadcast_history(callback: CallbackQuery):
     user_id = callback.from_user.id
 
     # Получаем историю рассылок из базы данных
-    broadcasts = get_broadcast_history()
+    broadcasts = await db_read(get_broadcast_history)
 
     if not broadcasts:
         await callback.message.edit_text(
@@ -965,7 +881,7 @@ async def cmd_history_page(callback: CallbackQuery):
     page = int(page)
 
     # Получаем историю рассылок из базы данных
-    broadcasts = get_broadcast_history()
+    broadcasts = await db_read(get_broadcast_history)
 
     await callback.message.edit_text(
         "📊 <b>История рассылок</b>\n\n"
@@ -984,7 +900,7 @@ async def cmd_view_broadcast(callback: CallbackQuery):
     broadcast_id = int(broadcast_id)
 
     # Получаем информацию о рассылке
-    broadcast = get_broadcast_details(broadcast_id)
+    broadcast = await db_read(get_broadcast_details, broadcast_id)
 
     if not broadcast:
         await callback.message.edit_text(
@@ -15,6 +15,7 @@ from keyboards.admins.client_contact_keyboards import (
     get_cancel_keyboard, get_inline_cancel_keyboard
 )
 from keyboards.admins.menu_keyboard import get_admin_menu_keyboard
+from utils.telegram_sender import telegram_sender, ChatUnreachableError
 from database.admins.client_contact_db import (
     log_message_sent,
     get_client_info, get_client_orders
@@ -276,18 +277,18 @@ async def confirm_and_send(callback: CallbackQuery, state: FSMContext, bot: Bot)
 
     try:
         if data['message_type'] == 'text':
-            await bot.send_message(
+            await telegram_sender.send(client_id, lambda: bot.send_message(
                 chat_id=client_id,
                 text=data['message_text'],
                 parse_mode=ParseMode.HTML
-            )
+            ))
         else:
-            await bot.send_photo(
+            await telegram_sender.send(client_id, lambda: bot.send_photo(
                 chat_id=client_id,
                 photo=data['photo_file_id'],
                 caption=data.get('message_text'),
                 parse_mode=ParseMode.HTML if data.get('message_text') else None
-            )
+            ))
 
         log_message_sent(
             admin_id=admin_id,
@@ -304,7 +305,7 @@ async def confirm_and_send(callback: CallbackQuery, state: FSMContext, bot: Bot)
             reply_markup=get_back_to_menu_keyboard()
         )
 
-    except TelegramForbiddenError:
+    except (TelegramForbiddenError, ChatUnreachableError):
         error_msg = "Бот заблокирован пользователем"
         log_message_sent(
             admin_id=admin_id,
@@ -6,7 +6,7 @@ from aiogram.fsm.state import State, StatesGroup
 from database.admins.products_db import (
     get_paginated_products, get_product_details, add_product,
     update_product, toggle_product_status, get_categories,
-    add_category, update_category, delete_category, ensure_product_status_column
+    add_category, update_category, delete_category
 )
 from filters.admin_filter import AdminFilter
 from keyboards.admins.product_keyboards import (
@@ -48,9 +48,6 @@ CURRENT_PAGE = {}  # user_id -> page
 CURRENT_PRODUCT = {}  # user_id -> product_id
 TEMP_PRODUCT_DATA = {}  # user_id -> dict
 
-# Убедимся, что столбец is_active существует
-ensure_product_status_column()
-
 
 # Обработчики команд
 @router.callback_query(F.data == "manage_products")
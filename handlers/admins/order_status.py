@@ -18,6 +18,7 @@ from database.admins.orders_bd import (
     update_order_status
 )
 from utils.order_timeout_manager import order_timeout_manager
+from utils.telegram_sender import telegram_sender
 from utils.status_utils import format_order_info, ORDER_STATUS, STATUS_CATEGORIES
 from filters.admin_filter import AdminFilter, CouriersFilter
 from keyboards.admins.menu_keyboard import get_admin_menu_keyboard, get_courier_menu_keyboard
@@ -236,7 +237,8 @@ async def process_status_selection(callback: CallbackQuery, state: FSMContext):
 
         if user_id:
             try:
-                await callback.bot.send_message(
+                await telegram_sender.send_message(
+                    callback.bot,
                     user_id,
                     f"📬 Новое уведомление от бота!\n\n Статус вашего заказа #{user_order_id} изменен с '{old_status_text}' на '{new_status_text}'.",
                     parse_mode='HTML'
@@ -300,7 +302,8 @@ async def process_confirm_delete_order(callback: CallbackQuery, state: FSMContex
     if success:
         if user_id:
             try:
-                await callback.bot.send_message(
+                await telegram_sender.send_message(
+                    callback.bot,
                     user_id,
                     f"📬 Новое уведомление от бота!\n\n"
                     f"Ваш заказ #{user_order_id} был удален администратором.",
@@ -5,13 +5,13 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, CallbackQuery
 from aiogram.exceptions import TelegramBadRequest
 
+from database.db_executor import db_write
 from database.users.database import set_order_discount
 from filters.admin_filter import AdminFilter
 from states.admin_order_state import AdminOrderProcess
 from keyboards.admins.order_process_keyboard import get_back_to_admin_panel_keyboard, get_confirm_order_keyboard
 from keyboards.admins.menu_keyboard import get_admin_menu_keyboard
-from database.users.warehouse_connection import get_product_id_by_full_name, update_product_quantity, \
-    get_product_quantity
+from database.users.warehouse_connection import decrement_product_quantities
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -270,48 +270,26 @@ async def confirm_order(callback: CallbackQuery, state: FSMContext):
     order_id = order_data.get("order_id")  # Получаем ID существующего заказа
     discount = order_data.get("discount", 0)  # Получаем скидку или используем 0 по умолчанию
 
+    # Списываем все товары одной транзакцией: либо весь заказ, либо ничего
+    success, line_results = await db_write(decrement_product_quantities, products)
+
     # Список для хранения результатов обработки товаров
     results = []
-    success_count = 0
-
-    # Обработка каждого товара
-    for product_name, quantity in products.items():
-        try:
-            # Получаем ID товара
-            product_id = get_product_id_by_full_name(product_name)
-
-            if not product_id:
-                results.append(f"❌ Товар '{product_name}' не найден в базе данных.")
-                continue
-
-            # Получаем текущее количество товара
-            current_quantity = get_product_quantity(product_id)
-
-            if current_quantity is None:
-                results.append(f"❌ Не удалось получить текущее количество товара '{product_name}'.")
-                continue
-
-            # Проверяем, достаточно ли товара на складе
-            if current_quantity < quantity:
-                results.append(f"❌ Недостаточное количество товара '{product_name}' на складе. "
-                               f"Требуется: {quantity}, доступно: {current_quantity}.")
-                continue
-
-            # Обновляем количество товара
-            new_quantity = current_quantity - quantity
-            if update_product_quantity(product_id, new_quantity):
-                success_count += 1
-                results.append(f"✅ Товар '{product_name}' обработан успешно. "
-                               f"Новое количество: {new_quantity}.")
-            else:
-                results.append(f"❌ Произошла ошибка при обновлении количества товара '{product_name}'.")
-
-        except Exception as e:
-            logger.error(f"Ошибка при обработке товара {product_name}: {e}")
-            results.append(f"❌ Произошла ошибка при обработке товара '{product_name}': {str(e)}")
+    for line in line_results:
+        product_name = line["product_name"]
+        if line["status"] == "not_found":
+            results.append(f"❌ Товар '{product_name}' не найден в базе данных.")
+        elif line["status"] == "insufficient":
+            results.append(f"❌ Недостаточное количество товара '{product_name}' на складе. "
+                           f"Требуется: {line['requested']}, доступно: {line['quantity']}.")
+        elif success:
+            results.append(f"✅ Товар '{product_name}' обработан успешно. "
+                           f"Новое количество: {line['quantity']}.")
+        else:
+            results.append(f"↩️ Товар '{product_name}' доступен, но не списан: заказ не обработан.")
 
     # Формируем отчет о результатах
-    if success_count == len(products):
+    if success:
         status_message = "✅ Заказ успешно обработан! Количество товаров на складе обновлено."
 
         # Устанавливаем скидку для заказа
@@ -322,10 +300,10 @@ async def confirm_order(callback: CallbackQuery, state: FSMContext):
             logger.error("Не удалось установить скидку: ID заказа не найден")
 
         # TODO: Здесь должна функция update_order_status(order_id, "Подтвержден")
-    elif success_count == 0:
-        status_message = "❌ Не удалось обработать заказ. Ни один товар не был обновлен в базе данных."
+    elif line_results:
+        status_message = "❌ Не удалось обработать заказ. Ни один товар не был списан со склада."
     else:
-        status_message = f"⚠️ Частичное выполнение: успешно обработано {success_count} из {len(products)} товаров."
+        status_message = "❌ Произошла ошибка при обновлении склада. Ни один товар не был списан."
 
     # Формируем полный отчет
     full_report = status_message + "\n\n" + "\n".join(results)
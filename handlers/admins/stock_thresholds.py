@@ -16,7 +16,6 @@ from utils.stock_notification_utils import (
     check_low_stock_products,
 )
 from database.admins.stock_thresholds_db import (
-    create_stock_thresholds_table,
     set_product_threshold,
     get_product_threshold,
     get_all_product_thresholds,
@@ -34,15 +33,6 @@ router.message.filter(AdminFilter())
 router.callback_query.filter(AdminFilter())
 
 
-# Инициализация таблиц при запуске
-def init_stock_thresholds_tables():
-    """Инициализирует таблицы для порогов уведомлений о низком остатке товаров"""
-    conn = create_connection()
-    create_stock_thresholds_table(conn)
-    conn.close()
-    logger.info("Таблицы для порогов уведомлений о низком остатке товаров инициализированы")
-
-
 # Обработчик для открытия меню настройки порогов уведомлений
 @router.callback_query(F.data == "manage_stock_thresholds")
 async def show_stock_threshold_menu(callback: CallbackQuery):
@@ -381,11 +371,8 @@ async def check_low_stock(callback: CallbackQuery):
     """Проверяет все товары с установленными порогами на низкий остаток"""
     await callback.answer("Проверяем товары с низким остатком...")
 
-    shop_conn = create_connection()
-    wh_conn = create_connection_warehouse()
-
     # Запускаем проверку всех товаров
-    await check_low_stock_products(wh_conn, shop_conn, callback.bot)
+    await check_low_stock_products(callback.bot)
 
     await callback.message.edit_text(
         "✅ Проверка товаров с низким остатком выполнена.\n"
@@ -394,9 +381,6 @@ async def check_low_stock(callback: CallbackQuery):
         reply_markup=get_stock_threshold_menu_keyboard()
     )
 
-    shop_conn.close()
-    wh_conn.close()
-
 
 # Обработчик для просмотра журнала уведомлений
 @router.callback_query(F.data == "view_notification_log")
@@ -4,10 +4,12 @@ from aiogram import Router, F
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 import os
+from database.db_executor import db_read, db_write
 from database.users import database as db
 from keyboards.users.inline import create_cart_keyboard
 from database.users.warehouse_connection import get_product_stock_quantity
 from states.cart_state import CartState
+from utils.photo_cache import answer_photo_cached
 
 router = Router()
 
@@ -30,15 +32,15 @@ async def cart_command(message: Message, state: FSMContext):
         await state.clear()
     else:
         if cart_data["photo"] and os.path.exists(cart_data["photo"]):
-            with open(cart_data["photo"], 'rb') as photo:
-                sent_message = await message.answer_photo(
-                    photo=photo,
-                    caption=cart_data["text"],
-                    reply_markup=cart_data["reply_markup"],
-                    parse_mode="HTML"
-                )
-                await state.update_data(last_message_id=sent_message.message_id,
-                                        last_product_id=cart_data.get("product_id"))
+            sent_message = await answer_photo_cached(
+                message.answer_photo,
+                cart_data["photo"],
+                caption=cart_data["text"],
+                reply_markup=cart_data["reply_markup"],
+                parse_mode="HTML"
+            )
+            await state.update_data(last_message_id=sent_message.message_id,
+                                    last_product_id=cart_data.get("product_id"))
         else:
             sent_message = await message.answer(
                 text=cart_data["text"],
@@ -67,15 +69,15 @@ async def show_cart(callback: CallbackQuery, state: FSMContext):
         await state.clear()
     else:
         if cart_data["photo"] and os.path.exists(cart_data["photo"]):
-            with open(cart_data["photo"], 'rb') as photo:
-                sent_message = await callback.message.answer_photo(
-                    photo=photo,
-                    caption=cart_data["text"],
-                    reply_markup=cart_data["reply_markup"],
-                    parse_mode="HTML"
-                )
-                await state.update_data(last_message_id=sent_message.message_id,
-                                        last_product_id=cart_data.get("product_id"))
+            sent_message = await answer_photo_cached(
+                callback.message.answer_photo,
+                cart_data["photo"],
+                caption=cart_data["text"],
+                reply_markup=cart_data["reply_markup"],
+                parse_mode="HTML"
+            )
+            await state.update_data(last_message_id=sent_message.message_id,
+                                    last_product_id=cart_data.get("product_id"))
         else:
             sent_message = await callback.message.answer(
                 text=cart_data["text"],
@@ -89,7 +91,7 @@ async def show_cart(callback: CallbackQuery, state: FSMContext):
 # Показ товара в корзине
 async def show_cart_item(user_id, item_index=0):
     logger.info(f"Показываем корзину для пользователя {user_id}, индекс {item_index}")
-    cart_items = db.get_cart_items(user_id)
+    cart_items = await db_read(db.get_cart_items, user_id)
     logger.info(f"Получены товары: {len(cart_items) if cart_items else 0}")
 
     if not cart_items:
@@ -114,7 +116,7 @@ async def show_cart_item(user_id, item_index=0):
     cart_total = sum(item['total_price'] for item in cart_items)
 
     # Доступное количество на складе
-    stock_quantity = get_product_stock_quantity(product_id)
+    stock_quantity = await db_read(get_product_stock_quantity, product_id)
 
     # Форматируем цены
     price_formatted = format_price(price)
@@ -191,12 +193,13 @@ async def process_cart_callback(callback: CallbackQuery, state: FSMContext):
 
     elif action_type == "inc" and product_id:
         # Увеличение количества
-        cart_items = db.get_cart_items(callback.from_user.id)
+        cart_items = await db_read(db.get_cart_items, callback.from_user.id)
         for item in cart_items:
             if item['product_id'] == product_id:
-                stock_quantity = get_product_stock_quantity(product_id)
+                stock_quantity = await db_read(get_product_stock_quantity, product_id)
 
-                db.update_cart_item_quantity(
+                await db_write(
+                    db.update_cart_item_quantity,
                     callback.from_user.id,
                     product_id,
                     item['quantity'] + 1
@@ -207,12 +210,13 @@ async def process_cart_callback(callback: CallbackQuery, state: FSMContext):
 
     elif action_type == "dec" and product_id:
         # Уменьшение количества
-        cart_items = db.get_cart_items(callback.from_user.id)
+        cart_items = await db_read(db.get_cart_items, callback.from_user.id)
         for item in cart_items:
             if item['product_id'] == product_id:
                 if item['quantity'] > 1:
                     # Если больше 1, уменьшаем на 1
-                    db.update_cart_item_quantity(
+                    await db_write(
+                        db.update_cart_item_quantity,
                         callback.from_user.id,
                         product_id,
                         item['quantity'] - 1
@@ -220,16 +224,16 @@ async def process_cart_callback(callback: CallbackQuery, state: FSMContext):
                     logger.info(f"Уменьшено количество товара {product_id} до {item['quantity'] - 1}")
                 else:
                     # Если 1, удаляем товар
-                    db.update_cart_item_quantity(callback.from_user.id, product_id, 0)
+                    await db_write(db.update_cart_item_quantity, callback.from_user.id, product_id, 0)
                     logger.info(f"Удален товар {product_id} из корзины")
                 break
 
     elif action_type == "del" and product_id:
         # Удаление товара
-        db.update_cart_item_quantity(callback.from_user.id, product_id, 0)
+        await db_write(db.update_cart_item_quantity, callback.from_user.id, product_id, 0)
         logger.info(f"Удален товар {product_id} из корзины")
         # Проверяем, остались ли товары в корзине
-        cart_items = db.get_cart_items(callback.from_user.id)
+        cart_items = await db_read(db.get_cart_items, callback.from_user.id)
         if not cart_items:
             try:
                 # Пробуем обновить подпись, если сообщение с фото
@@ -314,13 +318,13 @@ async def process_cart_callback(callback: CallbackQuery, state: FSMContext):
 
             # Если и это не удалось, отправляем новое сообщение
             if cart_data["photo"] and os.path.exists(cart_data["photo"]):
-                with open(cart_data["photo"], 'rb') as photo:
-                    await callback.message.answer_photo(
-                        photo=photo,
-                        caption=cart_data["text"],
-                        reply_markup=cart_data["reply_markup"],
-                        parse_mode="HTML"
-                    )
+                await answer_photo_cached(
+                    callback.message.answer_photo,
+                    cart_data["photo"],
+                    caption=cart_data["text"],
+                    reply_markup=cart_data["reply_markup"],
+                    parse_mode="HTML"
+                )
             else:
                 await callback.message.answer(
                     text=cart_data["text"],
@@ -1,9 +1,8 @@
-import asyncio
 import logging
 
 from aiogram import Router, F
 from aiogram.exceptions import TelegramBadRequest
-from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 
 from database.users import favorites_db
@@ -14,17 +13,18 @@ from keyboards.users.inline import (
     get_product_names_keyboard,
     get_product_details_keyboard, get_flavors_keyboard, get_flavor_actions_keyboard
 )
+from database.db_executor import db_read, db_write
 from database.users.warehouse_connection import (
     fetch_categories,
     fetch_products_by_category_and_product_name,
-    create_connection_warehouse, get_available_product_names, close_connection_warehouse,
-    get_products_by_category_and_name, get_product_by_id
+    fetch_available_product_names, fetch_available_products, get_product_by_id
 )
 from database.users.database import add_to_cart
 from states.catalog_state import CatalogState
 import os
 
 from utils.catalog_mapping import catalog_mapping
+from utils.photo_cache import answer_photo_cached
 
 router = Router()
 
@@ -35,7 +35,7 @@ logger = logging.getLogger(__name__)
 async def catalog_handler(message: Message, state: FSMContext):
     """Обработчик кнопки '🛍️ Каталог товаров'. Отображает список категорий."""
     await state.set_state(CatalogState.browsing_categories)
-    categories = fetch_categories()
+    categories = await db_read(fetch_categories)
     if categories:
         markup = get_categories_keyboard(categories)
         await message.answer("Выберите категорию товаров:", reply_markup=markup)
@@ -47,7 +47,7 @@ async def catalog_handler(message: Message, state: FSMContext):
 async def start_catalog_browsing_callback(query: CallbackQuery, state: FSMContext):
     """Обработчик callback для начала просмотра каталога (из других меню)."""
     await state.set_state(CatalogState.browsing_categories)
-    categories = fetch_categories()
+    categories = await db_read(fetch_categories)
     if categories:
         markup = get_categories_keyboard(categories)
         await query.message.edit_text("Выберите категорию товаров:", reply_markup=markup)
@@ -62,7 +62,7 @@ async def start_catalog_browsing_callback(query: CallbackQuery, state: FSMContex
 async def category_pagination_handler(query: CallbackQuery):
     """Обработчик пагинации категорий"""
     page = int(query.data.split(":")[2])
-    categories = fetch_categories()
+    categories = await db_read(fetch_categories)
     markup = get_categories_keyboard(categories, current_page=page)
     await query.message.edit_text("Выберите категорию товаров:", reply_markup=markup)
     await query.answer()
@@ -76,7 +76,7 @@ async def pagination_handler(query: CallbackQuery):
     if parts[1] == "category":
         # Пагинация категорий
         page = int(parts[2])
-        categories = fetch_categories()
+        categories = await db_read(fetch_categories)
         markup = get_categories_keyboard(categories, current_page=page)
         await query.message.edit_text("Выберите категорию товаров:", reply_markup=markup)
 
@@ -91,16 +91,12 @@ async def pagination_handler(query: CallbackQuery):
             await query.answer("Ошибка: категория не найдена")
             return
 
-        conn = create_connection_warehouse()
-        try:
-            product_names = get_available_product_names(conn, category_name)
-            markup = get_product_names_keyboard(product_names, category_name, current_page=page)
-            await query.message.edit_text(
-                f"Выбрана категория: {category_name}.\nВыберите интересующий вас товар:",
-                reply_markup=markup
-            )
-        finally:
-            close_connection_warehouse(conn)
+        product_names = await db_read(fetch_available_product_names, category_name)
+        markup = get_product_names_keyboard(product_names, category_name, current_page=page)
+        await query.message.edit_text(
+            f"Выбрана категория: {category_name}.\nВыберите интересующий вас товар:",
+            reply_markup=markup
+        )
 
     await query.answer()
 
@@ -118,20 +114,16 @@ async def category_callback_handler(query: CallbackQuery, state: FSMContext):
     await state.update_data(selected_category=category_name)
     await state.set_state(CatalogState.browsing_products)
 
-    conn = create_connection_warehouse()
-    try:
-        product_names = get_available_product_names(conn, category_name)
+    product_names = await db_read(fetch_available_product_names, category_name)
 
-        if product_names:
-            markup = get_product_names_keyboard(product_names, category_name)
-            await query.message.edit_text(
-                f"Выбрана категория: {category_name}.\nВыберите интересующий вас товар:",
-                reply_markup=markup
-            )
-        else:
-            await query.message.edit_text(f"В категории '{category_name}' нет подкатегорий с товарами в наличии.")
-    finally:
-        close_connection_warehouse(conn)
+    if product_names:
+        markup = get_product_names_keyboard(product_names, category_name)
+        await query.message.edit_text(
+            f"Выбрана категория: {category_name}.\nВыберите интересующий вас товар:",
+            reply_markup=markup
+        )
+    else:
+        await query.message.edit_text(f"В категории '{category_name}' нет подкатегорий с товарами в наличии.")
 
     await query.answer()
 
@@ -149,18 +141,14 @@ async def product_name_pagination_handler(query: CallbackQuery):
         await query.answer("Ошибка формата данных")
         return
 
-    conn = create_connection_warehouse()
-    try:
-        # Используем функцию из модуля запросов
-        product_names = get_available_product_names(conn, category_name)
+    # Используем функцию из модуля запросов
+    product_names = await db_read(fetch_available_product_names, category_name)
 
-        markup = get_product_names_keyboard(product_names, category_name, current_page=page)
-        await query.message.edit_text(
-            f"Выбрана категория: {category_name}.\nВыберите интересующий вас товар::",
-            reply_markup=markup
-        )
-    finally:
-        close_connection_warehouse(conn)
+    markup = get_product_names_keyboard(product_names, category_name, current_page=page)
+    await query.message.edit_text(
+        f"Выбрана категория: {category_name}.\nВыберите интересующий вас товар::",
+        reply_markup=markup
+    )
 
     await query.answer()
 
@@ -196,67 +184,63 @@ async def show_flavors_handler(query: CallbackQuery, state: FSMContext):
 
 async def display_flavors(query_or_message, state: FSMContext, category_name: str, product_name: str):
     """Отображает список вкусов для товара"""
-    conn = create_connection_warehouse()
     message = query_or_message if isinstance(query_or_message, Message) else query_or_message.message
 
-    try:
-        products = get_products_by_category_and_name(conn, category_name, product_name)
-
-        available_products = [p for p in products if p[5] > 0]
-
-        if available_products:
-            markup = get_flavors_keyboard(available_products, category_name, product_name)
-            flavor_image_path = f"/root/ZK/IMAGES/{category_name}_{product_name}.jpg"
-            # flavor_image_path = f"/root/01/IMAGES/{category_name}_{product_name}.jpg"
-
-            # Пытаемся удалить предыдущее фото, если оно было
-            data = await state.get_data()
-            photo_message_id = data.get("photo_message_id")
-            if photo_message_id and isinstance(query_or_message,
-                                               CallbackQuery):  # Удаляем только если это результат действия пользователя
-                try:
-                    await query_or_message.bot.delete_message(message.chat.id, photo_message_id)
-                    await state.update_data(photo_message_id=None)  # Сбрасываем ID фото в состоянии
-                except TelegramBadRequest as e:
-                    logger.warning(f"Не удалось удалить старое фото ({photo_message_id}): {e}")
-                except Exception as e:
-                    logger.error(f"Ошибка при удалении старого фото ({photo_message_id}): {e}")
-
-            # Отправляем или редактируем сообщение
-            if os.path.isfile(flavor_image_path):
-                photo = FSInputFile(flavor_image_path)
-                try:
-                    # Удаляем предыдущее *текстовое* сообщение, если оно было
-                    if not photo_message_id:  # Если до этого не было фото
-                        await message.delete()
-                except Exception as e:
-                    logger.warning(f"Не удалось удалить текстовое сообщение перед отправкой фото: {e}")
-
-                new_message = await message.answer_photo(
-                    photo=photo,
-                    caption=f"Доступные вкусы для {product_name}:",
+    products = await db_read(fetch_available_products, category_name, product_name)
+
+    available_products = [p for p in products if p[5] > 0]
+
+    if available_products:
+        markup = get_flavors_keyboard(available_products, category_name, product_name)
+        flavor_image_path = f"/root/ZK/IMAGES/{category_name}_{product_name}.jpg"
+        # flavor_image_path = f"/root/01/IMAGES/{category_name}_{product_name}.jpg"
+
+        # Пытаемся удалить предыдущее фото, если оно было
+        data = await state.get_data()
+        photo_message_id = data.get("photo_message_id")
+        if photo_message_id and isinstance(query_or_message,
+                                           CallbackQuery):  # Удаляем только если это результат действия пользователя
+            try:
+                await query_or_message.bot.delete_message(message.chat.id, photo_message_id)
+                await state.update_data(photo_message_id=None)  # Сбрасываем ID фото в состоянии
+            except TelegramBadRequest as e:
+                logger.warning(f"Не удалось удалить старое фото ({photo_message_id}): {e}")
+            except Exception as e:
+                logger.error(f"Ошибка при удалении старого фото ({photo_message_id}): {e}")
+
+        # Отправляем или редактируем сообщение
+        if os.path.isfile(flavor_image_path):
+            try:
+                # Удаляем предыдущее *текстовое* сообщение, если оно было
+                if not photo_message_id:  # Если до этого не было фото
+                    await message.delete()
+            except Exception as e:
+                logger.warning(f"Не удалось удалить текстовое сообщение перед отправкой фото: {e}")
+
+            new_message = await answer_photo_cached(
+                message.answer_photo,
+                flavor_image_path,
+                caption=f"Доступные вкусы для {product_name}:",
+                reply_markup=markup
+            )
+            await state.update_data(photo_message_id=new_message.message_id)
+        else:
+            # Если фото нет, редактируем исходное сообщение или отправляем новое, если старое было удалено
+            try:
+                await message.edit_text(
+                    f"Доступные вкусы для {product_name}:",
+                    reply_markup=markup
+                )
+            except TelegramBadRequest:  # Если сообщение не найдено (например, было фото, которое удалили)
+                await message.answer(
+                    f"Доступные вкусы для {product_name}:",
                     reply_markup=markup
                 )
-                await state.update_data(photo_message_id=new_message.message_id)
-            else:
-                # Если фото нет, редактируем исходное сообщение или отправляем новое, если старое было удалено
-                try:
-                    await message.edit_text(
-                        f"Доступные вкусы для {product_name}:",
-                        reply_markup=markup
-                    )
-                except TelegramBadRequest:  # Если сообщение не найдено (например, было фото, которое удалили)
-                    await message.answer(
-                        f"Доступные вкусы для {product_name}:",
-                        reply_markup=markup
-                    )
 
-        else:
-            await message.edit_text(
-                f"Товары в категории '{category_name}', подкатегории '{product_name}' временно отсутствуют."
-            )
-    finally:
-        close_connection_warehouse(conn)
+    else:
+        await message.edit_text(
+            f"Товары в категории '{category_name}', подкатегории '{product_name}' временно отсутствуют."
+        )
 
 
 @router.callback_query(F.data.startswith("select_flavor:"))
@@ -266,7 +250,7 @@ async def select_flavor_handler(query: CallbackQuery, state: FSMContext):
 
     await state.update_data(selected_product_id=product_id)
 
-    product_details = get_product_by_id(product_id)
+    product_details = await db_read(get_product_by_id, product_id)
     state_data = await state.get_data()
     category_name = state_data.get("category_name")
     product_name = state_data.get("selected_product_name")
@@ -316,7 +300,7 @@ async def add_selected_flavor_to_cart(query: CallbackQuery):
     user_id = query.from_user.id
 
     # Добавляем товар в корзину
-    result = add_to_cart(user_id, product_id, 1)  # По умолчанию 1 шт
+    result = await db_write(add_to_cart, user_id, product_id, 1)  # По умолчанию 1 шт
 
     if result == 'added':
         await query.answer(text='✅ Товар успешно добавлен в корзину!', show_alert=True)
@@ -332,12 +316,12 @@ async def add_selected_flavor_to_favorites(query: CallbackQuery):
     product_id = int(query.data.split(":")[2])
     user_id = query.from_user.id
 
-    is_favorite = await asyncio.to_thread(favorites_db.is_product_in_favorites, user_id, product_id)
+    is_favorite = await db_read(favorites_db.is_product_in_favorites, user_id, product_id)
 
     if is_favorite:
         await query.answer(text='Этот товар уже есть в вашем списке избранного!', show_alert=True)
     else:
-        result = add_product_to_favorites(user_id, product_id)
+        result = await db_write(add_product_to_favorites, user_id, product_id)
 
         if result:
             await query.answer(text='❤️ Товар успешно добавлен в избранное!', show_alert=True)
@@ -380,7 +364,7 @@ async def product_navigation_handler(query: CallbackQuery):
 
     _, product_name = product_info
 
-    all_products = fetch_products_by_category_and_product_name(category_name, product_name)
+    all_products = await db_read(fetch_products_by_category_and_product_name, category_name, product_name)
 
     # Фильтруем товары, у которых количество > 0
     products = [product for product in all_products if product[5] > 0]
@@ -419,35 +403,31 @@ async def back_to_products_handler(query: CallbackQuery, state: FSMContext):
             logger.error(f"Ошибка при удалении сообщения с фото: {e}")
 
     # Получаем список товаров для отображения
-    conn = create_connection_warehouse()
-    try:
-        product_names = get_available_product_names(conn, category_name)
+    product_names = await db_read(fetch_available_product_names, category_name)
 
-        if product_names:
-            markup = get_product_names_keyboard(product_names, category_name)
+    if product_names:
+        markup = get_product_names_keyboard(product_names, category_name)
 
-            # Если запрос пришел из сообщения с фото
-            if query.message.message_id == photo_message_id:
-                try:
-                    await query.bot.edit_message_text(
-                        chat_id=query.message.chat.id,
-                        message_id=original_message_id,
-                        text=f"Выбрана категория: {category_name}.\nВыберите интересующий вас товар:",
-                        reply_markup=markup
-                    )
-                    await query.answer()
-                    return
-                except Exception as e:
-                    logger.error(f"Ошибка при редактировании исходного сообщения: {e}")
-
-            await query.message.edit_text(
-                f"Выбрана категория: {category_name}.\nВыберите интересующий вас товар:",
-                reply_markup=markup
-            )
-        else:
-            await query.message.edit_text(f"В категории '{category_name}' нет доступных товаров.")
-    finally:
-        close_connection_warehouse(conn)
+        # Если запрос пришел из сообщения с фото
+        if query.message.message_id == photo_message_id:
+            try:
+                await query.bot.edit_message_text(
+                    chat_id=query.message.chat.id,
+                    message_id=original_message_id,
+                    text=f"Выбрана категория: {category_name}.\nВыберите интересующий вас товар:",
+                    reply_markup=markup
+                )
+                await query.answer()
+                return
+            except Exception as e:
+                logger.error(f"Ошибка при редактировании исходного сообщения: {e}")
+
+        await query.message.edit_text(
+            f"Выбрана категория: {category_name}.\nВыберите интересующий вас товар:",
+            reply_markup=markup
+        )
+    else:
+        await query.message.edit_text(f"В категории '{category_name}' нет доступных товаров.")
 
     await query.answer()
 
@@ -514,7 +494,7 @@ async def cancel_category_selection_callback_handler(query: CallbackQuery, state
                 await query.message.delete()
 
                 # Получаем категории и отправляем новое сообщение
-                categories = fetch_categories()
+                categories = await db_read(fetch_categories)
                 if categories:
                     markup = get_categories_keyboard(categories)
                     await query.message.answer("Выберите категорию товаров:", reply_markup=markup)
@@ -533,7 +513,7 @@ async def cancel_category_selection_callback_handler(query: CallbackQuery, state
             logger.error(f"Ошибка при удалении сообщения с фото: {e}")
 
     # Стандартное поведение
-    categories = fetch_categories()
+    categories = await db_read(fetch_categories)
     if categories:
         markup = get_categories_keyboard(categories)
         await query.message.edit_text("Выберите категорию товаров:", reply_markup=markup)
@@ -570,12 +550,13 @@ async def show_product_details(message, products, idx, category_name, product_na
     try:
         image_path = 'C:\\Users\\Iskander\\PycharmProjects\\ZK\\database\\users\\' + image_path
         if image_path and os.path.isfile(image_path):
-            photo = FSInputFile(image_path)
             if hasattr(message, 'message_id'):
-                await message.answer_photo(photo=photo, caption=product_text, reply_markup=markup, parse_mode="HTML")
+                await answer_photo_cached(message.answer_photo, image_path, caption=product_text, reply_markup=markup,
+                                          parse_mode="HTML")
             else:
                 await message.delete()
-                await message.answer_photo(photo=photo, caption=product_text, reply_markup=markup, parse_mode="HTML")
+                await answer_photo_cached(message.answer_photo, image_path, caption=product_text, reply_markup=markup,
+                                          parse_mode="HTML")
         else:
             logger.info(f"Image not found: {image_path}, exists: {os.path.isfile(image_path) if image_path else False}")
             if hasattr(message, 'edit_text'):
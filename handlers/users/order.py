@@ -1,5 +1,8 @@
+import asyncio
 import datetime
 import logging
+from html import escape
+from typing import Set
 
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
@@ -9,9 +12,9 @@ import re
 
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from database.admins.orders_bd import update_order_status
+from database.db_executor import db_read, db_write
 from database.admins.staff_db import get_staff_by_role
-from database.discounts_db import DiscountsDatabase
+from database.discounts_db import DiscountsDatabase, validate_promo_code
 from states.order_state import OrderState
 from keyboards.users.order_keyboards import (
     get_payment_method_kb,
@@ -20,11 +23,11 @@ from keyboards.users.order_keyboards import (
     get_delivery_address_kb, get_promo_code_kb
 )
 from database.users.database import (
-    get_db_connection, save_order_item, get_cart_items,
-    clear_cart, save_incomplete_order, get_incomplete_order, delete_incomplete_order, get_product_category,
-    get_user_past_addresses, calculate_cart_total, save_order_with_promo
+    get_cart_items, store_incomplete_order, fetch_incomplete_order, remove_incomplete_order,
+    get_user_past_addresses, calculate_cart_total, place_order, CART_EMPTY
 )
 from utils.order_timeout_manager import order_timeout_manager
+from utils.telegram_sender import telegram_sender, pack_message_parts
 
 router = Router()
 
@@ -32,6 +35,9 @@ logger = logging.getLogger(__name__)
 
 discounts_db = DiscountsDatabase()
 
+# Фоновые рассылки заказов сотрудникам (ссылки нужны, чтобы задачи не собрал сборщик мусора)
+_staff_notifications: Set[asyncio.Task] = set()
+
 
 def calculate_discount(promo_data, cart_total, cart_items):
     """
@@ -151,12 +157,13 @@ def format_discount_info(discount_type, discount_amount, discount_details):
     return info
 
 
-def check_available_discounts(user_id):
+def check_available_discounts(user_id, cart_items=None):
     """
     Проверяет доступные скидки для пользователя
     Возвращает информацию о доступных акциях
     """
-    cart_total, cart_items = calculate_cart_total(user_id)
+    if cart_items is None:
+        cart_total, cart_items = calculate_cart_total(user_id)
     action_discount, action_details, applied_actions = calculate_action_discount(cart_items)
 
     if action_discount > 0:
@@ -178,17 +185,16 @@ def check_available_discounts(user_id):
 # Начало оформления заказа из корзины
 @router.callback_query(F.data == "cart:checkout")
 async def start_checkout(callback: CallbackQuery, state: FSMContext):
-    cart_items = get_cart_items(callback.from_user.id)
+    cart_items = await db_read(get_cart_items, callback.from_user.id)
 
     if not cart_items:
         await callback.answer("Ваша корзина пуста!")
         return
 
     # Проверяем доступные акции
-    discount_info = check_available_discounts(callback.from_user.id)
+    discount_info = check_available_discounts(callback.from_user.id, cart_items)
 
-    conn = get_db_connection()
-    incomplete_state, incomplete_data = get_incomplete_order(conn, callback.from_user.id)
+    incomplete_state, incomplete_data = await db_read(fetch_incomplete_order, callback.from_user.id)
 
     if incomplete_state and incomplete_data:
         builder = InlineKeyboardBuilder()
@@ -247,8 +253,7 @@ async def process_name(message: Message, state: FSMContext):
         reply_markup=get_skip_phone_number_kb()
     )
 
-    conn = get_db_connection()
-    save_incomplete_order(conn, message.from_user.id, "name", await state.get_data())
+    await db_write(store_incomplete_order, message.from_user.id, "name", await state.get_data())
 
 
 # Обработка ввода телефона
@@ -277,8 +282,7 @@ async def process_phone(message: Message, state: FSMContext):
         reply_markup=get_delivery_date_kb()
     )
 
-    conn = get_db_connection()
-    save_incomplete_order(conn, message.from_user.id, "phone", await state.get_data())
+    await db_write(store_incomplete_order, message.from_user.id, "phone", await state.get_data())
 
 
 # Обработчик кнопки "Пропустить" при вводе номера телефона
@@ -299,8 +303,7 @@ async def process_skip_phone(callback: CallbackQuery, state: FSMContext):
         reply_markup=get_delivery_date_kb()
     )
 
-    conn = get_db_connection()
-    save_incomplete_order(conn, callback.from_user.id, "phone", await state.get_data())
+    await db_write(store_incomplete_order, callback.from_user.id, "phone", await state.get_data())
 
 
 # Обработка ручного ввода даты доставки
@@ -348,8 +351,7 @@ async def process_manual_date(message: Message, state: FSMContext):
         reply_markup=get_delivery_time_kb()
     )
 
-    conn = get_db_connection()
-    save_incomplete_order(conn, message.from_user.id, "delivery_date", await state.get_data())
+    await db_write(store_incomplete_order, message.from_user.id, "delivery_date", await state.get_data())
 
 
 # Обработка выбора даты доставки
@@ -370,8 +372,7 @@ async def process_delivery_date(callback: CallbackQuery, state: FSMContext):
         reply_markup=get_delivery_time_kb()
     )
 
-    conn = get_db_connection()
-    save_incomplete_order(conn, callback.from_user.id, "delivery_date", await state.get_data())
+    await db_write(store_incomplete_order, callback.from_user.id, "delivery_date", await state.get_data())
 
     await callback.answer()
 
@@ -404,8 +405,7 @@ async def process_manual_time(message: Message, state: FSMContext):
         reply_markup=get_back_cancel_kb("delivery_time")
     )
 
-    conn = get_db_connection()
-    save_incomplete_order(conn, message.from_user.id, "delivery_time", await state.get_data())
+    await db_write(store_incomplete_order, message.from_user.id, "delivery_time", await state.get_data())
 
 
 # Обработка выбора времени доставки
@@ -422,14 +422,14 @@ async def process_delivery_time(callback: CallbackQuery, state: FSMContext):
 
     await state.set_state(OrderState.delivery_address)
 
-    past_addresses = get_user_past_addresses(callback.from_user.id)
+    past_addresses = await db_read(get_user_past_addresses, callback.from_user.id)
 
     if past_addresses:
         await state.update_data(past_addresses=past_addresses)
 
         await callback.message.edit_text(
             "Выберите адрес доставки из списка или введите новый:",
-            reply_markup=get_delivery_address_kb(callback.from_user.id)
+            reply_markup=get_delivery_address_kb(callback.from_user.id, past_addresses)
         )
     else:
         await callback.message.edit_text(
@@ -437,8 +437,7 @@ async def process_delivery_time(callback: CallbackQuery, state: FSMContext):
             reply_markup=get_back_cancel_kb("delivery_time")
         )
 
-    conn = get_db_connection()
-    save_incomplete_order(conn, callback.from_user.id, "delivery_time", await state.get_data())
+    await db_write(store_incomplete_order, callback.from_user.id, "delivery_time", await state.get_data())
 
     await callback.answer()
 
@@ -474,8 +473,7 @@ async def process_delivery_type(callback: CallbackQuery, state: FSMContext):
     elif callback.data == "cancel_order_process":
         await handle_cancel_order(callback, state)
 
-    conn = get_db_connection()
-    save_incomplete_order(conn, callback.from_user.id, "delivery_type", await state.get_data())
+    await db_write(store_incomplete_order, callback.from_user.id, "delivery_type", await state.get_data())
 
     await callback.answer()
 
@@ -506,8 +504,7 @@ async def process_delivery_address(message: Message, state: FSMContext):
         reply_markup=get_payment_method_kb()
     )
 
-    conn = get_db_connection()
-    save_incomplete_order(conn, message.from_user.id, "delivery_address", await state.get_data())
+    await db_write(store_incomplete_order, message.from_user.id, "delivery_address", await state.get_data())
 
 
 # Обработка выбора адреса из истории
@@ -515,7 +512,7 @@ async def process_delivery_address(message: Message, state: FSMContext):
 async def process_past_address_selection(callback: CallbackQuery, state: FSMContext):
     address_index = int(callback.data.replace("past_address_", ""))
 
-    past_addresses = get_user_past_addresses(callback.from_user.id)
+    past_addresses = await db_read(get_user_past_addresses, callback.from_user.id)
 
     if address_index < len(past_addresses):
         selected_address = past_addresses[address_index]
@@ -533,8 +530,7 @@ async def process_past_address_selection(callback: CallbackQuery, state: FSMCont
             reply_markup=get_payment_method_kb()
         )
 
-        conn = get_db_connection()
-        save_incomplete_order(conn, callback.from_user.id, "delivery_address", await state.get_data())
+        await db_write(store_incomplete_order, callback.from_user.id, "delivery_address", await state.get_data())
 
     await callback.answer()
 
@@ -596,8 +592,7 @@ async def process_payment_method(callback: CallbackQuery, state: FSMContext):
     elif callback.data == "cancel_order_process":
         await handle_cancel_order(callback, state)
 
-    conn = get_db_connection()
-    save_incomplete_order(conn, callback.from_user.id, "payment_method", await state.get_data())
+    await db_write(store_incomplete_order, callback.from_user.id, "payment_method", await state.get_data())
 
     await callback.answer()
 
@@ -645,8 +640,7 @@ async def process_comment(message: Message, state: FSMContext):
     comment = message.text.strip()
     await state.update_data(comment=comment)
 
-    conn = get_db_connection()
-    save_incomplete_order(conn, message.from_user.id, "comment", await state.get_data())
+    await db_write(store_incomplete_order, message.from_user.id, "comment", await state.get_data())
 
     # Переходим к вводу промокода
     await state.set_state(OrderState.promo_code)
@@ -660,7 +654,7 @@ async def process_comment(message: Message, state: FSMContext):
 @router.callback_query(StateFilter(OrderState.promo_code), F.data == "skip_promo_code")
 async def skip_promo_code(callback: CallbackQuery, state: FSMContext):
     # Проверяем доступные акции даже если промокод пропущен
-    cart_total, cart_items = calculate_cart_total(callback.from_user.id)
+    cart_total, cart_items = await db_read(calculate_cart_total, callback.from_user.id)
     action_discount, action_details, applied_actions = calculate_action_discount(cart_items)
 
     if action_discount > 0:
@@ -689,13 +683,13 @@ async def process_promo_code(message: Message, state: FSMContext):
     promo_code = message.text.strip().upper()
 
     # Получаем данные корзины
-    cart_total, cart_items = calculate_cart_total(message.from_user.id)
+    cart_total, cart_items = await db_read(calculate_cart_total, message.from_user.id)
 
     # Рассчитываем скидку от акций
     action_discount, action_details, applied_actions = calculate_action_discount(cart_items)
 
     # Валидируем промокод с учетом пользователя
-    promo_data, validation_message = discounts_db.validate_promo_code_for_user(promo_code, message.from_user.id)
+    promo_data, validation_message = await db_read(validate_promo_code, promo_code, message.from_user.id)
 
     if promo_data:
         # Рассчитываем скидку от промокода
@@ -740,8 +734,7 @@ async def process_promo_code(message: Message, state: FSMContext):
 
             await message.answer(response_text)
 
-            conn = get_db_connection()
-            save_incomplete_order(conn, message.from_user.id, "promo_code", await state.get_data())
+            await db_write(store_incomplete_order, message.from_user.id, "promo_code", await state.get_data())
 
             # Переходим к подтверждению заказа
             await show_order_confirmation(message, state, message.from_user.id)
@@ -820,7 +813,7 @@ async def show_order_confirmation(message: Message, state: FSMContext, user_id=N
     data = await state.get_data()
 
     user_id = user_id or message.from_user.id
-    cart_items = get_cart_items(user_id)
+    cart_items = await db_read(get_cart_items, user_id)
 
     total_amount = sum(item['total_price'] for item in cart_items)
     discount_amount = data.get('discount_amount', 0.0)
@@ -874,74 +867,100 @@ async def show_order_confirmation(message: Message, state: FSMContext, user_id=N
     )
 
 
+async def _notify_staff_about_order(bot, order_id, messages):
+    """Рассылает новый заказ администраторам и курьерам (в фоне, после ответа клиенту)"""
+    try:
+        staff_ids = [("администратору", admin['telegram_id']) for admin in get_staff_by_role(role="Админ")]
+        staff_ids += [("курьеру", courier['telegram_id']) for courier in get_staff_by_role(role="Курьер")]
+
+        # Сотрудникам заказ рассылается параллельно, части одному сотруднику - по порядку
+        results = await asyncio.gather(
+            *(telegram_sender.send_parts(bot, staff_id, messages, parse_mode="HTML") for _, staff_id in staff_ids),
+            return_exceptions=True
+        )
+
+        for (recipient, staff_id), result in zip(staff_ids, results):
+            if isinstance(result, Exception):
+                logger.error(f"Не удалось отправить заказ #{order_id} {recipient} {staff_id}: {result}")
+            else:
+                logger.info(f"Заказ #{order_id} успешно отправлен {recipient} {staff_id}")
+    except Exception as e:
+        logger.error(f"Общая ошибка при отправке заказа #{order_id}: {e}")
+
+
 # Обработка подтверждения заказа
 @router.callback_query(StateFilter(OrderState.confirmation))
 async def process_confirmation(callback: CallbackQuery, state: FSMContext):
     if callback.data == "confirm_order":
         data = await state.get_data()
-        conn = get_db_connection()
 
         # Получаем данные о скидке
         discount_amount = data.get('discount_amount', 0.0)
+        discount_type = data.get('discount_type', 'none')
         promo_data = data.get('promo_data')
 
-        # Сохраняем заказ с учетом скидки
-        order_id = save_order_with_promo(
-            conn,
+        # Корзина, заказ, его товары, использование промокода, очистка корзины и
+        # удаление незавершенного заказа читаются и сохраняются одной транзакцией
+        order_id = await db_write(
+            place_order,
             callback.from_user.id,
-            data['name'],
-            data['phone'],
-            data['delivery_date'],
-            data['delivery_time'],
-            data['delivery_type'],
-            data['delivery_address'],
-            data['payment_method'],
-            data.get('comment', ''),
+            data,
+            discount_amount,
+            discount_type,
             data.get('promo_code', ''),
-            discount_amount
+            promo_data['id'] if promo_data else None
         )
+        if order_id is None:
+            await callback.message.answer(
+                "❌ Не удалось оформить заказ. Пожалуйста, попробуйте подтвердить его еще раз."
+            )
+            await callback.answer()
+            return
+        if order_id == CART_EMPTY:
+            # Повторное нажатие "Подтвердить": заказ из этой корзины уже оформлен
+            await callback.answer("Корзина пуста - заказ уже оформлен.", show_alert=True)
+            return
 
-        cart_items = get_cart_items(callback.from_user.id)
-
+        cart_items = order_id[2]
         total_amount = sum(item['total_price'] for item in cart_items)
         final_amount = total_amount - discount_amount
 
-        # Сохраняем товары заказа
-        for item in cart_items:
-            save_order_item(conn, order_id[0], item['product_id'], item['quantity'], item['price'])
-
-            # Логируем использование промокода или акций
-            discount_type = data.get('discount_type', 'none')
-
-            if discount_type == 'promo' and promo_data and discount_amount > 0:
-                try:
-                    # Увеличиваем счетчик использований промокода
-                    with discounts_db.connection:
-                        discounts_db.cursor.execute(
-                            "UPDATE promo_codes SET current_uses = current_uses + 1 WHERE id = ?",
-                            (promo_data['id'],)
-                        )
-
-                    # Логируем использование
-                    with discounts_db.connection:
-                        discounts_db.cursor.execute("""
-                                INSERT INTO promo_code_usage (promo_code_id, user_id, order_id, discount_amount, order_total)
-                                VALUES (?, ?, ?, ?, ?)
-                            """, (promo_data['id'], callback.from_user.id, order_id[0], discount_amount, total_amount))
-
-                    logger.info(f"Промокод {data.get('promo_code')} успешно применен к заказу {order_id[0]}")
-                except Exception as e:
-                    logger.error(f"Ошибка при логировании использования промокода: {e}")
-
-            elif discount_type == 'action' and discount_amount > 0:
-                try:
-                    # Логируем применение акций (можно расширить для детальной аналитики)
-                    action_details = data.get('action_details', [])
-                    for action in action_details:
-                        logger.info(
-                            f"Акция '{action['title']}' применена к заказу {order_id[0]}, скидка: {action['discount_amount']:.2f} ₽")
-                except Exception as e:
-                    logger.error(f"Ошибка при логировании применения акций: {e}")
+        # Логируем использование промокода или акций
+        if discount_type == 'promo' and promo_data and discount_amount > 0:
+            logger.info(f"Промокод {data.get('promo_code')} успешно применен к заказу {order_id[0]}")
+
+        elif discount_type == 'action' and discount_amount > 0:
+            try:
+                # Логируем применение акций (можно расширить для детальной аналитики)
+                action_details = data.get('action_details', [])
+                for action in action_details:
+                    logger.info(
+                        f"Акция '{action['title']}' применена к заказу {order_id[0]}, скидка: {action['discount_amount']:.2f} ₽")
+            except Exception as e:
+                logger.error(f"Ошибка при логировании применения акций: {e}")
+
+        await order_timeout_manager.start_timer(order_id[0], callback.bot)
+
+        # Клиент получает подтверждение первым, уведомления сотрудникам уходят следом в фоне
+        client_message = "✅ Ваш заказ успешно оформлен!\n\n"
+        client_message += f"Номер заказа: #{order_id[1]}\n"
+
+        if discount_amount > 0:
+            if discount_type == 'promo':
+                client_message += f"💰 Применен промокод: {data.get('promo_code', '')}\n"
+                client_message += f"💰 Размер скидки: {discount_amount:.2f} ₽\n"
+            elif discount_type == 'action':
+                client_message += f"🎉 Применены акции\n"
+                client_message += f"💰 Размер скидки: {discount_amount:.2f} ₽\n"
+
+            client_message += f"💳 К оплате: {final_amount:.2f} ₽\n"
+        else:
+            client_message += f"💳 Сумма к оплате: {total_amount:.2f} ₽\n"
+
+        client_message += "\nВ ближайшее время с вами свяжется наш менеджер для подтверждения заказа."
+
+        await callback.message.answer(client_message)
+        await state.clear()
 
         # Формируем сообщение для администраторов
         header_admin_note = f"🔔 <b>Новый заказ #{order_id[0]}</b>\n\n"
@@ -952,6 +971,7 @@ async def process_confirmation(callback: CallbackQuery, state: FSMContext):
         all_order_category = []
         all_cost_product = []
 
+        # Категория, вкус и цена уже есть в позициях корзины (place_order читает их вместе со складом)
         for position in cart_items:
             quantity = position['quantity']
             if quantity > 1:
@@ -960,36 +980,36 @@ async def process_confirmation(callback: CallbackQuery, state: FSMContext):
                     all_order_product_short_name.append(
                         position['product_full_name'].replace(position['flavor'], '', 1).strip())
                     all_order_flavors.append(position['flavor'])
-                    all_order_category.append(get_product_category(position['product_full_name']))
+                    all_order_category.append(position['category'])
             all_cost_product.append(position['price'])
             all_order_product_short_name.append(
                 position['product_full_name'].replace(position['flavor'], '', 1).strip())
             all_order_flavors.append(position['flavor'])
-            all_order_category.append(get_product_category(position['product_full_name']))
+            all_order_category.append(position['category'])
 
         positions = []
         for position in range(len(all_order_product_short_name)):
             admin_order_text = (
-                f"0. {all_order_category[position]}\n"
-                f"1. {all_order_product_short_name[position]}\n"
-                f"2. {all_order_flavors[position]}\n"
-                f"3. {data['delivery_date']}\n"
-                f"4. {data['delivery_time']}\n"
-                f"5. {data['delivery_address']}\n"
-                f"6. {data['name']}\n"
-                f"7. Telegram, @{callback.from_user.username}\n"
-                f"8. {data['phone']}\n"
+                f"0. {escape(str(all_order_category[position]))}\n"
+                f"1. {escape(all_order_product_short_name[position])}\n"
+                f"2. {escape(str(all_order_flavors[position]))}\n"
+                f"3. {escape(str(data['delivery_date']))}\n"
+                f"4. {escape(str(data['delivery_time']))}\n"
+                f"5. {escape(str(data['delivery_address']))}\n"
+                f"6. {escape(str(data['name']))}\n"
+                f"7. Telegram, @{escape(str(callback.from_user.username))}\n"
+                f"8. {escape(str(data['phone']))}\n"
                 f"9. Bot\n"
                 f"10. {all_cost_product[position]:.2f}\n"
                 f"11. {discount_amount}\n"
-                f"12. {data['payment_method']}\n"
+                f"12. {escape(str(data['payment_method']))}\n"
                 f"13. <code>{callback.from_user.id}</code>"
             )
             positions.append(admin_order_text)
 
         for i, item in enumerate(cart_items, 1):
-            header_admin_note += f"{item['product_full_name']} : {item['quantity']},\n"
-            header_admin_note += f"{i}. {item['product_full_name']} x {item['quantity']} = {item['total_price']:.2f} ₽\n"
+            header_admin_note += f"{escape(item['product_full_name'])} : {item['quantity']},\n"
+            header_admin_note += f"{i}. {escape(item['product_full_name'])} x {item['quantity']} = {item['total_price']:.2f} ₽\n"
 
         header_admin_note = header_admin_note.rstrip(", ")
 
@@ -999,19 +1019,19 @@ async def process_confirmation(callback: CallbackQuery, state: FSMContext):
 
             if discount_type == 'promo':
                 promo_code = data.get('promo_code', '')
-                header_admin_note += f"Тип: Промокод ({promo_code})\n"
+                header_admin_note += f"Тип: Промокод ({escape(promo_code)})\n"
             elif discount_type == 'action':
                 header_admin_note += f"Тип: Акции\n"
                 action_details = data.get('action_details', [])
                 for action in action_details:
-                    header_admin_note += f"• {action['title']}: -{action['discount_amount']:.2f} ₽\n"
+                    header_admin_note += f"• {escape(action['title'])}: -{action['discount_amount']:.2f} ₽\n"
 
             header_admin_note += f"Размер скидки: {discount_amount:.2f} ₽\n"
             header_admin_note += f"Сумма без скидки: {total_amount:.2f} ₽\n"
             header_admin_note += f"К оплате: {final_amount:.2f} ₽"
 
         if data.get('comment'):
-            header_admin_note += f"\n\nКомментарий: {data['comment']}"
+            header_admin_note += f"\n\nКомментарий: {escape(data['comment'])}"
 
         # Проверка на подозрительный заказ (учитываем финальную сумму)
         if final_amount > 3000:
@@ -1020,74 +1040,12 @@ async def process_confirmation(callback: CallbackQuery, state: FSMContext):
                 f"информацию о клиенте. Если возникли сомнения, <b>свяжитесь с администратором.</b>"
             )
 
-        try:
-            # Отправка сообщений всем администраторам
-            admins = get_staff_by_role(role="Админ")
-            admin_ids = [admin['telegram_id'] for admin in admins if admin.get('is_active', 1)]
-            for admin_id in admin_ids:
-                try:
-                    await callback.bot.send_message(
-                        admin_id,
-                        header_admin_note,
-                        parse_mode="HTML"
-                    )
-                    for message in positions:
-                        await callback.bot.send_message(
-                            admin_id,
-                            str(message),
-                            parse_mode="HTML"
-                        )
-                    logger.info(f"Заказ успешно отправлен администратору {admin_id}")
-                except Exception as e:
-                    logger.error(f"Не удалось отправить заказ администратору {admin_id}: {e}")
-
-            # Отправка сообщений всем курьерам
-            couriers = get_staff_by_role(role="Курьер")
-            courier_ids = [courier['telegram_id'] for courier in couriers if courier.get('is_active', 1)]
-            for courier_id in courier_ids:
-                try:
-                    await callback.bot.send_message(
-                        courier_id,
-                        header_admin_note,
-                        parse_mode="HTML"
-                    )
-                    for message in positions:
-                        await callback.bot.send_message(
-                            courier_id,
-                            str(message)
-                        )
-                    logger.info(f"Заказ успешно отправлен курьеру {courier_id}")
-                except Exception as e:
-                    logger.error(f"Не удалось отправить заказ курьеру {courier_id}: {e}")
-        except Exception as e:
-            logger.error(f"Общая ошибка при отправке заказа: {e}")
-
-        clear_cart(callback.from_user.id)
-        update_order_status(order_id, 'processing')
-        await order_timeout_manager.start_timer(order_id[0], callback.bot)
-
-        delete_incomplete_order(conn, callback.from_user.id)
+        # Заголовок и все позиции уходят каждому сотруднику одним сообщением
+        staff_messages = pack_message_parts([header_admin_note] + positions)
+        task = asyncio.create_task(_notify_staff_about_order(callback.bot, order_id[0], staff_messages))
+        _staff_notifications.add(task)
+        task.add_done_callback(_staff_notifications.discard)
 
-        # Уведомляем клиента с учетом скидки
-        client_message = "✅ Ваш заказ успешно оформлен!\n\n"
-        client_message += f"Номер заказа: #{order_id[1]}\n"
-
-        if discount_amount > 0:
-            if discount_type == 'promo':
-                client_message += f"💰 Применен промокод: {data.get('promo_code', '')}\n"
-                client_message += f"💰 Размер скидки: {discount_amount:.2f} ₽\n"
-            elif discount_type == 'action':
-                client_message += f"🎉 Применены акции\n"
-                client_message += f"💰 Размер скидки: {discount_amount:.2f} ₽\n"
-
-            client_message += f"💳 К оплате: {final_amount:.2f} ₽\n"
-        else:
-            client_message += f"💳 Сумма к оплате: {total_amount:.2f} ₽\n"
-
-        client_message += "\nВ ближайшее время с вами свяжется наш менеджер для подтверждения заказа."
-
-        await callback.message.answer(client_message)
-        await state.clear()
 
     elif callback.data == "edit_order":
         data = await state.get_data()
@@ -1099,8 +1057,7 @@ async def process_confirmation(callback: CallbackQuery, state: FSMContext):
         )
 
     elif callback.data == "cancel_order":
-        conn = get_db_connection()
-        delete_incomplete_order(conn, callback.from_user.id)
+        await db_write(remove_incomplete_order, callback.from_user.id)
 
         await callback.message.answer("Заказ отменен.")
         await state.clear()
@@ -1164,8 +1121,7 @@ async def handle_go_back(callback: CallbackQuery, state: FSMContext):
 # Обработчик для отмены заказа
 @router.callback_query(F.data == "cancel_order_process")
 async def handle_cancel_order(callback: CallbackQuery, state: FSMContext):
-    conn = get_db_connection()
-    delete_incomplete_order(conn, callback.from_user.id)
+    await db_write(remove_incomplete_order, callback.from_user.id)
 
     await callback.message.answer("Оформление заказа отменено.")
     await state.clear()
@@ -1175,8 +1131,7 @@ async def handle_cancel_order(callback: CallbackQuery, state: FSMContext):
 # Обработка возобновления незавершенного заказа
 @router.callback_query(F.data == "resume_order")
 async def resume_incomplete_order(callback: CallbackQuery, state: FSMContext):
-    conn = get_db_connection()
-    incomplete_state, incomplete_data = get_incomplete_order(conn, callback.from_user.id)
+    incomplete_state, incomplete_data = await db_read(fetch_incomplete_order, callback.from_user.id)
 
     if not incomplete_state or not incomplete_data:
         await callback.message.answer("Незавершенный заказ не найден. Начнем оформление заново.")
@@ -1314,8 +1269,7 @@ async def process_edit_selection(callback: CallbackQuery, state: FSMContext):
         await show_order_confirmation(callback.message, state, callback.from_user.id)
 
     elif callback.data == "cancel_order":
-        conn = get_db_connection()
-        delete_incomplete_order(conn, callback.from_user.id)
+        await db_write(remove_incomplete_order, callback.from_user.id)
         await callback.message.answer("Заказ отменен.")
         await state.clear()
 
@@ -1324,8 +1278,7 @@ async def process_edit_selection(callback: CallbackQuery, state: FSMContext):
 
 @router.callback_query(F.data == "resume_order")
 async def resume_incomplete_order(callback: CallbackQuery, state: FSMContext):
-    conn = get_db_connection()
-    incomplete_state, incomplete_data = get_incomplete_order(conn, callback.from_user.id)
+    incomplete_state, incomplete_data = await db_read(fetch_incomplete_order, callback.from_user.id)
 
     if not incomplete_state or not incomplete_data:
         await callback.message.answer("Незавершенный заказ не найден. Начнем оформление заново.")
@@ -671,11 +671,7 @@ async def process_confirmation(callback: CallbackQuery, state: FSMContext):
 
         # try:
         #     from utils.stock_notification_utils import check_low_stock_products
-        #     wh_conn = create_connection_warehouse()
-        #     shop_conn = get_db_connection()
-        #     await check_low_stock_products(wh_conn, shop_conn, callback.bot)
-        #     wh_conn.close()
-        #     shop_conn.close()
+        #     await check_low_stock_products(callback.bot)
         # except Exception as e:
         #     logger.error(f"Ошибка при проверке товаров с низким остатком: {e}")
 
@@ -5,6 +5,7 @@ from database.users.database_connection import create_connection, close_connecti
 import sqlite3
 import datetime
 from keyboards.users.keyboards import main_menu_keyboard
+from utils.telegram_sender import telegram_sender
 
 router = Router()
 
@@ -19,6 +20,9 @@ async def command_start_handler(message: Message) -> None:
     user_telegram_id = message.from_user.id
     user_name = message.from_user.first_name if message.from_user.first_name else "пользователь"
 
+    # Пользователь снова написал боту - значит, сообщения до него доходят
+    await telegram_sender.mark_reachable(user_telegram_id)
+
     if conn:
         cursor = conn.cursor()
         try:
@@ -263,7 +263,7 @@ def get_broadcast_history_list_keyboard(broadcasts: List[tuple], page: int = 1,
     for broadcast in current_page_broadcasts:
         broadcast_id, _, _, _, _, status, created_at, _ = broadcast
         date_str = created_at.split(" ")[0] if isinstance(created_at, str) else "N/A"
-        status_icon = "✅" if status == "completed" else "🕒" if status == "pending" else "❌"
+        status_icon = {"completed": "✅", "pending": "🕒", "scheduled": "⏰"}.get(status, "❌")
 
         builder.add(InlineKeyboardButton(
             text=f"{status_icon} Рассылка #{broadcast_id} от {date_str}",
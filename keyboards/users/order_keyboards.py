@@ -142,16 +142,17 @@ def get_order_confirmation_kb():
     return builder.as_markup()
 
 
-def get_delivery_address_kb(user_id):
+def get_delivery_address_kb(user_id, past_addresses=None):
     """
-    Клавиатура для выбора адреса доставки с историей адресов
+    Клавиатура для выбора адреса доставки с историей адресов.
+    past_addresses - уже загруженные адреса; без них адреса читаются из базы
     """
-    from database.users.database import get_user_past_addresses
-
     builder = InlineKeyboardBuilder()
 
     # Получаем прошлые адреса пользователя
-    past_addresses = get_user_past_addresses(user_id)
+    if past_addresses is None:
+        from database.users.database import get_user_past_addresses
+        past_addresses = get_user_past_addresses(user_id)
 
     if past_addresses:
         # Добавляем заголовок
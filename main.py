@@ -1,9 +1,12 @@
 import asyncio
 import logging
+from functools import partial
 from aiogram import Bot, Dispatcher
-from config import TOKEN
-from database.admins.staff_db import create_staff_table
-from database.users.reviews_db import create_product_reviews_table, create_delivery_comments_table
+from config import TOKEN, DATABASE_NAME
+from database.connection_pool import check_pragmas, close_all_pools
+from database.db_executor import shutdown_db_executors
+from database.migrations import run_migrations, check_query_plans
+from database.admins.users_db import check_recipient_sources
 
 from handlers.admins.order_status import router as admin_order_status_router
 from handlers.admins.start import router as admin_start_router
@@ -11,15 +14,10 @@ from handlers.admins.manage_products import router as admin_manage_products_rout
 from handlers.admins.broadcast import router as admin_broadcast_router
 
 from handlers.users import catalog, start_handler, main_menu_handler
-from database.users.database_connection import create_users_table, create_connection, close_connection
-from database.users.favorites_db import create_favorites_table
 from handlers.users.cart import router as cart_router
 from handlers.users.order import router as order_router
-from database.users.database import create_orders_table
 from handlers.users.profile_handlers import profile_router
-from database.users.profile_db import create_profile_tables
-from database.admins.image_db import create_product_images_table
-from handlers.admins.stock_thresholds import router as stock_thresholds_router, init_stock_thresholds_tables
+from handlers.admins.stock_thresholds import router as stock_thresholds_router
 from handlers.admins.process_order import router as process_order_router
 from handlers.admins.statistics_collection import router as admin_statistics_router
 from handlers.users.help_handler import router as help_router
@@ -37,29 +35,28 @@ from handlers.admins.actions_admin_handler import actions_admin_router
 
 
 from utils.preorder_processor import init_preorder_processor
+from utils.telegram_sender import telegram_sender
+from utils.broadcast_engine import broadcast_engine
+from utils.job_scheduler import job_scheduler
+from utils.order_timeout_manager import order_timeout_manager
+from utils.stock_notification_utils import stock_threshold_watcher
 
 
 logging.basicConfig(level=logging.INFO)
 
+DATABASE_FILES = ("shop_bot.db", DATABASE_NAME, "discounts.db", "preorders.db")
+
 
 async def main():
     bot = Bot(token=TOKEN)
     init_preorder_processor(bot)
     dp = Dispatcher()
 
-    create_users_table()
-    create_favorites_table()
-    create_staff_table()
-    create_profile_tables()
-    init_stock_thresholds_tables()
-    create_product_images_table()
-    create_product_reviews_table()
-    create_delivery_comments_table()
-
-    conn = create_connection()
-    if conn:
-        create_orders_table(conn)
-        close_connection(conn)
+    run_migrations()
+    check_recipient_sources()
+    check_query_plans()
+    for db_file in DATABASE_FILES:
+        check_pragmas(db_file)
 
     dp.include_router(admin_start_router)
     dp.include_router(admin_order_status_router)
@@ -88,10 +85,23 @@ async def main():
     dp.include_router(discounts_router)
     dp.include_router(admin_discounts_router)
 
+    await broadcast_engine.resume(bot)
+    job_scheduler.register("broadcast", partial(broadcast_engine.start_scheduled, bot))
+    await job_scheduler.start()
+    await order_timeout_manager.start(bot)
+    stock_threshold_watcher.start(bot)
+
     try:
         await dp.start_polling(bot)
     finally:
+        await stock_threshold_watcher.stop()
+        await order_timeout_manager.stop()
+        await job_scheduler.stop()
+        await broadcast_engine.stop()
+        await telegram_sender.stop()
         await bot.session.close()
+        shutdown_db_executors()
+        close_all_pools()
 
 
 if __name__ == "__main__":
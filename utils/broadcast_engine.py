@@ -0,0 +1,210 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+from database.db_executor import db_read, db_write
+from database.admins.users_db import get_recipient_ids, count_pruned_recipients
+from database.admins.broadcast_db import (
+    add_broadcast_recipients, finish_recipient_selection, get_recipient_selection_state,
+    get_pending_recipients, save_delivery_results,
+    get_unfinished_broadcasts, get_broadcast_details, update_broadcast_status
+)
+from utils.telegram_sender import telegram_sender
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 500  # сколько получателей одновременно стоит в очереди отправки
+SELECT_BATCH_SIZE = 1000  # сколько ID получателей выбирается из базы за раз
+CHECKPOINT_SIZE = 200  # результаты сохраняются пачками...
+CHECKPOINT_INTERVAL = 2.0  # ...но не реже, чем раз в столько секунд
+MAX_ERROR_LENGTH = 200
+
+
+class BroadcastEngine:
+    """
+    Отправка рассылок с сохранением прогресса.
+
+    Получатели выбираются из базы порциями по возрастанию ID и записываются
+    в таблицу broadcast_deliveries параллельно с отправкой: первые сообщения
+    уходят, не дожидаясь выбора всей аудитории. Каждый результат отправки
+    отмечается в таблице пачками вместе с sent_count. После перезапуска бота
+    незавершенные рассылки продолжаются с оставшихся получателей.
+    Темп отправки задает общая очередь telegram_sender; движок лишь держит в ней
+    до PAGE_SIZE сообщений, чтобы она не простаивала.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    def start(self, bot: Bot, broadcast_id: int):
+        """Запускает отправку сохраненной рассылки в фоне"""
+        self._spawn(bot, broadcast_id)
+
+    async def start_scheduled(self, bot: Bot, broadcast_id: int):
+        """Запускает запланированную рассылку (обработчик задач планировщика)"""
+        details = await db_read(get_broadcast_details, broadcast_id)
+        if not details or details[9] != "scheduled":
+            logger.info(f"Запланированная рассылка #{broadcast_id} уже запущена или удалена")
+            return
+
+        await db_write(update_broadcast_status, broadcast_id, "pending")
+        logger.info(f"Запускаем запланированную рассылку #{broadcast_id}")
+        self.start(bot, broadcast_id)
+
+    async def resume(self, bot: Bot):
+        """Продолжает рассылки, прерванные перезапуском бота"""
+        for broadcast_id in await db_read(get_unfinished_broadcasts):
+            logger.info(f"Продолжаем рассылку #{broadcast_id} после перезапуска")
+            self._spawn(bot, broadcast_id)
+
+    def _spawn(self, bot: Bot, broadcast_id: int):
+        if broadcast_id in self._tasks:
+            return
+        task = asyncio.create_task(self._run(bot, broadcast_id), name=f"broadcast-{broadcast_id}")
+        self._tasks[broadcast_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(broadcast_id, None))
+
+    async def _run(self, bot: Bot, broadcast_id: int):
+        details = await db_read(get_broadcast_details, broadcast_id)
+        if not details:
+            logger.error(f"Рассылка #{broadcast_id} не найдена")
+            return
+
+        make_call = self._make_call_factory(bot, details)
+        results: List[Tuple[int, str, Optional[str]]] = []
+        pending: Dict[asyncio.Future, int] = {}
+        last_user_id = None
+
+        # Выбор получателей идет параллельно с отправкой и продолжается после перезапуска
+        selector = None
+        progress = asyncio.Event()
+        state = await db_read(get_recipient_selection_state, broadcast_id)
+        if state and not state[0]:
+            target_params = json.loads(details[6]) if details[6] else {}
+            selector = asyncio.create_task(
+                self._select(broadcast_id, details[5], target_params, state[1], progress)
+            )
+
+        try:
+            while True:
+                progress.clear()
+                selecting = selector is not None and not selector.done()
+                page = await db_read(get_pending_recipients, broadcast_id, last_user_id, PAGE_SIZE)
+                if not page:
+                    if not selecting:
+                        break
+                    await progress.wait()
+                    continue
+                last_user_id = page[-1]
+
+                pending = {telegram_sender.submit(user_id, make_call(user_id)): user_id for user_id in page}
+                last_checkpoint = time.monotonic()
+
+                while pending:
+                    done, _ = await asyncio.wait(
+                        pending, timeout=CHECKPOINT_INTERVAL, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    self._collect(broadcast_id, done, pending, results)
+
+                    now = time.monotonic()
+                    if len(results) >= CHECKPOINT_SIZE or (results and now - last_checkpoint >= CHECKPOINT_INTERVAL):
+                        await self._checkpoint(broadcast_id, results)
+                        last_checkpoint = now
+
+            await self._checkpoint(broadcast_id, results)
+            if selector is not None and selector.exception() is not None:
+                # Рассылка остается незавершенной и будет продолжена после перезапуска
+                logger.error(f"Ошибка при выборе получателей рассылки #{broadcast_id}: {selector.exception()}")
+                return
+
+            await db_write(update_broadcast_status, broadcast_id, "completed")
+            logger.info(f"Рассылка #{broadcast_id} завершена")
+
+        except asyncio.CancelledError:
+            # Сохраняем то, что успели отправить, остальное продолжится после перезапуска
+            self._collect(broadcast_id, [future for future in pending if future.done()], pending, results)
+            await self._checkpoint(broadcast_id, results)
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка при отправке рассылки #{broadcast_id}: {e}")
+        finally:
+            if selector is not None and not selector.done():
+                selector.cancel()
+
+    @staticmethod
+    async def _select(broadcast_id: int, target_type: str, target_params: Dict,
+                      after_id: Optional[int], progress: asyncio.Event):
+        """Записывает получателей рассылки порциями, начиная после after_id"""
+        try:
+            pruned = await db_read(count_pruned_recipients, target_type, target_params)
+            while True:
+                user_ids = await db_read(get_recipient_ids, target_type, target_params, after_id, SELECT_BATCH_SIZE)
+                if not user_ids:
+                    break
+                if not await db_write(add_broadcast_recipients, broadcast_id, user_ids):
+                    raise RuntimeError("не удалось сохранить получателей")
+                after_id = user_ids[-1]
+                progress.set()
+
+            if await db_write(finish_recipient_selection, broadcast_id, pruned) == -1:
+                raise RuntimeError("не удалось завершить выбор получателей")
+        finally:
+            progress.set()
+
+    @staticmethod
+    def _collect(broadcast_id: int, done, pending: Dict[asyncio.Future, int],
+                 results: List[Tuple[int, str, Optional[str]]]):
+        for future in done:
+            user_id = pending.pop(future)
+            if future.cancelled():
+                # Отправка отменена остановкой бота - получатель останется в очереди
+                continue
+            error = future.exception()
+            if error is None:
+                results.append((user_id, "sent", None))
+            else:
+                logger.warning(f"Ошибка при отправке рассылки #{broadcast_id} пользователю {user_id}: {error}")
+                results.append((user_id, "failed", str(error)[:MAX_ERROR_LENGTH]))
+
+    @staticmethod
+    async def _checkpoint(broadcast_id: int, results: List[Tuple[int, str, Optional[str]]]):
+        if not results:
+            return
+        batch = results[:]
+        results.clear()
+        if not await db_write(save_delivery_results, broadcast_id, batch):
+            logger.error(f"Не удалось сохранить прогресс рассылки #{broadcast_id}")
+
+    @staticmethod
+    def _make_call_factory(bot: Bot, details: Tuple):
+        text, media_type, media_file, buttons_json = details[1], details[2], details[3], details[4]
+        buttons = json.loads(buttons_json) if buttons_json else []
+
+        markup = None
+        if buttons:
+            markup = InlineKeyboardMarkup(inline_keyboard=[
+                [InlineKeyboardButton(text=button["text"], url=button["url"])]
+                for button in buttons
+            ])
+
+        def make_call(user_id: int):
+            if media_type == "photo" and media_file:
+                return lambda: bot.send_photo(chat_id=user_id, photo=media_file, caption=text, reply_markup=markup)
+            return lambda: bot.send_message(chat_id=user_id, text=text or "", reply_markup=markup)
+
+        return make_call
+
+    async def stop(self):
+        """Останавливает активные рассылки, сохраняя их прогресс (при остановке бота)"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+broadcast_engine = BroadcastEngine()
@@ -1,6 +1,6 @@
 import json
 from typing import List, Dict, Any, Tuple, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 import re
 
 
@@ -118,6 +118,7 @@ def format_broadcast_history_item(broadcast: tuple) -> str:
     status_text = {
         "completed": "✅ Завершена",
         "pending": "🕒 В процессе",
+        "scheduled": "⏰ Запланирована",
         "failed": "❌ Ошибка",
         "canceled": "⛔ Отменена"
     }.get(status, status)
@@ -149,7 +150,7 @@ def format_broadcast_details(broadcast: tuple) -> str:
     """Форматирует детальную информацию о рассылке."""
     (broadcast_id, message_text, media_type, media_file, buttons_json,
      target_type, target_params, sent_count, total_recipients,
-     status, created_at, sent_at) = broadcast
+     status, created_at, sent_at, pruned_count) = broadcast
 
     # Конвертируем JSON в объекты Python
     try:
@@ -163,13 +164,14 @@ def format_broadcast_details(broadcast: tuple) -> str:
     status_text = {
         "completed": "✅ Завершена",
         "pending": "🕒 В процессе",
+        "scheduled": "⏰ Запланирована",
         "failed": "❌ Ошибка",
         "canceled": "⛔ Отменена"
     }.get(status, status)
 
     target_text = {
         "all": "Все пользователи",
-        "active": f"Активные пользователи за последние {target_params.get('days', 30)} дней",
+        "active": f"Активные пользователи за последние {target_params.get('active_days', 30)} дней",
         "region": f"Пользователи из региона: {target_params.get('region', 'Не указан')}"
     }.get(target_type, target_type)
 
@@ -195,6 +197,10 @@ def format_broadcast_details(broadcast: tuple) -> str:
 
     delivery_rate = (sent_count / total_recipients * 100) if total_recipients > 0 else 0
 
+    pruned_info = ""
+    if pruned_count:
+        pruned_info = f"🚫 <b>Исключено недоступных:</b> {pruned_count}\n"
+
     return (
         f"📤 <b>Детали рассылки #{broadcast_id}</b>\n\n"
         f"📝 <b>Текст сообщения:</b>\n{message_text}\n\n"
@@ -202,6 +208,7 @@ def format_broadcast_details(broadcast: tuple) -> str:
         f"{buttons_info}"
         f"👥 <b>Целевая аудитория:</b> {target_text}\n"
         f"📊 <b>Статистика доставки:</b> {sent_count}/{total_recipients} ({delivery_rate:.1f}%)\n"
+        f"{pruned_info}"
         f"📅 <b>Создана:</b> {created_date}\n"
         f"📅 <b>Отправлена:</b> {sent_date}\n"
         f"📌 <b>Статус:</b> {status_text}"
@@ -223,7 +230,7 @@ def parse_scheduled_time(time_string: str) -> Optional[datetime]:
 
         # Если время уже прошло, переносим на завтра
         if scheduled_time < now:
-            scheduled_time = scheduled_time.replace(day=now.day + 1)
+            scheduled_time += timedelta(days=1)
 
         return scheduled_time
 
@@ -1,51 +1,97 @@
+import hashlib
+import logging
+import threading
 from typing import Dict, Tuple, Optional
 
+logger = logging.getLogger(__name__)
+
+
+def _short_hash(*parts: str) -> str:
+    """Стабильный короткий хэш (8 hex-символов), одинаковый между перезапусками"""
+    digest = hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=4)
+    return digest.hexdigest()
+
 
 class CatalogMapping:
-    """Менеджер для маппинга названий категорий и товаров на короткие ID"""
+    """
+    Менеджер для маппинга названий категорий и товаров на короткие ID.
+
+    ID вычисляются детерминированно из названий, поэтому кнопки, отправленные
+    до перезапуска бота, продолжают работать. Обратный маппинг строится по
+    текущему каталогу и перестраивается при промахе, только если каталог
+    изменился с прошлой перестройки: устаревшие или подделанные callback data
+    не вызывают повторных перестроек. Размер маппинга ограничен размером каталога.
+    """
 
     def __init__(self):
-        self._category_to_id: Dict[str, str] = {}
+        self._lock = threading.Lock()
         self._id_to_category: Dict[str, str] = {}
-        self._product_to_id: Dict[Tuple[str, str], str] = {}
         self._id_to_product: Dict[str, Tuple[str, str]] = {}
-        self._counter = 0
+        # Версия каталога (catalog_cache.generation), по которой построен маппинг
+        self._built_generation: Optional[int] = None
 
     def get_category_id(self, category_name: str) -> str:
-        """Получает или создает ID для категории"""
-        if category_name not in self._category_to_id:
-            self._counter += 1
-            cat_id = f"c{self._counter}"
-            self._category_to_id[category_name] = cat_id
-            self._id_to_category[cat_id] = category_name
-        return self._category_to_id[category_name]
+        """Возвращает ID категории"""
+        cat_id = f"c{_short_hash(category_name)}"
+        with self._lock:
+            self._id_to_category.setdefault(cat_id, category_name)
+        return cat_id
 
     def get_category_name(self, category_id: str) -> Optional[str]:
         """Получает название категории по ID"""
-        return self._id_to_category.get(category_id)
+        category_name = self._id_to_category.get(category_id)
+        if category_name is None:
+            self._rebuild()
+            category_name = self._id_to_category.get(category_id)
+        return category_name
 
     def get_product_id(self, category_name: str, product_name: str) -> str:
-        """Получает или создает ID для пары (категория, товар)"""
-        key = (category_name, product_name)
-        if key not in self._product_to_id:
-            self._counter += 1
-            prod_id = f"p{self._counter}"
-            self._product_to_id[key] = prod_id
-            self._id_to_product[prod_id] = key
-        return self._product_to_id[key]
+        """Возвращает ID для пары (категория, товар)"""
+        prod_id = f"p{_short_hash(category_name, product_name)}"
+        with self._lock:
+            self._id_to_product.setdefault(prod_id, (category_name, product_name))
+        return prod_id
 
     def get_product_info(self, product_id: str) -> Optional[Tuple[str, str]]:
         """Получает (категория, товар) по ID"""
-        return self._id_to_product.get(product_id)
+        product_info = self._id_to_product.get(product_id)
+        if product_info is None:
+            self._rebuild()
+            product_info = self._id_to_product.get(product_id)
+        return product_info
+
+    def _rebuild(self):
+        """Строит обратный маппинг заново по текущему каталогу, если каталог изменился"""
+        from database.users.catalog_cache import catalog_cache
+
+        # Версия читается до обхода каталога: изменение во время обхода вызовет новую перестройку
+        generation = catalog_cache.generation
+        if generation == self._built_generation:
+            return
+
+        id_to_category: Dict[str, str] = {}
+        id_to_product: Dict[str, Tuple[str, str]] = {}
+        for category_name in catalog_cache.categories():
+            cat_id = f"c{_short_hash(category_name)}"
+            if id_to_category.setdefault(cat_id, category_name) != category_name:
+                logger.warning(f"Совпадение ID {cat_id} у категорий '{id_to_category[cat_id]}' и '{category_name}'")
+            for product_name in catalog_cache.product_names(category_name):
+                prod_id = f"p{_short_hash(category_name, product_name)}"
+                if id_to_product.setdefault(prod_id, (category_name, product_name)) != (category_name, product_name):
+                    logger.warning(f"Совпадение ID {prod_id} у товаров {id_to_product[prod_id]} и {(category_name, product_name)}")
+
+        with self._lock:
+            self._id_to_category = id_to_category
+            self._id_to_product = id_to_product
+            self._built_generation = generation
 
     def clear(self):
         """Очищает все маппинги"""
-        self._category_to_id.clear()
-        self._id_to_category.clear()
-        self._product_to_id.clear()
-        self._id_to_product.clear()
-        self._counter = 0
+        with self._lock:
+            self._id_to_category = {}
+            self._id_to_product = {}
+            self._built_generation = None
 
 
 # Глобальный экземпляр маппинга
-catalog_mapping = CatalogMapping()
\ No newline at end of file
+catalog_mapping = CatalogMapping()
@@ -0,0 +1,132 @@
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from database.db_executor import db_read, db_write
+from database.scheduler_db import add_scheduled_job, get_pending_jobs, complete_job, retry_job, fail_job
+
+logger = logging.getLogger(__name__)
+
+# Максимальный сон цикла: страховка от перевода системных часов
+MAX_SLEEP = 3600
+# Задача, обработчик которой упал, повторяется через JOB_RETRY_DELAY * 2^(попытка - 1) секунд;
+# после MAX_JOB_ATTEMPTS неудачных попыток она отмечается как failed
+MAX_JOB_ATTEMPTS = 5
+JOB_RETRY_DELAY = 60
+
+
+class JobScheduler:
+    """
+    Планировщик отложенных задач.
+
+    Задачи хранятся в таблице scheduled_jobs и переживают перезапуск бота.
+    В памяти они лежат в куче по времени запуска, которую разбирает одна
+    фоновая задача: она спит до ближайшего срока или до добавления новой задачи.
+    Выполнение передается обработчику, зарегистрированному для типа задачи.
+    Выполненной задача отмечается, только если обработчик завершился без ошибки;
+    иначе она переносится с растущей паузой или, после MAX_JOB_ATTEMPTS, отмечается failed.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, Callable[[int], Awaitable[None]]] = {}
+        self._heap: List[Tuple[datetime, int, str, int]] = []
+        self._attempts: Dict[int, int] = {}
+        self._running: Set[asyncio.Task] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def register(self, job_type: str, handler: Callable[[int], Awaitable[None]]):
+        """Регистрирует обработчик задач типа job_type; он получает ref_id задачи"""
+        self._handlers[job_type] = handler
+
+    async def start(self):
+        """Загружает невыполненные задачи из базы и запускает цикл планировщика"""
+        if self._loop_task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        for job_id, job_type, ref_id, run_at, attempts in await db_read(get_pending_jobs):
+            heapq.heappush(self._heap, (run_at, job_id, job_type, ref_id))
+            if attempts:
+                self._attempts[job_id] = attempts
+        self._loop_task = asyncio.create_task(self._loop(), name="job-scheduler")
+        logger.info(f"Планировщик задач запущен, ожидает задач: {len(self._heap)}")
+
+    async def schedule(self, job_type: str, ref_id: int, run_at: datetime) -> int:
+        """Сохраняет задачу и ставит ее в очередь. Возвращает ID задачи или -1 при ошибке"""
+        job_id = await db_write(add_scheduled_job, job_type, ref_id, run_at)
+        if job_id == -1:
+            return -1
+
+        heapq.heappush(self._heap, (run_at, job_id, job_type, ref_id))
+        if self._wakeup is not None:
+            self._wakeup.set()
+        logger.info(f"Задача {job_type}:{ref_id} запланирована на {run_at}")
+        return job_id
+
+    async def _loop(self):
+        while True:
+            self._wakeup.clear()
+            now = datetime.now()
+            while self._heap and self._heap[0][0] <= now:
+                self._dispatch(*heapq.heappop(self._heap))
+
+            timeout = MAX_SLEEP
+            if self._heap:
+                timeout = min(MAX_SLEEP, (self._heap[0][0] - now).total_seconds())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self, run_at: datetime, job_id: int, job_type: str, ref_id: int):
+        task = asyncio.create_task(self._run_job(job_id, job_type, ref_id), name=f"job-{job_id}")
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run_job(self, job_id: int, job_type: str, ref_id: int):
+        handler = self._handlers.get(job_type)
+        if handler is None:
+            logger.error(f"Нет обработчика для задачи #{job_id} типа {job_type}")
+            return
+
+        try:
+            await handler(ref_id)
+        except Exception as e:
+            logger.error(f"Ошибка при выполнении задачи #{job_id} ({job_type}:{ref_id}): {e}")
+            await self._retry_later(job_id, job_type, ref_id, str(e))
+            return
+        self._attempts.pop(job_id, None)
+        await db_write(complete_job, job_id)
+
+    async def _retry_later(self, job_id: int, job_type: str, ref_id: int, error: str):
+        """Переносит упавшую задачу с растущей паузой или отмечает ее failed после MAX_JOB_ATTEMPTS"""
+        attempts = self._attempts.get(job_id, 0) + 1
+        if attempts >= MAX_JOB_ATTEMPTS:
+            self._attempts.pop(job_id, None)
+            await db_write(fail_job, job_id, error)
+            logger.error(f"Задача #{job_id} ({job_type}:{ref_id}) не выполнена после {attempts} попыток")
+            return
+
+        self._attempts[job_id] = attempts
+        run_at = datetime.now() + timedelta(seconds=JOB_RETRY_DELAY * 2 ** (attempts - 1))
+        await db_write(retry_job, job_id, run_at, error)
+        heapq.heappush(self._heap, (run_at, job_id, job_type, ref_id))
+        if self._wakeup is not None:
+            self._wakeup.set()
+        logger.info(f"Задача #{job_id} ({job_type}:{ref_id}) будет повторена в {run_at:%H:%M:%S} "
+                    f"(попытка {attempts + 1} из {MAX_JOB_ATTEMPTS})")
+
+    async def stop(self):
+        """Останавливает цикл планировщика (при остановке бота)"""
+        tasks = list(self._running)
+        if self._loop_task is not None:
+            tasks.append(self._loop_task)
+            self._loop_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+job_scheduler = JobScheduler()
@@ -1,117 +1,256 @@
 import asyncio
+import heapq
 import logging
-from typing import Dict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
 from aiogram import Bot
 
-from database.admins.orders_bd import get_order_by_id
-from database.admins.settings_db import get_order_processing_timeout, get_notification_interval, get_notification_text
+from database.db_executor import db_read, db_write
+from database.admins.orders_bd import get_order_statuses
+from database.admins.order_timers_db import load_order_timers, save_order_timers, delete_order_timers
+from database.admins.settings_db import (
+    get_order_processing_timeout, get_notification_interval, get_notification_text, subscribe,
+    DEFAULT_ORDER_PROCESSING_TIMEOUT, DEFAULT_NOTIFICATION_INTERVAL
+)
 from database.admins.staff_db import get_staff_by_role
+from utils.telegram_sender import telegram_sender
 
 logger = logging.getLogger(__name__)
 
+# Максимальный сон цикла: страховка от перевода системных часов
+MAX_SLEEP = 3600
+# Через сколько секунд повторить проверку таймеров, обработка которых завершилась ошибкой
+RETRY_DELAY = 60
+
 
 class OrderTimeoutManager:
-    """Менеджер для отслеживания таймаутов обработки заказов"""
+    """
+    Менеджер для отслеживания таймаутов обработки заказов.
+
+    Таймеры хранятся в таблице order_timers и восстанавливаются после перезапуска.
+    В памяти - время следующего срабатывания каждого заказа и куча по этому времени,
+    которую разбирает один цикл: статусы всех сработавших заказов проверяются
+    одним запросом, курьеры получают уведомления, таймеры сдвигаются на интервал.
+    При изменении таймаута или интервала в настройках ожидающие таймеры
+    переносятся на разницу между новым и старым значением.
+    """
 
     def __init__(self):
-        self._active_timers: Dict[int, asyncio.Task] = {}
+        self._next_fire: Dict[int, datetime] = {}
         self._notification_counts: Dict[int, int] = {}
+        self._heap: List[Tuple[datetime, int]] = []
+        self._bot: Optional[Bot] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self._event_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._background: Set[asyncio.Task] = set()
+
+    async def start(self, bot: Bot):
+        """Восстанавливает таймеры из базы и запускает цикл (при старте бота)"""
+        self._bot = bot
+        if self._loop_task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        if self._event_loop is None:
+            subscribe(self._on_setting_changed)
+        self._event_loop = asyncio.get_running_loop()
+        for order_id, fire_at, count in await db_read(load_order_timers):
+            self._set(order_id, fire_at, count)
+        self._loop_task = asyncio.create_task(self._loop(), name="order-timeouts")
+        logger.info(f"Restored {len(self._next_fire)} order timeout timers")
 
     async def start_timer(self, order_id: int, bot: Bot):
         """Запускает таймер для отслеживания обработки заказа"""
-        await self.cancel_timer(order_id)
-
-        self._notification_counts[order_id] = 0
+        await self.start(bot)
 
-        task = asyncio.create_task(self._order_timeout_handler(order_id, bot))
-        self._active_timers[order_id] = task
+        fire_at = datetime.now() + timedelta(minutes=get_order_processing_timeout())
+        self._set(order_id, fire_at, 0)
+        await db_write(save_order_timers, [(order_id, fire_at, 0)])
+        self._wakeup.set()
         logger.info(f"Started timeout timer for order #{order_id}")
 
     async def cancel_timer(self, order_id: int):
         """Отменяет таймер для заказа"""
-        if order_id in self._active_timers:
-            task = self._active_timers[order_id]
-            if not task.done():
-                task.cancel()
-            del self._active_timers[order_id]
+        if self._forget(order_id):
+            await db_write(delete_order_timers, [order_id])
+            logger.info(f"Cancelled timeout timer for order #{order_id}")
 
-        if order_id in self._notification_counts:
-            del self._notification_counts[order_id]
+    def _set(self, order_id: int, fire_at: datetime, count: int):
+        self._next_fire[order_id] = fire_at
+        self._notification_counts[order_id] = count
+        heapq.heappush(self._heap, (fire_at, order_id))
 
-        logger.info(f"Cancelled timeout timer for order #{order_id}")
+    def _forget(self, order_id: int) -> bool:
+        self._notification_counts.pop(order_id, None)
+        if self._next_fire.pop(order_id, None) is None:
+            return False
+        self._compact()
+        return True
 
-    async def _order_timeout_handler(self, order_id: int, bot: Bot):
-        """Обработчик таймаута заказа с периодическими уведомлениями"""
+    def _compact(self):
+        # Записи отмененных и перенесенных таймеров остаются в куче до срабатывания;
+        # если их накопилось много, куча перестраивается по актуальным таймерам
+        if len(self._heap) > 2 * len(self._next_fire) + 64:
+            self._heap = [(fire_at, order_id) for order_id, fire_at in self._next_fire.items()]
+            heapq.heapify(self._heap)
+
+    def _on_setting_changed(self, key: str, old_value: Optional[str], new_value: str):
+        """Подписка на settings_db: может вызываться из любого потока"""
+        if key in ('order_processing_timeout', 'notification_interval') and self._event_loop is not None:
+            self._event_loop.call_soon_threadsafe(self._reschedule, key, old_value, new_value)
+
+    def _reschedule(self, key: str, old_value: Optional[str], new_value: str):
+        """Переносит ожидающие таймеры после изменения таймаута или интервала"""
+        waiting_initial = key == 'order_processing_timeout'
+        default = DEFAULT_ORDER_PROCESSING_TIMEOUT if waiting_initial else DEFAULT_NOTIFICATION_INTERVAL
         try:
-            timeout_minutes = get_order_processing_timeout()
-            interval_minutes = get_notification_interval()
+            delta = timedelta(minutes=int(new_value) - int(old_value if old_value is not None else default))
+        except ValueError:
+            return
+        if not delta:
+            return
 
-            await asyncio.sleep(timeout_minutes * 60)
+        now = datetime.now()
+        timers = []
+        for order_id, fire_at in list(self._next_fire.items()):
+            count = self._notification_counts.get(order_id, 0)
+            # Таймаут влияет на таймеры до первого уведомления, интервал - на последующие
+            if (count == 0) != waiting_initial:
+                continue
+            new_fire = max(now, fire_at + delta)
+            self._set(order_id, new_fire, count)
+            timers.append((order_id, new_fire, count))
 
-            while True:
-                order = get_order_by_id(order_id)
-                if not order:
-                    logger.warning(f"Order #{order_id} not found for timeout check")
-                    break
+        if timers:
+            self._compact()
+            task = asyncio.create_task(db_write(save_order_timers, timers))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+            self._wakeup.set()
+            logger.info(f"Rescheduled {len(timers)} order timeout timers after {key} change")
 
-                if order['status'] == 'processing':
-                    self._notification_counts[order_id] += 1
-                    await self._send_timeout_notifications(order_id, order, bot)
+    async def _loop(self):
+        while True:
+            self._wakeup.clear()
+            now = datetime.now()
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                fire_at, order_id = heapq.heappop(self._heap)
+                if self._next_fire.get(order_id) == fire_at:
+                    due.append(order_id)
 
-                    await asyncio.sleep(interval_minutes * 60)
-                else:
-                    logger.info(f"Order #{order_id} has been processed, stopping notifications")
-                    break
+            if due:
+                try:
+                    await self._process_due(due)
+                except Exception as e:
+                    logger.error(f"Error processing order timeouts {due}: {e}")
+                    self._retry_later(due)
+                continue
 
-        except asyncio.CancelledError:
-            logger.info(f"Timeout timer for order #{order_id} was cancelled")
-        except Exception as e:
-            logger.error(f"Error in timeout handler for order #{order_id}: {e}")
-        finally:
-            if order_id in self._active_timers:
-                del self._active_timers[order_id]
-            if order_id in self._notification_counts:
-                del self._notification_counts[order_id]
-
-    async def _send_timeout_notifications(self, order_id: int, order: dict, bot: Bot):
-        """Отправляет уведомления курьерам о необработанном заказе"""
+            timeout = MAX_SLEEP
+            if self._heap:
+                timeout = min(MAX_SLEEP, (self._heap[0][0] - now).total_seconds())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _retry_later(self, order_ids: List[int]):
+        """Возвращает в очередь таймеры, обработка которых завершилась ошибкой"""
+        retry_at = datetime.now() + timedelta(seconds=RETRY_DELAY)
+        for order_id in order_ids:
+            # Таймер мог быть отменен или уже перенесен до ошибки
+            if order_id in self._next_fire and self._next_fire[order_id] <= retry_at:
+                self._set(order_id, retry_at, self._notification_counts.get(order_id, 0))
+
+    async def _process_due(self, order_ids: List[int]):
+        """Проверяет сработавшие таймеры и уведомляет курьеров о необработанных заказах"""
+        statuses = await db_read(get_order_statuses, order_ids)
+
+        finished = [order_id for order_id in order_ids if statuses.get(order_id) != 'processing']
+        for order_id in finished:
+            if order_id not in statuses:
+                logger.warning(f"Order #{order_id} not found for timeout check")
+            else:
+                logger.info(f"Order #{order_id} has been processed, stopping notifications")
+            self._forget(order_id)
+        if finished:
+            await db_write(delete_order_timers, finished)
+
+        # Пока шла проверка статусов, таймер могли отменить (cancel_timer) - такой не взводим снова
+        overdue = [
+            order_id for order_id in order_ids
+            if statuses.get(order_id) == 'processing' and order_id in self._next_fire
+        ]
+        if not overdue:
+            return
+
+        interval_minutes = get_notification_interval()
+        next_fire = datetime.now() + timedelta(minutes=interval_minutes)
+        timers = []
+        for order_id in overdue:
+            count = self._notification_counts.get(order_id, 0) + 1
+            self._set(order_id, next_fire, count)
+            timers.append((order_id, next_fire, count))
+        await db_write(save_order_timers, timers)
+
+        task = asyncio.create_task(self._send_timeout_notifications(timers))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _send_timeout_notifications(self, timers: List[Tuple[int, datetime, int]]):
+        """Отправляет уведомления курьерам о необработанных заказах"""
         try:
             timeout_minutes = get_order_processing_timeout()
             interval_minutes = get_notification_interval()
             notification_text = get_notification_text()
 
-            notification_count = self._notification_counts.get(order_id, 1)
-            elapsed_time = timeout_minutes + (notification_count - 1) * interval_minutes
+            couriers = get_staff_by_role(role="Курьер")
+            courier_ids = [courier['telegram_id'] for courier in couriers if courier.get('is_active', 1)]
 
-            formatted_text = notification_text.format(
-                order_id=order_id,
-                elapsed_time=elapsed_time,
-                notification_count=notification_count
-            )
+            # Сначала ставим в очередь уведомления по всем заказам, затем ждем результатов
+            deliveries = []
+            for order_id, _, notification_count in timers:
+                elapsed_time = timeout_minutes + (notification_count - 1) * interval_minutes
 
-            if notification_count > 1:
-                formatted_text += f"\n\n📢 Это уведомление #{notification_count}"
+                formatted_text = notification_text.format(
+                    order_id=order_id,
+                    elapsed_time=elapsed_time,
+                    notification_count=notification_count
+                )
 
-            couriers = get_staff_by_role(role="Курьер")
-            courier_ids = [courier['telegram_id'] for courier in couriers if courier.get('is_active', 1)]
+                if notification_count > 1:
+                    formatted_text += f"\n\n📢 Это уведомление #{notification_count}"
 
-            sent_count = 0
-            for courier_id in courier_ids:
-                try:
-                    await bot.send_message(
-                        courier_id,
-                        formatted_text,
-                        parse_mode="HTML"
-                    )
-                    sent_count += 1
-                except Exception as e:
-                    logger.error(f"Failed to send timeout notification to courier {courier_id}: {e}")
+                futures = [telegram_sender.send_message(self._bot, courier_id, formatted_text, parse_mode="HTML")
+                           for courier_id in courier_ids]
+                deliveries.append((order_id, notification_count, futures))
 
-            logger.info(
-                f"Sent timeout notification #{notification_count} for order #{order_id} to {sent_count} couriers")
+            for order_id, notification_count, futures in deliveries:
+                results = await asyncio.gather(*futures, return_exceptions=True)
+
+                sent_count = 0
+                for courier_id, result in zip(courier_ids, results):
+                    if isinstance(result, Exception):
+                        logger.error(f"Failed to send timeout notification to courier {courier_id}: {result}")
+                    else:
+                        sent_count += 1
+
+                logger.info(
+                    f"Sent timeout notification #{notification_count} for order #{order_id} to {sent_count} couriers")
 
         except Exception as e:
-            logger.error(f"Error sending timeout notifications for order #{order_id}: {e}")
+            logger.error(f"Error sending timeout notifications for orders {[timer[0] for timer in timers]}: {e}")
+
+    async def stop(self):
+        """Останавливает цикл таймеров (при остановке бота); таймеры остаются в базе"""
+        tasks = list(self._background)
+        if self._loop_task is not None:
+            tasks.append(self._loop_task)
+            self._loop_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
 
 order_timeout_manager = OrderTimeoutManager()
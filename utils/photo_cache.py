@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+
+from database.db_executor import db_read, db_write
+from database.file_id_db import load_file_ids, save_file_id, delete_file_id
+
+logger = logging.getLogger(__name__)
+
+# путь -> (mtime, размер файла, file_id)
+_file_ids: Optional[Dict[str, Tuple[float, int, str]]] = None
+# (путь, mtime, размер) -> событие завершения идущей загрузки файла
+_uploads: Dict[Tuple[str, float, int], asyncio.Event] = {}
+
+
+async def _get_file_ids() -> Dict[str, Tuple[float, int, str]]:
+    global _file_ids
+    if _file_ids is None:
+        file_ids = await db_read(load_file_ids)
+        # Одновременные первые вызовы должны получить один и тот же словарь
+        if _file_ids is None:
+            _file_ids = file_ids
+    return _file_ids
+
+
+def is_file_id_error(error: TelegramBadRequest) -> bool:
+    """Ошибка означает, что Telegram не принимает сам file_id (а не что-то другое в запросе)."""
+    text = str(error).lower()
+    return "file identifier" in text or "file_id" in text or "file reference" in text
+
+
+async def answer_photo_cached(
+        send: Callable[..., Awaitable[Message]],
+        image_path: str,
+        **kwargs
+) -> Message:
+    """
+    Отправляет изображение с диска, переиспользуя file_id, полученный при первой загрузке.
+
+    send - метод отправки фото, принимающий photo=... (message.answer_photo,
+    functools.partial(bot.send_photo, chat_id) и т.п.), kwargs передаются в него.
+    file_id привязан к пути, времени изменения и размеру файла: после замены
+    изображения на диске оно будет загружено заново. Одновременные отправки
+    еще не загруженного файла ждут одну загрузку и используют ее file_id.
+    """
+    path = os.path.abspath(image_path)
+    stat = os.stat(path)
+    key = (path, stat.st_mtime, stat.st_size)
+    file_ids = await _get_file_ids()
+
+    while True:
+        cached = file_ids.get(path)
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            try:
+                return await send(photo=cached[2], **kwargs)
+            except TelegramBadRequest as e:
+                if not is_file_id_error(e):
+                    raise
+                logger.warning(f"Telegram не принял сохраненный file_id для {path}, загружаем файл заново: {e}")
+                # Запись могли уже обновить параллельной загрузкой
+                if file_ids.get(path) == cached:
+                    file_ids.pop(path, None)
+                    await db_write(delete_file_id, path)
+                continue
+
+        upload = _uploads.get(key)
+        if upload is None:
+            break
+        # Файл уже загружается другой отправкой: ждем ее и берем file_id из кэша;
+        # если загрузка не удалась, файл загрузит одна из ожидающих отправок
+        await upload.wait()
+
+    upload = _uploads[key] = asyncio.Event()
+    try:
+        message = await send(photo=FSInputFile(path), **kwargs)
+        if message and message.photo:
+            file_id = message.photo[-1].file_id
+            file_ids[path] = (stat.st_mtime, stat.st_size, file_id)
+            await db_write(save_file_id, path, stat.st_mtime, stat.st_size, file_id)
+        return message
+    finally:
+        del _uploads[key]
+        upload.set()
@@ -1,10 +1,14 @@
+import asyncio
 import logging
 from typing import List, Dict, Any
 from aiogram import Bot
 
+from database.connection_pool import connection
 from database.preorder_db import preorder_db
 from database.users.database import add_to_cart
 from database.users.warehouse_connection import get_product_by_id
+from utils.photo_cache import answer_photo_cached
+from utils.telegram_sender import telegram_sender
 
 import os
 
@@ -36,14 +40,16 @@ class PreorderProcessor:
             if not warehouse_product:
                 return
 
-            # Обрабатываем каждого пользователя
-            for user_id in users_with_preorders:
-                await self._process_user_preorder(
+            # Обрабатываем пользователей параллельно: темп отправки задает telegram_sender
+            await asyncio.gather(*(
+                self._process_user_preorder(
                     user_id,
                     preorder_product,
                     warehouse_product,
                     warehouse_product_id
                 )
+                for user_id in users_with_preorders
+            ))
 
             # Деактивируем товар в предзаказах
             preorder_db.delete_preorder_product(preorder_product['id'])
@@ -53,10 +59,9 @@ class PreorderProcessor:
 
     def _get_users_with_preorder(self, product_id: int) -> List[int]:
         """Получить список пользователей с предзаказом на товар"""
-        import sqlite3
         users = []
         try:
-            with sqlite3.connect(preorder_db.db_path) as conn:
+            with connection(preorder_db.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT DISTINCT user_id 
@@ -124,11 +129,10 @@ class PreorderProcessor:
             # Если есть изображение товара, отправляем с фото
             if image_path and os.path.exists(image_path):
                 try:
-                    from aiogram.types import FSInputFile
-                    photo = FSInputFile(image_path)
-                    await self.bot.send_photo(
-                        user_id,
-                        photo=photo,
+                    # Каждый вызов API идет через общую очередь отправки
+                    await answer_photo_cached(
+                        lambda **kwargs: telegram_sender.send(user_id, lambda: self.bot.send_photo(user_id, **kwargs)),
+                        image_path,
                         caption=text,
                         parse_mode="HTML",
                         reply_markup=builder.as_markup()
@@ -136,14 +140,16 @@ class PreorderProcessor:
                 except Exception as e:
                     logger.error(f"Ошибка при отправке фото: {e}")
                     # Если не удалось отправить с фото, отправляем текстом
-                    await self.bot.send_message(
+                    await telegram_sender.send_message(
+                        self.bot,
                         user_id,
                         text,
                         parse_mode="HTML",
                         reply_markup=builder.as_markup()
                     )
             else:
-                await self.bot.send_message(
+                await telegram_sender.send_message(
+                    self.bot,
                     user_id,
                     text,
                     parse_mode="HTML",
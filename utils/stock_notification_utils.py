@@ -1,101 +1,116 @@
+import asyncio
 import sqlite3
 import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set, Tuple
 from aiogram import Bot
 import logging
-from database.admins.staff_db import get_staff_by_role
+from config import DATABASE_NAME
+from database.db_executor import db_read, db_write
+from database.stock_events import subscribe_stock_changes
+from database.users.database_connection import create_connection
+from database.admins.staff_db import get_staff_ids_by_role
+from utils.telegram_sender import telegram_sender, MAX_MESSAGE_LENGTH
 
 from database.admins.stock_thresholds_db import (
-    get_product_threshold,
-    get_all_product_thresholds,
-    update_last_notification_date,
-    log_stock_notification,
-    update_notification_delivered
+    get_low_stock_products,
+    update_last_notification_dates,
+    log_stock_notifications,
+    update_notifications_delivered
 )
 
 logger = logging.getLogger(__name__)
 
+# Повторное уведомление о том же товаре - не раньше, чем через столько часов
+NOTIFICATION_COOLDOWN_HOURS = 24
+# Изменения остатков, пришедшие за это время, проверяются одной пачкой
+STOCK_CHANGE_DEBOUNCE_SECONDS = 5
 
-async def check_low_stock_products(warehouse_conn: sqlite3.Connection, shop_conn: sqlite3.Connection, bot: Bot) -> None:
+
+async def check_low_stock_products(bot: Bot, product_ids: Optional[List[int]] = None) -> None:
     """
-    Проверяет все товары на наличие низких остатков и отправляет уведомления
+    Проверяет товары на наличие низких остатков и отправляет уведомления.
+    Товары ниже порога и их последние продажи выбираются двумя запросами
+    (база склада подключается через ATTACH), каждый админ получает одну сводку.
+    Товары, о которых уже сообщали за последние NOTIFICATION_COOLDOWN_HOURS часов, пропускаются.
+    product_ids - проверить только эти товары (по умолчанию - все товары с порогами)
     """
-    # Получаем все товары с установленными порогами
-    thresholds = get_all_product_thresholds(shop_conn)
+    notified_before = (
+        datetime.datetime.now() - datetime.timedelta(hours=NOTIFICATION_COOLDOWN_HOURS)
+    ).isoformat()
+    products, recent_sales = await db_read(_load_low_stock_products, notified_before, product_ids)
+    if not products:
+        return
 
-    for product_id, threshold in thresholds:
-        await check_product_stock(warehouse_conn, shop_conn, bot, product_id, threshold)
+    await send_low_stock_digest(bot, products, recent_sales)
 
 
-async def check_product_stock(
-        warehouse_conn: sqlite3.Connection,
-        shop_conn: sqlite3.Connection,
-        bot: Bot,
-        product_id: int,
-        threshold: Optional[int] = None
-) -> None:
-    """
-    Проверяет остаток конкретного товара и отправляет уведомление при необходимости
-    """
-    # Если порог не указан, получаем его из БД
-    if threshold is None:
-        threshold = get_product_threshold(shop_conn, product_id)
-        if threshold is None:
-            # Для этого товара не установлен порог
-            return
+def _load_low_stock_products(
+        notified_before: str,
+        product_ids: Optional[List[int]]
+) -> Tuple[List[Dict], Dict[int, List[Dict]]]:
+    """Выбирает товары ниже порога и их последние продажи (выполняется через db_read)"""
+    conn = create_connection()
+    try:
+        conn.attach(DATABASE_NAME, 'warehouse')
+        products = get_low_stock_products(conn, notified_before, product_ids)
+        if not products:
+            return [], {}
+        return products, get_recent_sales_for_products(conn, [product["product_id"] for product in products])
+    finally:
+        conn.close()
 
-    # Получаем информацию о товаре из warehouse_db
-    cursor = warehouse_conn.cursor()
-    cursor.execute(
-        "SELECT id, category, product_name, product_full_name, flavor, quantity FROM products WHERE id = ?",
-        (product_id,)
-    )
-    product = cursor.fetchone()
 
-    if not product:
-        logger.warning(f"Товар с ID {product_id} не найден в базе данных")
-        return
+def _log_low_stock_digest(products: List[Dict]) -> List[int]:
+    """Записывает сводку в журнал уведомлений (выполняется через db_write)"""
+    conn = create_connection()
+    try:
+        return log_stock_notifications(conn, products)
+    finally:
+        conn.close()
 
-    product_id, category, product_name, product_full_name, flavor, quantity = product
-
-    # Проверяем, требуется ли отправка уведомления
-    if quantity <= threshold:
-        # Получаем данные о последних продажах товара
-        recent_sales = get_recent_sales(shop_conn, product_id)
-
-        # Формируем и отправляем уведомление
-        await send_low_stock_notification(
-            shop_conn,
-            bot,
-            product_id,
-            product_full_name,
-            quantity,
-            threshold,
-            recent_sales
-        )
+
+def _mark_low_stock_digest_delivered(notification_ids: List[int], product_ids: List[int]) -> None:
+    """Отмечает сводку доставленной и запускает паузу до следующего уведомления (выполняется через db_write)"""
+    conn = create_connection()
+    try:
+        update_notifications_delivered(conn, notification_ids, True)
+        update_last_notification_dates(conn, product_ids)
+    finally:
+        conn.close()
 
 
-def get_recent_sales(conn: sqlite3.Connection, product_id: int, limit: int = 5) -> List[Dict]:
+def get_recent_sales_for_products(
+        conn: sqlite3.Connection,
+        product_ids: List[int],
+        limit: int = 5
+) -> Dict[int, List[Dict]]:
     """
-    Получает информацию о последних продажах товара
+    Получает последние продажи сразу для нескольких товаров одним запросом
     """
+    if not product_ids:
+        return {}
+
+    placeholders = ",".join("?" * len(product_ids))
     cursor = conn.cursor()
     cursor.execute(
-        """
-        SELECT oi.order_id, oi.quantity, oi.price, o.created_at
-        FROM order_items oi
-        JOIN orders o ON oi.order_id = o.id
-        WHERE oi.product_id = ?
-        ORDER BY o.created_at DESC
-        LIMIT ?
+        f"""
+        SELECT product_id, order_id, quantity, price, created_at
+        FROM (
+            SELECT oi.product_id, oi.order_id, oi.quantity, oi.price, o.created_at,
+                   ROW_NUMBER() OVER (PARTITION BY oi.product_id ORDER BY o.created_at DESC) AS position
+            FROM order_items oi
+            JOIN orders o ON oi.order_id = o.id
+            WHERE oi.product_id IN ({placeholders})
+        )
+        WHERE position <= ?
+        ORDER BY product_id, created_at DESC
         """,
-        (product_id, limit)
+        (*product_ids, limit)
     )
 
-    sales = []
-    for row in cursor.fetchall():
-        order_id, quantity, price, creation_date = row
-        sales.append({
+    sales: Dict[int, List[Dict]] = {}
+    for product_id, order_id, quantity, price, creation_date in cursor.fetchall():
+        sales.setdefault(product_id, []).append({
             "order_id": order_id,
             "quantity": quantity,
             "price": price,
@@ -105,62 +120,141 @@ def get_recent_sales(conn: sqlite3.Connection, product_id: int, limit: int = 5)
     return sales
 
 
-async def send_low_stock_notification(
-        conn: sqlite3.Connection,
+def format_low_stock_digest(products: List[Dict], recent_sales: Dict[int, List[Dict]]) -> List[str]:
+    """
+    Формирует сводку о товарах с низким остатком; длинная сводка делится на несколько сообщений
+    """
+    header = f"⚠️ <b>ВНИМАНИЕ! Низкий остаток товаров: {len(products)}</b>\n\n"
+    messages = []
+    current = header
+
+    for product in products:
+        section = f"📦 <b>{product['product_name']}</b>\n"
+        section += f"Остаток: {product['quantity']} шт. (порог {product['threshold']} шт.)\n"
+
+        sales = recent_sales.get(product["product_id"], [])
+        if sales:
+            total_sold = sum(sale["quantity"] for sale in sales)
+            last_sale = datetime.datetime.fromisoformat(sales[0]["date"]).strftime("%d.%m.%Y %H:%M")
+            section += f"Последние продажи: {total_sold} шт. в {len(sales)} заказах, последняя {last_sale}\n"
+        else:
+            section += "<i>Нет данных о последних продажах.</i>\n"
+        section += "\n"
+
+        if len(current) + len(section) > MAX_MESSAGE_LENGTH and current != header:
+            messages.append(current.rstrip())
+            current = "⚠️ <b>Низкий остаток товаров (продолжение)</b>\n\n"
+        current += section
+
+    messages.append(current.rstrip())
+    return messages
+
+
+async def send_low_stock_digest(
         bot: Bot,
-        product_id: int,
-        product_name: str,
-        current_stock: int,
-        threshold: int,
-        recent_sales: List[Dict]
+        products: List[Dict],
+        recent_sales: Dict[int, List[Dict]]
 ) -> None:
     """
-    Отправляет уведомление админу о низком остатке товара
+    Отправляет каждому админу одну сводку по всем товарам с низким остатком.
+    Сводка считается доставленной, если ее получил хотя бы один админ:
+    недоступный чат одного админа не должен приводить к повторным сводкам остальным.
     """
-    # Формируем текст уведомления
-    message_text = f"⚠️ <b>ВНИМАНИЕ! Низкий остаток товара</b>\n\n"
-    message_text += f"<b>Товар:</b> {product_name}\n"
-    message_text += f"<b>Текущий остаток:</b> {current_stock} шт.\n"
-    message_text += f"<b>Установленный порог:</b> {threshold} шт.\n\n"
-
-    if recent_sales:
-        message_text += "<b>Последние продажи:</b>\n"
-        total_sold = 0
-        for sale in recent_sales:
-            sale_date = datetime.datetime.fromisoformat(sale["date"]).strftime("%d.%m.%Y %H:%M")
-            message_text += f"• Заказ #{sale['order_id']} - {sale_date}: {sale['quantity']} шт.\n"
-            total_sold += sale["quantity"]
-
-        message_text += f"\n<b>Всего продано за последнее время:</b> {total_sold} шт."
-    else:
-        message_text += "<i>Нет данных о последних продажах этого товара.</i>"
-
-    # Логируем уведомление в БД
-    notification_id = log_stock_notification(
-        conn,
-        product_id,
-        product_name,
-        current_stock,
-        threshold
-    )
+    messages = format_low_stock_digest(products, recent_sales)
+
+    # Логируем уведомления в БД
+    notification_ids = await db_write(_log_low_stock_digest, products)
 
-    # Отправляем уведомление
     try:
-        admins = get_staff_by_role(role="Админ")
-        admin_ids = [admin['telegram_id'] for admin in admins if admin.get('is_active', 1)]
-        for admin_id in admin_ids:
-            await bot.send_message(
-                admin_id,
-                message_text,
-                parse_mode="HTML"
-            )
-
-        # Отмечаем уведомление как доставленное
-        update_notification_delivered(conn, notification_id, True)
-
-        # Обновляем дату последнего уведомления
-        update_last_notification_date(conn, product_id)
-
-        logger.info(f"Отправлено уведомление о низком остатке товара: {product_name}")
+        admin_ids = list(get_staff_ids_by_role("Админ"))
+        # Админам сводка рассылается параллельно, части одному админу - по порядку
+        results = await asyncio.gather(
+            *(telegram_sender.send_parts(bot, admin_id, messages, parse_mode="HTML") for admin_id in admin_ids),
+            return_exceptions=True
+        )
+
+        delivered_count = 0
+        for admin_id, result in zip(admin_ids, results):
+            if isinstance(result, Exception):
+                logger.error(f"Не удалось отправить сводку о низком остатке админу {admin_id}: {result}")
+            else:
+                delivered_count += 1
+
+        if not delivered_count:
+            return
+
+        # Отмечаем уведомления как доставленные и запускаем паузу до следующего уведомления
+        await db_write(
+            _mark_low_stock_digest_delivered,
+            notification_ids,
+            [product["product_id"] for product in products]
+        )
+
+        logger.info(f"Отправлена сводка о низком остатке {len(products)} товаров "
+                    f"{delivered_count} из {len(admin_ids)} админов")
     except Exception as e:
-        logger.error(f"Ошибка при отправке уведомления о низком остатке: {e}")
+        logger.error(f"Ошибка при отправке сводки о низком остатке: {e}")
+
+
+class StockThresholdWatcher:
+    """
+    Проверка порогов по событиям изменения остатков.
+
+    Подписывается на database.stock_events: каждое изменение количества товара
+    добавляет его ID в набор ожидающих проверки. Через STOCK_CHANGE_DEBOUNCE_SECONDS
+    после первого изменения все накопленные товары проверяются одной пачкой,
+    так что обработка заказа из нескольких позиций дает одну сводку админам.
+    """
+
+    def __init__(self):
+        self._bot: Optional[Bot] = None
+        self._event_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Set[int] = set()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def start(self, bot: Bot):
+        """Подписывается на изменения остатков (при старте бота)"""
+        self._bot = bot
+        if self._event_loop is None:
+            subscribe_stock_changes(self._on_stock_changed)
+        self._event_loop = asyncio.get_running_loop()
+
+    def _on_stock_changed(self, product_ids: List[int]):
+        """Подписка на stock_events: может вызываться из любого потока"""
+        if self._event_loop is not None:
+            self._event_loop.call_soon_threadsafe(self._enqueue, product_ids)
+
+    def _enqueue(self, product_ids: List[int]):
+        self._pending.update(product_ids)
+        if self._flush_handle is None:
+            self._flush_handle = self._event_loop.call_later(STOCK_CHANGE_DEBOUNCE_SECONDS, self._flush)
+
+    def _flush(self):
+        self._flush_handle = None
+        if self._flush_task is not None and not self._flush_task.done():
+            # Предыдущая проверка еще идет - повторим после ее завершения
+            self._flush_handle = self._event_loop.call_later(STOCK_CHANGE_DEBOUNCE_SECONDS, self._flush)
+            return
+        product_ids = list(self._pending)
+        self._pending.clear()
+        self._flush_task = asyncio.create_task(self._check(product_ids), name="stock-threshold-check")
+
+    async def _check(self, product_ids: List[int]):
+        try:
+            await check_low_stock_products(self._bot, product_ids)
+        except Exception as e:
+            logger.error(f"Ошибка при проверке остатков товаров {product_ids}: {e}")
+
+    async def stop(self):
+        """Отменяет отложенную проверку (при остановке бота)"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+
+
+stock_threshold_watcher = StockThresholdWatcher()
@@ -0,0 +1,316 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
+
+from database.db_executor import db_read, db_write
+from database.reachability_db import load_unreachable_users, set_user_reachability
+
+logger = logging.getLogger(__name__)
+
+# Лимиты Telegram Bot API: ~30 сообщений в секунду на бота,
+# ~1 сообщение в секунду в личный чат и 20 сообщений в минуту в группу.
+GLOBAL_RATE = 30
+PRIVATE_CHAT_RATE = 1.0
+GROUP_CHAT_RATE = 20 / 60
+CHAT_BURST = 3  # короткие всплески в один чат Telegram допускает
+
+SENDER_WORKERS = 8
+MAX_RETRIES = 3
+MAX_IDLE_CHAT_BUCKETS = 10000
+# Лимит длины сообщения Telegram - 4096 символов, оставляем запас
+MAX_MESSAGE_LENGTH = 4000
+
+
+class ChatUnreachableError(Exception):
+    """Пользователь заблокировал бота или удалил аккаунт - сообщение не отправлялось."""
+
+    def __init__(self, chat_id: int):
+        super().__init__(f"Чат {chat_id} недоступен для бота")
+        self.chat_id = chat_id
+
+
+def unreachable_reason(error: Exception) -> Optional[str]:
+    """Возвращает причину, если ошибка означает, что писать в чат больше нельзя."""
+    if isinstance(error, TelegramForbiddenError):
+        return "blocked"
+    if isinstance(error, TelegramBadRequest) and "chat not found" in str(error).lower():
+        return "chat not found"
+    return None
+
+
+def pack_message_parts(parts: List[str], separator: str = "\n\n", limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """
+    Склеивает части текста в как можно меньшее число сообщений не длиннее limit.
+    Часть не разрывается; часть длиннее limit уходит отдельным сообщением как есть.
+    """
+    messages = []
+    current = ""
+    for part in parts:
+        if current and len(current) + len(separator) + len(part) > limit:
+            messages.append(current)
+            current = part
+        else:
+            current = current + separator + part if current else part
+    if current:
+        messages.append(current)
+    return messages
+
+
+class TokenBucket:
+    """
+    Ведро токенов с резервированием: reserve() списывает токен сразу
+    и возвращает, через сколько секунд его можно использовать.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def reserve(self) -> float:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def is_idle(self) -> bool:
+        """Ведро полностью восстановилось и его можно забыть."""
+        return self._tokens + (time.monotonic() - self._updated) * self.rate >= self.capacity
+
+
+class _Job:
+    __slots__ = ("chat_id", "call", "future", "attempts", "reserved")
+
+    def __init__(self, chat_id: int, call: Callable[[], Awaitable[Any]], future: asyncio.Future):
+        self.chat_id = chat_id
+        self.call = call
+        self.future = future
+        self.attempts = 0
+        self.reserved = False
+
+
+class TelegramSender:
+    """
+    Общий сервис исходящих сообщений Telegram.
+
+    Все рассылки и уведомления ставятся в одну очередь, которую разбирает
+    ограниченный пул воркеров. Общий поток ограничен ведром токенов на GLOBAL_RATE,
+    каждый чат - своим ведром. Сообщения одного чата идут строго по очереди:
+    в общей очереди и в работе находится только первое из них, следующее ставится
+    после его завершения, поэтому порядок доставки в чат сохраняется.
+    TelegramRetryAfter обрабатывается централизованно: отправка приостанавливается
+    на retry_after секунд, сообщение повторяется, оставаясь первым в очереди чата.
+    Чаты, ответившие TelegramForbiddenError или "chat not found", запоминаются
+    в user_reachability; дальнейшие отправки в них завершаются ChatUnreachableError
+    без обращения к API. Результат каждой отправки возвращается через asyncio.Future.
+    """
+
+    def __init__(self, workers: int = SENDER_WORKERS, global_rate: float = GLOBAL_RATE,
+                 max_retries: int = MAX_RETRIES):
+        self.workers = workers
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats: Dict[int, TokenBucket] = {}
+        # Незавершенные сообщения по чатам; первое - в общей очереди или в работе
+        self._chat_jobs: Dict[int, Deque[_Job]] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._delayed: Set[_Job] = set()
+        self._paused_until = 0.0
+        self._unreachable: Optional[Set[int]] = None
+        self.sent = 0
+        self.pruned = 0
+        self.failed = 0
+        self.retries = 0
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_IDLE_CHAT_BUCKETS:
+                self._chats = {cid: b for cid, b in self._chats.items() if not b.is_idle()}
+            rate = GROUP_CHAT_RATE if chat_id < 0 else PRIVATE_CHAT_RATE
+            bucket = self._chats[chat_id] = TokenBucket(rate, CHAT_BURST)
+        return bucket
+
+    def _ensure_started(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._worker(), name=f"telegram-sender-{i}")
+                for i in range(self.workers)
+            ]
+            logger.info(f"Сервис отправки сообщений запущен ({self.workers} воркеров)")
+
+    def submit(self, chat_id: int, call: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """
+        Ставит отправку в очередь. call - функция без аргументов, возвращающая корутину
+        (например, lambda: bot.send_message(chat_id, text)); при повторе она вызывается заново.
+        Возвращает Future с результатом вызова или исключением.
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        job = _Job(chat_id, call, future)
+        jobs = self._chat_jobs.get(chat_id)
+        if jobs:
+            jobs.append(job)
+        else:
+            self._chat_jobs[chat_id] = deque([job])
+            self._queue.put_nowait(job)
+        return future
+
+    async def send(self, chat_id: int, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Отправляет через очередь и ждет результата."""
+        return await self.submit(chat_id, call)
+
+    def send_message(self, bot: Bot, chat_id: int, text: str, **kwargs) -> asyncio.Future:
+        """Ставит в очередь bot.send_message(chat_id, text, **kwargs)."""
+        return self.submit(chat_id, lambda: bot.send_message(chat_id, text, **kwargs))
+
+    async def send_parts(self, bot: Bot, chat_id: int, texts: List[str], **kwargs) -> None:
+        """
+        Отправляет части одного длинного сообщения в чат по порядку: следующая часть
+        ставится в очередь только после доставки предыдущей. Ошибка прерывает отправку,
+        чтобы получатель не увидел продолжение без начала.
+        """
+        for text in texts:
+            await self.send_message(bot, chat_id, text, **kwargs)
+
+    async def _unreachable_chats(self) -> Set[int]:
+        if self._unreachable is None:
+            self._unreachable = await db_read(load_unreachable_users)
+        return self._unreachable
+
+    async def mark_reachable(self, chat_id: int) -> None:
+        """Снимает отметку недоступности (пользователь снова написал боту)."""
+        unreachable = await self._unreachable_chats()
+        if chat_id in unreachable:
+            unreachable.discard(chat_id)
+            await db_write(set_user_reachability, chat_id, True)
+            logger.info(f"Чат {chat_id} снова доступен")
+
+    async def _mark_unreachable(self, chat_id: int, reason: str) -> None:
+        unreachable = await self._unreachable_chats()
+        if chat_id not in unreachable:
+            unreachable.add(chat_id)
+            await db_write(set_user_reachability, chat_id, False, reason)
+            logger.info(f"Чат {chat_id} недоступен ({reason}), дальнейшие отправки пропускаются")
+
+    def _requeue(self, job: _Job, delay: float) -> None:
+        self._delayed.add(job)
+        asyncio.get_running_loop().call_later(delay, self._release, job)
+
+    def _release(self, job: _Job) -> None:
+        if job in self._delayed:
+            self._delayed.discard(job)
+            self._queue.put_nowait(job)
+
+    def _finish(self, job: _Job) -> None:
+        """Снимает завершенное сообщение с очереди чата и ставит следующее сообщение этого чата."""
+        jobs = self._chat_jobs.get(job.chat_id)
+        if not jobs or jobs[0] is not job:
+            return
+        jobs.popleft()
+        if jobs:
+            self._queue.put_nowait(jobs[0])
+        else:
+            del self._chat_jobs[job.chat_id]
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            finished = True
+            try:
+                finished = await self._process(job)
+            except Exception as e:
+                logger.error(f"Ошибка в воркере отправки сообщений: {e}")
+                # Ожидающие отправки не должны зависнуть на незавершенном future
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                if finished:
+                    self._finish(job)
+                self._queue.task_done()
+
+    async def _process(self, job: _Job) -> bool:
+        """Обрабатывает сообщение. Возвращает False, если оно отложено и еще будет отправляться."""
+        if job.future.done():
+            return True
+
+        if job.chat_id in await self._unreachable_chats():
+            self.pruned += 1
+            job.future.set_exception(ChatUnreachableError(job.chat_id))
+            return True
+
+        # Место в лимите чата резервируется один раз; если оно в будущем,
+        # сообщение откладывается, а воркер берет следующее
+        if not job.reserved:
+            job.reserved = True
+            delay = self._chat_bucket(job.chat_id).reserve()
+            if delay > 0:
+                self._requeue(job, delay)
+                return False
+
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+
+        delay = self._global.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        try:
+            result = await job.call()
+        except TelegramRetryAfter as e:
+            job.attempts += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+            if job.attempts > self.max_retries:
+                self.failed += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+                return True
+            self.retries += 1
+            logger.warning(f"Превышен лимит Telegram (чат {job.chat_id}), пауза {e.retry_after} с")
+            # Сообщение остается первым в очереди чата: более новые не обгонят его
+            self._requeue(job, e.retry_after)
+            return False
+        except Exception as e:
+            self.failed += 1
+            reason = unreachable_reason(e)
+            if reason:
+                await self._mark_unreachable(job.chat_id, reason)
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            self.sent += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        return True
+
+    async def stop(self) -> None:
+        """Останавливает воркеры; неотправленные сообщения отменяются (при остановке бота)."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Все неотправленные сообщения лежат в очередях чатов (первые - еще и в общей очереди)
+        pending = [job for jobs in self._chat_jobs.values() for job in jobs]
+        self._chat_jobs.clear()
+        self._delayed.clear()
+        if self._queue is not None:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+        for job in pending:
+            job.future.cancel()
+        logger.info(f"Сервис отправки сообщений остановлен: отправлено {self.sent}, ошибок {self.failed}, "
+                    f"пропущено недоступных {self.pruned}")
+
+
+telegram_sender = TelegramSender()